@@ -44,6 +44,68 @@ class CMBackend(object):
         """
         raise cmerror.CMError('Not implemented')
 
+    def get_properties_by_names(self, names):
+        """get the values of a list of properties
+
+           Backends able to read several properties in one operation should
+           override this, by default the properties are read one by one.
+
+           Arguments:
+
+           names: A list of the property names.
+
+           Return:
+
+           A dictionary of the existing properties, the missing ones are left
+           out.
+
+           Raise:
+
+           CMError is raised in-case of failure
+        """
+        props = {}
+        for name in names:
+            try:
+                value = self.get_property(name)
+            except cmerror.CMError:
+                continue
+            if value is not None:
+                props[name] = value
+        return props
+
+    def get_properties_page(self, prop_filter, cursor=None, limit=None):
+        """get a page of the properties matching some filter
+
+           Backends able to read the properties in the order of their names
+           should override this so that the cost of a page follows its size,
+           by default all the matching properties are read and sorted.
+
+           Arguments:
+
+           prop_filter: A string containing the re used to match the required
+                        properties.
+
+           cursor: Only the properties with names greater than cursor are
+                   returned, by default they are returned from the first one.
+
+           limit: The maximum number of the returned properties, by default
+                  all of them are returned.
+
+           Return:
+
+           A list of (name, value) tuples sorted by the name.
+
+           Raise:
+
+           CMError is raised in-case of failure
+        """
+        props = sorted(self.get_properties(prop_filter).iteritems())
+        if cursor is not None:
+            props = [(name, value) for name, value in props if name > cursor]
+        if limit is not None:
+            props = props[:limit]
+        return props
+
     # pylint: disable=no-self-use, unused-argument
     def set_property(self, prop_name, prop_value):
         """set/update a value to some property
@@ -106,5 +168,38 @@ class CMBackend(object):
         """
         raise cmerror.CMError('Not implemented')
 
+    def commit(self, properties, deleted):
+        """delete and set/update a group of properties as a whole
+
+           Backends supporting transactions should override this so that the
+           change is applied atomically, by default the properties are
+           deleted and then set/updated using two separate operations.
+
+           Arguments:
+
+           properties: A dictionary containing the changed properties.
+
+           deleted: A list containing the names of the properties to be
+                    deleted.
+
+           Raise:
+
+           CMError is raised in-case of a failure.
+        """
+        if deleted:
+            self.delete_properties(deleted)
+        if properties:
+            self.set_properties(properties)
+
+    # pylint: disable=no-self-use
+    def get_stats(self):
+        """get the state and statistics of the backend for debugging
+
+           Return:
+
+           A dictionary which can be json encoded, empty by default.
+        """
+        return {}
+
 if __name__ == '__main__':
     pass
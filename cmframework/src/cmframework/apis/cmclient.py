@@ -30,6 +30,27 @@ def handle_exceptions(func):
     return wrapper
 
 
+def _iterate(items):
+    try:
+        for item in items:
+            yield item
+    except cmapis.cmerror.CMError:
+        raise
+    except Exception as exp:
+        raise cmapis.cmerror.CMError(str(exp))
+
+
+def handle_iteration_exceptions(func):
+    """handle_exceptions for the APIs returning a generator, the errors raised
+       while iterating are converted too."""
+    @wraps(func)
+    @handle_exceptions
+    def wrapper(self, *arg, **kwargs):
+        return _iterate(func(self, *arg, **kwargs))
+
+    return wrapper
+
+
 class CMClient(object):
     """
         Usage Example:
@@ -133,6 +154,75 @@ class CMClient(object):
         result = self.client_lib.get_properties(prop_filter, snapshot_name)
         return result
 
+    @handle_iteration_exceptions
+    def iter_properties(self, prop_filter, snapshot_name=None, page_size=500,
+                        names_only=False, max_value_bytes=None):
+        """iterate over the properties matching a filter page by page.
+
+           This is the API used to list properties without reading all of
+           them with one request. The properties are read in pages of
+           page_size properties in the order of their names when the
+           iteration proceeds.
+
+           Arguments:
+
+           prop_filter: A valid python re describing the filter used when
+                        matching the returned properties.
+
+           snapshot_name: The snapshot name, by default the current
+                          configuration is read.
+
+           page_size: The number of properties read with one request, None
+                      reads all of them with one request.
+
+           names_only: Read only the names of the properties, the values are
+                       returned as None.
+
+           max_value_bytes: Cut the longer values to this length.
+
+           Return:
+
+           A generator of (name, value) tuples.
+
+           Raise:
+
+           CMError is raised in-case of a failure, also when no property
+           matches the filter.
+        """
+        self._check_filter(prop_filter)
+        return self.client_lib.iter_properties(prop_filter, snapshot_name, page_size,
+                                               names_only, max_value_bytes)
+
+    @handle_exceptions
+    def get_changes_since(self, since_csn, prop_filter='.*'):
+        """get the properties changed after a csn.
+
+           This is the API used to read only the properties changed after an
+           earlier read, the csn of the earlier read is in the
+           cloud.cmframework property or returned by an earlier call.
+
+           Arguments:
+
+           since_csn: The csn after which the changes are returned.
+
+           prop_filter: A valid python re describing the filter used when
+                        matching the returned properties.
+
+           Return:
+
+           A (csn, properties, deleted) tuple, csn is the current csn,
+           properties is a dictionary of the properties set and deleted a list
+           of the properties deleted after since_csn. properties and deleted
+           are None if the changes after since_csn are not known anymore, then
+           all the properties have to be read again.
+
+           Raise:
+
+           CMError is raised in-case of a failure.
+        """
+        self._check_filter(prop_filter)
+        return self.client_lib.get_changed_properties(since_csn, prop_filter)
+
     @handle_exceptions
     def set_property(self, prop_name, prop_value):
         """set/update the value of a property.
@@ -242,6 +332,84 @@ class CMClient(object):
         """
         return self.client_lib.wait_activation(change_uuid)
 
+    @handle_exceptions
+    def gather_properties(self, prop_filters):
+        """get the properties matching several filters.
+
+           This is the API used to read several groups of properties at once,
+           the reads are done concurrently if the client library supports it,
+           like cmframework.lib.cmgreenclientimpl.CMGreenClientImpl does.
+
+           Arguments:
+
+           prop_filters: A list of valid python res describing the filters.
+
+           Return:
+
+           A list of the dictionaries of the properties matching each filter.
+
+           Raise:
+
+           CMError is raised in-case of a failure.
+        """
+        for prop_filter in prop_filters:
+            self._check_filter(prop_filter)
+        if hasattr(self.client_lib, 'gather_properties'):
+            return self.client_lib.gather_properties(prop_filters)
+        return [self.client_lib.get_properties(prop_filter) for prop_filter in prop_filters]
+
+    @handle_exceptions
+    def wait_activations(self, change_uuids):
+        """wait for several changes to be activated.
+
+           The waits are done concurrently if the client library supports
+           it, like cmframework.lib.cmgreenclientimpl.CMGreenClientImpl does.
+
+           Arguments:
+
+           change_uuids: A list of the uuids of the changes.
+
+           Raise:
+
+           CMError is raised if an activation failed or in-case of a failure.
+        """
+        if hasattr(self.client_lib, 'wait_activations'):
+            return self.client_lib.wait_activations(change_uuids)
+        return [self.client_lib.wait_activation(change_uuid) for change_uuid in change_uuids]
+
+    @handle_iteration_exceptions
+    def watch(self, prop_filter='.*', since_csn=None):
+        """watch the changes of properties
+
+           This API is used to follow the changes of the configuration without
+           reading the properties again and again. The usual flow is to read
+           the properties including the cloud.cmframework property containing
+           the csn of the configuration, and watch the changes done after it.
+
+           Arguments:
+
+           prop_filter: A string containing the re used to match the watched
+                        properties.
+
+           since_csn: The csn after which the changes are returned, by default
+                      the changes done after the call are returned.
+
+           Return:
+
+           A generator of the change events, each is a dictionary with
+           csn and name, and either value or deleted set to True. Events with
+           only the csn are returned periodically when there are no changes.
+           An event with resync set to True means the changes after since_csn
+           are not known anymore, the properties have to be read again and
+           watched since the csn in the event, the generator ends after it.
+
+           Raise:
+
+           CMError is raised in-case of a failure.
+        """
+        self._check_filter(prop_filter)
+        return self.client_lib.watch(prop_filter, since_csn)
+
     # pylint: disable=no-self-use
     def _check_filter(self, prop_filter):
         re.compile(prop_filter)
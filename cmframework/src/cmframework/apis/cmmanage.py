@@ -11,9 +11,86 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import re
+
 from cmframework.apis import cmclient
 
 
+class CMBatch(object):
+    """
+        Builder of a batch of operations done as one change.
+
+        Usage Example:
+            batch = client.batch()
+            batch.create_snapshot('before-update')
+            batch.set_property('cloud.ntp', '["1.2.3.4"]')
+            batch.delete_property('cloud.old')
+            batch.get_properties('cloud.*')
+            change_uuid, results = batch.execute()
+    """
+
+    def __init__(self, client_lib):
+        self.client_lib = client_lib
+        self.operations = []
+
+    def get_property(self, prop_name):
+        """add reading a property, its result has the value"""
+        self.operations.append({'operation': 'get', 'name': prop_name})
+        return self
+
+    def get_properties(self, prop_filter):
+        """add reading the properties matching a filter, its result has the properties"""
+        re.compile(prop_filter)
+        self.operations.append({'operation': 'get', 'filter': prop_filter})
+        return self
+
+    def set_property(self, prop_name, prop_value):
+        """add setting a property"""
+        return self.set_properties({prop_name: prop_value})
+
+    def set_properties(self, props):
+        """add setting a dictionary of properties"""
+        self.operations.append({'operation': 'set', 'properties': dict(props)})
+        return self
+
+    def delete_property(self, prop_name):
+        """add deleting a property"""
+        return self.delete_properties([prop_name])
+
+    def delete_properties(self, prop_names):
+        """add deleting a list of properties"""
+        self.operations.append({'operation': 'delete', 'properties': list(prop_names)})
+        return self
+
+    def create_snapshot(self, snapshot_name):
+        """add creating a snapshot of the configuration before the batch
+
+           The snapshots must be added before the sets and deletes.
+        """
+        self.operations.append({'operation': 'snapshot', 'name': snapshot_name})
+        return self
+
+    @cmclient.handle_exceptions
+    def execute(self):
+        """do the operations as one change
+
+           The operations are done in order, the reads see the changes done
+           before them in the batch. The changes are validated, stored and
+           activated together, if any operation fails nothing is changed.
+
+           Return:
+
+           A (change uuid, results) tuple, the change uuid is None if nothing
+           was changed, results has a dictionary for every operation, with
+           'value' for get_property and 'properties' for get_properties.
+
+           Raise:
+
+           CMError is raised in-case of a failure.
+        """
+        return self.client_lib.batch(self.operations)
+
+
 class CMManage(cmclient.CMClient):
     """
         Usage Example:
@@ -51,6 +128,19 @@ class CMManage(cmclient.CMClient):
         """
         cmclient.CMClient.__init__(self, server_ip, server_port, client_impl_module, verbose_logger)
 
+    def batch(self):
+        """start building a batch of operations done as one change
+
+           This API is used to do a series of reads, changes and snapshots
+           with one request and one activation.
+
+           Return:
+
+           A CMBatch, the operations are added to it and done with its
+           execute().
+        """
+        return CMBatch(self.client_lib)
+
     @cmclient.handle_exceptions
     def create_snapshot(self, snapshot_name):
         """initiate a create snapshot operation
@@ -118,7 +208,7 @@ class CMManage(cmclient.CMClient):
         return self.client_lib.list_snapshots()
 
     @cmclient.handle_exceptions
-    def activate(self, node_name):
+    def activate(self, node_name, force=False):
         """activate configuration in all or one specific node
 
            This API is used to initiate full activation for all or one specific node
@@ -129,11 +219,14 @@ class CMManage(cmclient.CMClient):
                       the configuration is to be activated. If not specified, then activation
                       is done for all nodes.
 
+           force: run all the activators, by default the activators whose data has
+                  not changed since their last successful activation are skipped.
+
            Raise:
 
            CMError is raised in-case of failure.
         """
-        return self.client_lib.activate(node_name)
+        return self.client_lib.activate(node_name, force)
 
     @cmclient.handle_exceptions
     def activate_node(self, node_name):
@@ -17,6 +17,7 @@ from cmframework.apis import cmerror
 class CMValidator(object):
     def __init__(self):
         self.plugin_client = None
+        self.config_view = None
 
     # pylint: disable=no-self-use
     def get_subscription_info(self):
@@ -78,3 +79,19 @@ class CMValidator(object):
            The plugin client object
         """
         return self.plugin_client
+
+    def get_config_view(self):
+        """get the view of the configuration with the validated change
+
+           The view is a read-only plugin client returning the data in the
+           backend with the validated change applied. It is shared by all the
+           validation plugins, so the data is read from the backend and json
+           decoded only once per change. The view is available only while the
+           validate functions are called.
+
+           Return:
+
+           The cmconfigview.CMConfigView object, it provides also get_json and
+           get_config_manager for accessing the decoded data.
+        """
+        return self.config_view
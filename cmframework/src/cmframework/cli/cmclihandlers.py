@@ -94,15 +94,39 @@ class CMCLIGetPropertiesHandler(CMCLIHandler):
                                dest='snapshot',
                                metavar='SNAPSHOT-NAME',
                                action='store')
+        subparser.add_argument('--names-only',
+                               required=False,
+                               dest='names_only',
+                               action='store_true')
+        subparser.add_argument('--max-value-bytes',
+                               required=False,
+                               dest='max_value_bytes',
+                               metavar='MAX-VALUE-BYTES',
+                               type=int,
+                               action='store')
+        subparser.add_argument('--page-size',
+                               required=False,
+                               dest='page_size',
+                               metavar='PAGE-SIZE',
+                               type=int,
+                               action='store')
         self.set_handler(subparser)
 
     def __call__(self, args):
         self._init_api(args.ip, args.port, args.client_lib, args.verbose)
         matching_filter = args.matching_filter
         snapshot = args.snapshot
-        props = self.api.get_properties(matching_filter, snapshot)
-        for name, value in props.iteritems():
-            print('%s=%s' % (name, value))
+        # by default the properties are read with one request, a page is not
+        # cheaper to read than all of them with every backend
+        props = self.api.iter_properties(matching_filter, snapshot_name=snapshot,
+                                         page_size=args.page_size,
+                                         names_only=args.names_only,
+                                         max_value_bytes=args.max_value_bytes)
+        for name, value in props:
+            if args.names_only:
+                print(name)
+            else:
+                print('%s=%s' % (name, value))
 
 
 class CMCLISetPropertyHandler(CMCLIHandler):
@@ -279,12 +303,17 @@ class CMCLIActivateHandler(CMCLIHandler):
                                dest='node_name',
                                metavar='NODE-NAME',
                                action='store')
+        subparser.add_argument('--force',
+                               required=False,
+                               dest='force',
+                               help='Run also the activators whose data has not changed',
+                               action='store_true')
         self.set_handler(subparser)
 
     def __call__(self, args):
         self._init_api(args.ip, args.port, args.client_lib, args.verbose)
         node_name = args.node_name
-        self.api.activate(node_name)
+        self.api.activate(node_name, args.force)
 
 
 class CMCLIRebootHandler(CMCLIHandler):
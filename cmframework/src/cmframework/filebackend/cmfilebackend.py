@@ -12,49 +12,261 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from __future__ import print_function
+from urlparse import parse_qs
 import logging
-import re
+import threading
+import time
+import json
 import os
 import stat
 
 from cmframework.apis import cmbackend
 from cmframework.apis import cmerror
+from cmframework.utils import cmkeyindex
 
 
 class CMFileBackend(cmbackend.CMBackend):
+    """
+    Store the properties in a file with one name=value line per property.
+
+    In the default rewrite mode the whole file is rewritten on every change.
+    In journal mode every change is appended as one json line to a journal
+    file next to the data file, the data file is rewritten in the background
+    once the journal grows over the compaction threshold. The journal records
+    have the following structure:
+    {
+        'set': {'<name>': '<value>', ...},
+        'delete': ['<name>', ...]
+    }
+
+    Concurrent changes are group committed: the changes arriving while a
+    write is ongoing, or within the group commit window, are persisted
+    together with one write and one fsync. Every commit returns only after
+    its change is durable. The changes are applied to the data read by the
+    getters only after they are durable, so a change whose write fails is
+    never seen.
+    """
+
+    MODE_REWRITE = 'rewrite'
+    MODE_JOURNAL = 'journal'
+
+    # The options which can be appended to the uri as query parameters, the
+    # values are (type, default value)
+    OPTIONS = {
+        'mode': (str, MODE_REWRITE),
+        # the journal size in bytes triggering the compaction
+        'compact_threshold': (int, 4 * 1024 * 1024),
+        # the time in seconds a write waits for further changes to join it
+        'group_commit_window': (float, 0.0)
+    }
+
     def __init__(self, **kw):
         self.uri = kw['uri']
         logging.debug('CMFileBackend constructor called, uri=%s', self.uri)
+        self.path, _, query = self.uri.partition('?')
+        self.options = CMFileBackend._parse_options(query)
+        if self.options['mode'] not in (CMFileBackend.MODE_REWRITE, CMFileBackend.MODE_JOURNAL):
+            raise cmerror.CMError('Invalid mode {}'.format(self.options['mode']))
+        self.journal_path = self.path + '.journal'
+        self.compacting_path = self.path + '.journal.compacting'
+        self.journal = None
+        self.journal_size = 0
+        self.compacting = False
+        self.lock = threading.RLock()
+        self.cond = threading.Condition(self.lock)
+        # the changes waiting to be written, they belong to the batch with
+        # index next_batch and are not yet in data
+        self.pending = []
+        self.next_batch = 1
+        self.durable_batch = 0
+        self.flushing = False
+        # batch index -> [error, number of waiting commits]
+        self.failed_batches = {}
         self.data = {}
+        # the sorted names of the properties in data
+        self.keys = cmkeyindex.CMKeyIndex()
         self.load_file()
+        if self._is_journal_mode():
+            self._open_journal()
+            self._check_compaction()
+
+    @staticmethod
+    def _parse_options(query):
+        options = {}
+        values = parse_qs(query)
+        for name, (option_type, default) in CMFileBackend.OPTIONS.iteritems():
+            try:
+                options[name] = option_type(values.pop(name, [default])[0])
+            except ValueError:
+                raise cmerror.CMError('Invalid value for {} in backend uri'.format(name))
+        if values:
+            raise cmerror.CMError('Unknown option(s) {} in backend uri'.format(values.keys()))
+        return options
+
+    def _is_journal_mode(self):
+        return self.options['mode'] == CMFileBackend.MODE_JOURNAL
 
     def load_file(self):
         logging.debug('load_file started')
+        with self.lock:
+            try:
+                self.data = {}
+                with open(self.path) as f:
+                    lines = f.read().splitlines()
+                    for line in lines:
+                        name, var = line.partition('=')[::2]
+                        logging.debug('Adding %s=%s', name, var)
+                        self.data[name.strip()] = var
+                    f.close()
+            except IOError:
+                logging.debug('File %s does not exist', self.path)
+            self.keys = cmkeyindex.CMKeyIndex(self.data)
+
+            for path in (self.compacting_path, self.journal_path):
+                self._replay_journal(path)
+
+    def _replay_journal(self, path):
         try:
-            self.data = {}
-            with open(self.uri) as f:
-                lines = f.read().splitlines()
-                for line in lines:
-                    name, var = line.partition('=')[::2]
-                    logging.debug('Adding %s=%s', name, var)
-                    self.data[name.strip()] = var
-                f.close()
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a record torn by a crash is never acknowledged
+                        logging.warning('Ignoring invalid record in %s', path)
+                        continue
+                    self._apply(record.get('set', {}), record.get('delete', []))
         except IOError:
-            logging.debug('File %s does not exist', self.uri)
+            logging.debug('Journal %s does not exist', path)
+
+    def _apply(self, properties, deleted):
+        for key in deleted:
+            self.data.pop(key, None)
+        self.keys.discard_all(deleted)
+        for key, value in properties.iteritems():
+            self.data[key] = value
+        self.keys.update(properties)
 
-    def write_file(self):
+    def write_file(self, data=None):
         logging.debug('write_file started')
+        if data is None:
+            data = self.data
         try:
-            with open(self.uri, 'w') as f:
-                os.chmod(self.uri, stat.S_IRUSR | stat.S_IWUSR)
-                for key, value in self.data.iteritems():
+            with open(self.path, 'w') as f:
+                os.chmod(self.path, stat.S_IRUSR | stat.S_IWUSR)
+                for key, value in data.iteritems():
                     logging.debug('Writing %s=%s', key, value)
                     f.write(key + '=' + value + '\n')
                 f.flush()
                 os.fsync(f.fileno())
-        except IOError as exp:
+            # the file contains the changes recorded in a journal earlier
+            for path in (self.compacting_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        except (IOError, OSError) as exp:
             raise cmerror.CMError(str(exp))
 
+    def _open_journal(self):
+        try:
+            self.journal = open(self.journal_path, 'a')
+            os.chmod(self.journal_path, stat.S_IRUSR | stat.S_IWUSR)
+            self.journal.seek(0, os.SEEK_END)
+            self.journal_size = self.journal.tell()
+        except (IOError, OSError) as exp:
+            raise cmerror.CMError(str(exp))
+
+    def _append_journal(self, changes):
+        logging.debug('_append_journal started')
+        lines = []
+        for properties, deleted in changes:
+            record = {}
+            if properties:
+                record['set'] = properties
+            if deleted:
+                record['delete'] = deleted
+            lines.append(json.dumps(record) + '\n')
+        data = ''.join(lines)
+        try:
+            self.journal.write(data)
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+        except (IOError, OSError) as exp:
+            raise cmerror.CMError(str(exp))
+        self.journal_size += len(data)
+
+    def _persist(self, changes, data):
+        if self._is_journal_mode():
+            self._append_journal(changes)
+        else:
+            self.write_file(data)
+
+    def _check_compaction(self):
+        if self.compacting or self.journal_size < self.options['compact_threshold']:
+            return
+
+        logging.info('Journal size %d exceeds threshold, starting compaction', self.journal_size)
+        self.compacting = True
+        thread = threading.Thread(target=self.compact)
+        thread.daemon = True
+        thread.start()
+
+    def compact(self):
+        """rewrite the data file to contain the changes recorded in the journal
+
+           The journal is moved aside and a new one is started, then the data
+           file is replaced with a new one via a temporary file and an atomic
+           rename. The old journal is removed once the new data file is
+           durable, until that it is replayed on top of the data file when
+           loading.
+        """
+        logging.debug('compact started')
+        if not self._is_journal_mode():
+            return
+
+        try:
+            with self.cond:
+                # the journal cannot be moved while a batch is written to it
+                while self.flushing:
+                    self.cond.wait()
+                self.compacting = True
+                # a journal left behind by a failed compaction contains older
+                # changes than the current one, it is replaced by the same data
+                # file.
+                if not os.path.exists(self.compacting_path):
+                    self.journal.close()
+                    try:
+                        os.rename(self.journal_path, self.compacting_path)
+                    finally:
+                        # the writes continue to the old journal if it could
+                        # not be moved
+                        self._open_journal()
+                data = dict(self.data)
+
+            self._write_data_file(data)
+            os.remove(self.compacting_path)
+            logging.info('Compaction done')
+        except (IOError, OSError, cmerror.CMError) as exp:
+            logging.error('Compaction failed: %s', str(exp))
+        finally:
+            with self.cond:
+                self.compacting = False
+                self.cond.notify_all()
+
+    def _write_data_file(self, data):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR)
+            for key, value in data.iteritems():
+                f.write(key + '=' + value + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.path)
+        dirfd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+
     def get_property(self, prop_name):
         logging.debug('get_property called for %s', prop_name)
         try:
@@ -65,14 +277,19 @@ class CMFileBackend(cmbackend.CMBackend):
 
     def get_properties(self, prop_filter):
         logging.debug('get_properties called with filter %s', prop_filter)
-        returned = {}
-        pattern = re.compile(prop_filter)
-        for key, value in self.data.iteritems():
-            logging.debug('Matching %s against %s', key, prop_filter)
-            if pattern.match(key):
-                logging.debug('Adding %s', key)
-                returned[key] = value
-        return returned
+        with self.lock:
+            return {key: self.data[key] for key in self.keys.match(prop_filter)}
+
+    def get_properties_page(self, prop_filter, cursor=None, limit=None):
+        logging.debug('get_properties_page called with filter %s after %s', prop_filter, cursor)
+        with self.lock:
+            return [(key, self.data[key])
+                    for key in self.keys.match_page(prop_filter, cursor, limit)]
+
+    def get_properties_by_names(self, names):
+        logging.debug('get_properties_by_names called for %s', names)
+        with self.lock:
+            return {name: self.data[name] for name in names if name in self.data}
 
     def set_property(self, prop_name, prop_value):
         logging.debug('set_property %s=%s', prop_name, prop_value)
@@ -82,43 +299,87 @@ class CMFileBackend(cmbackend.CMBackend):
 
     def set_properties(self, properties):
         logging.debug('set_properties called props=%s', str(properties))
-        try:
-            for key, value in properties.iteritems():
-                self.data[key] = value
-            self.write_file()
-        except cmerror.CMError:
-            self.load_file()
-            raise
+        self.commit(properties, [])
 
     def delete_property(self, prop_name):
         logging.debug('delete_property called for %s', prop_name)
-        try:
-            del self.data[prop_name]
-            self.write_file()
-        except KeyError:
+        if prop_name not in self.data:
             logging.debug('Property not found')
             raise cmerror.CMError('Property not found')
-        except cmerror.CMError:
-            self.load_file()
-            raise
+        self.commit({}, [prop_name])
 
     def delete_properties(self, arg):
         logging.debug('delete_properties called with arg %s', arg)
+        if isinstance(arg, str):
+            with self.lock:
+                deleted = self.keys.match(arg)
+        else:
+            deleted = [key for key in arg if key in self.data]
+        self.commit({}, deleted)
+
+    def commit(self, properties, deleted):
+        logging.debug('commit called props=%s, deleted=%s', str(properties), deleted)
+        with self.cond:
+            self.pending.append((properties, deleted))
+            batch = self.next_batch
+            while self.durable_batch < batch:
+                if self.flushing:
+                    self.cond.wait()
+                else:
+                    self._flush()
+
+            if batch in self.failed_batches:
+                failure = self.failed_batches[batch]
+                failure[1] -= 1
+                if not failure[1]:
+                    del self.failed_batches[batch]
+                raise failure[0]
+
+    def _flush(self):
+        # called with the lock held, the lock is released while writing so
+        # that further changes can join the next batch
+        self.flushing = True
+        if self.options['group_commit_window']:
+            self.cond.release()
+            time.sleep(self.options['group_commit_window'])
+            self.cond.acquire()
+
+        changes = self.pending
+        data = None
+        if not self._is_journal_mode():
+            # the file contains the durable data with the changes of the batch
+            data = dict(self.data)
+            for properties, deleted in changes:
+                for key in deleted:
+                    data.pop(key, None)
+                data.update(properties)
+        batch = self.next_batch
+        self.pending = []
+        self.next_batch += 1
+        logging.debug('Writing batch %d with %d change(s)', batch, len(changes))
+
+        error = None
+        self.cond.release()
         try:
-            if isinstance(arg, str):
-                pattern = re.compile(arg)
-                for key in self.data.keys():  # pylint: disable=consider-iterating-dictionary
-                    if pattern.match(key):
-                        del self.data[key]
-            else:
-                for prop in arg:
-                    for key in self.data.keys():  # pylint: disable=consider-iterating-dictionary
-                        if key == prop:
-                            del self.data[key]
-            self.write_file()
-        except cmerror.CMError:
-            self.load_file()
-            raise
+            self._persist(changes, data)
+        except cmerror.CMError as exp:
+            error = exp
+        except Exception as exp:  # pylint: disable=broad-except
+            error = cmerror.CMError(str(exp))
+        finally:
+            self.cond.acquire()
+
+        if error:
+            self.failed_batches[batch] = [error, len(changes)]
+        else:
+            for properties, deleted in changes:
+                self._apply(properties, deleted)
+
+        self.durable_batch = batch
+        self.flushing = False
+        self.cond.notify_all()
+        if self._is_journal_mode():
+            self._check_compaction()
 
 
 def main():
@@ -12,15 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import json
+import collections
 import time
 import requests
+from requests.packages.urllib3.util import retry
 
 from cmframework.apis import cmerror
 from cmframework.apis import cmchangestate
 
 
 class CMClientImpl(object):
-    def __init__(self, server_ip, server_port, verbose_logger):
+    # the seconds one request waits for a change to finish
+    CHANGE_WAIT = 30
+    # the number of properties read with one request when iterating
+    PAGE_SIZE = 500
+    # the maximum number of the cached GET replies
+    CACHE_SIZE = 256
+    # the seconds to wait for connecting to the server
+    CONNECT_TIMEOUT = 10.0
+    # the seconds to wait for the server to send data, long enough for the
+    # validation of big changes
+    READ_TIMEOUT = 300.0
+    # the number of times a failed connect or read-only GET is retried
+    RETRIES = 3
+    # the base of the exponential delay between the retries in seconds
+    RETRY_BACKOFF = 0.5
+    # the maximum number of pooled connections
+    POOL_SIZE = 10
+
+    def __init__(self, server_ip, server_port, verbose_logger,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, retries=RETRIES,
+                 pool_size=POOL_SIZE):
         self.version = 'v1.0'
         self.server_ip = server_ip
         self.server_port = server_port
@@ -31,7 +53,24 @@ class CMClientImpl(object):
         self.activator_url = str.format('{base}/activator', base=base_url)
         self.reboot_url = str.format('{base}/reboot', base=base_url)
         self.changes_url = str.format('{base}/changes', base=base_url)
+        self.watch_url = str.format('{base}/watch', base=base_url)
+        self.batch_url = str.format('{base}/batch', base=base_url)
         self.verbose_logger = verbose_logger
+        # url -> (etag, reply) of the last GET replies with an etag
+        self.cache = collections.OrderedDict()
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size, pool_block=True,
+                                                     max_retries=self._get_retry(retries))
+        # the GETs having side effects are not retried after the request may
+        # have reached the server, a lost reply would repeat the action
+        self.side_effect_adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=pool_size, pool_block=True,
+            max_retries=self._get_retry(retries, idempotent=False))
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        for url in (self.snapshots_base_url + '/', self.activator_url + '/agent/',
+                    self.reboot_url):
+            self.session.mount(url, self.side_effect_adapter)
 
     def get_property(self, prop_name, snapshot_name=None):
         resource = str.format('{base}/{prop}', base=self.props_base_url, prop=prop_name)
@@ -70,6 +109,47 @@ class CMClientImpl(object):
             raise cmerror.CMError(str(exp))
         return props
 
+    def iter_properties(self, prop_filter, snapshot_name=None, page_size=PAGE_SIZE,
+                        names_only=False, max_value_bytes=None):
+        resource = str.format('{base}?prop-name-filter={f}',
+                              base=self.props_base_url, f=prop_filter)
+        if page_size is not None:
+            resource = str.format('{}&limit={limit}', resource, limit=page_size)
+        if snapshot_name:
+            resource = str.format('{}&snapshot={snapshot}', resource, snapshot=snapshot_name)
+        if names_only:
+            resource += '&names-only=true'
+        if max_value_bytes is not None:
+            resource = str.format('{}&max-value-bytes={size}', resource, size=max_value_bytes)
+        cursor = None
+        while True:
+            if cursor is None:
+                page_resource = resource
+            else:
+                page_resource = str.format('{}&cursor={cursor}', resource, cursor=cursor)
+            result = self._get_rpc(page_resource)
+            try:
+                for item in result['properties']:
+                    yield item['name'], item.get('value')
+                cursor = result.get('next-cursor')
+            except (KeyError, TypeError, AttributeError):
+                raise cmerror.CMError('Invalid response')
+            if not cursor:
+                return
+
+    def get_changed_properties(self, since_csn, prop_filter):
+        resource = str.format('{base}?prop-name-filter={f}&since-csn={csn}',
+                              base=self.props_base_url, f=prop_filter, csn=since_csn)
+        result = self._get_rpc(resource)
+        try:
+            csn = result['csn']
+            if result.get('resync', False):
+                return csn, None, None
+            props = {item['name']: item['value'] for item in result['properties']}
+            return csn, props, result['deleted']
+        except (KeyError, TypeError):
+            raise cmerror.CMError('Invalid response')
+
     def set_property(self, prop_name, prop_value):
         resource = str.format('{base}/{prop}', base=self.props_base_url, prop=prop_name)
         body = {}
@@ -88,6 +168,10 @@ class CMClientImpl(object):
         body['overwrite'] = overwrite
         body['properties'] = items
         result = self._post_rpc(self.props_base_url, body)
+        if 'diff' in result:
+            self.verbose_log('Added %d, changed %d and deleted %d properties' %
+                             (len(result['diff']['added']), len(result['diff']['changed']),
+                              len(result['diff']['deleted'])))
         return result['change-uuid']
 
     def delete_property(self, prop_name):
@@ -107,6 +191,13 @@ class CMClientImpl(object):
             result = self._delete_rpc(resource, body)
         return result['change-uuid']
 
+    def batch(self, operations):
+        result = self._post_rpc(self.batch_url, {'operations': operations})
+        try:
+            return result['change-uuid'], result['results']
+        except (KeyError, TypeError):
+            raise cmerror.CMError('Invalid response')
+
     def create_snapshot(self, snapshot_name):
         resource = str.format('{base}/{snapshot}',
                               base=self.snapshots_base_url,
@@ -131,11 +222,13 @@ class CMClientImpl(object):
 
         return result['snapshots']
 
-    def activate(self, node_name):
+    def activate(self, node_name, force=False):
         if not node_name:
             resource = str.format('{base}', base=self.activator_url)
         else:
             resource = str.format('{base}/{node}', base=self.activator_url, node=node_name)
+        if force:
+            resource += '?force=true'
         result = self._post_rpc(resource, None)
 
         return result['change-uuid']
@@ -186,15 +279,18 @@ class CMClientImpl(object):
         self.verbose_log('Waiting for activation (%s) to finish' % change_uuid)
         state = None
         failed_plugins = None
+        # the server replies when the change is finished or the wait time
+        # has passed
+        resource = str.format('{base}/{change_uuid}?wait={wait}', base=self.changes_url,
+                              change_uuid=change_uuid, wait=CMClientImpl.CHANGE_WAIT)
         while True:
             try:
-                changes = self.get_changes_states(change_uuid)
+                changes = self._get_rpc(resource)
                 state = changes[change_uuid]['state']
                 failed_plugins = changes[change_uuid]['failed-plugins']
                 self.verbose_log('State of change is %s' % state)
                 if state != cmchangestate.CM_CHANGE_STATE_ONGOING:
                     break
-                time.sleep(5)
             except Exception as exp:  # pylint: disable=broad-except
                 raise cmerror.CMError(str(exp))
 
@@ -202,14 +298,48 @@ class CMClientImpl(object):
             raise cmerror.CMError("Activation was unsuccessful! Failed plugins: {}"
                                   .format(failed_plugins))
 
+    def watch(self, prop_filter, since_csn=None):
+        resource = str.format('{base}?prop-name-filter={f}', base=self.watch_url, f=prop_filter)
+        if since_csn is not None:
+            resource = str.format('{}&since-csn={csn}', resource, csn=since_csn)
+        self.verbose_log('Sending GET %s' % resource)
+        response = None
+        try:
+            response = self._request('GET', resource, stream=True)
+            if not response.ok:
+                raise cmerror.CMError(response.reason)
+
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except (requests.RequestException, ValueError) as exp:
+            raise cmerror.CMError(str(exp))
+        finally:
+            if response is not None:
+                response.close()
+
     def verbose_log(self, msg):
         if self.verbose_logger:
             self.verbose_logger(msg)
 
     def _get_rpc(self, resource):
         self.verbose_log('Sending GET %s' % resource)
-        response = requests.get(resource)
-        return self._handle_response(response)
+        headers = {}
+        cached = self.cache.pop(resource, None)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+        response = self._request('GET', resource, headers=headers)
+        if cached and response.status_code == 304:
+            self.verbose_log('Got STATUS %s, using the cached reply' % response.reason)
+            self.cache[resource] = cached
+            return cached[1]
+        result = self._handle_response(response)
+        etag = response.headers.get('ETag')
+        if etag:
+            self.cache[resource] = (etag, result)
+            if len(self.cache) > CMClientImpl.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return result
 
     def _post_rpc(self, resource, body):
         self.verbose_log('Sending POST %s' % resource)
@@ -217,9 +347,9 @@ class CMClientImpl(object):
         if body:
             headers = {}
             headers['Content-type'] = 'application/json'
-            response = requests.post(resource, data=json.dumps(body), headers=headers)
+            response = self._request('POST', resource, data=json.dumps(body), headers=headers)
         else:
-            response = requests.post(resource)
+            response = self._request('POST', resource)
 
         return self._handle_response(response)
 
@@ -229,13 +359,40 @@ class CMClientImpl(object):
         if body:
             headers = {}
             headers['Content-type'] = 'application/json'
-            response = requests.delete(resource, data=json.dumps(body), headers=headers)
+            response = self._request('DELETE', resource, data=json.dumps(body),
+                                     headers=headers)
         else:
             headers = {}
             headers['Content-type'] = 'text'
-            response = requests.delete(resource)
+            response = self._request('DELETE', resource)
         return self._handle_response(response)
 
+    @staticmethod
+    def _get_retry(retries, idempotent=True):
+        # only the connect errors are retried for the other methods and the
+        # requests having side effects, the request has not reached the server
+        # then
+        kwargs = {'total': retries, 'connect': retries, 'read': 0,
+                  'backoff_factor': CMClientImpl.RETRY_BACKOFF}
+        if idempotent:
+            kwargs.update({'read': retries, 'status_forcelist': (502, 503, 504)})
+        # method_whitelist was renamed in urllib3 1.26
+        if hasattr(retry.Retry, 'DEFAULT_ALLOWED_METHODS'):
+            kwargs['allowed_methods'] = frozenset(['GET', 'HEAD'])
+        else:
+            kwargs['method_whitelist'] = frozenset(['GET', 'HEAD'])
+        return retry.Retry(**kwargs)
+
+    def _request(self, method, resource, **kwargs):
+        pool = self.session.get_adapter(resource).poolmanager.connection_from_url(resource)
+        connections = pool.num_connections
+        start = time.time()
+        response = self.session.request(method, resource, timeout=self.timeout, **kwargs)
+        self.verbose_log('%s %s took %.3f seconds on a %s connection' % (
+            method, resource, time.time() - start,
+            'new' if pool.num_connections > connections else 'reused'))
+        return response
+
     def _handle_response(self, response):
         self.verbose_log('Got STATUS %s' % response.reason)
         self.verbose_log('    CONTENT %s' % response.content)
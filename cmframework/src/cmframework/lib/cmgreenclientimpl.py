@@ -0,0 +1,91 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import eventlet
+
+from cmframework.apis import cmerror
+from cmframework.lib import cmclientimpl
+
+
+class CMGreenClientImpl(cmclientimpl.CMClientImpl):
+    """
+    Client library running many calls concurrently in eventlet green threads.
+
+    It has all the methods of CMClientImpl, a call blocks only the green
+    thread doing it. The connections to the server are pooled and kept alive,
+    so many calls can be done concurrently without a thread or a new
+    connection per call. The process has to be monkey patched by eventlet.
+    """
+
+    # the maximum number of concurrent calls and pooled connections
+    POOL_SIZE = 100
+
+    def __init__(self, server_ip, server_port, verbose_logger, pool_size=POOL_SIZE, **kwargs):
+        if not eventlet.patcher.is_monkey_patched('socket'):
+            raise cmerror.CMError('The green client needs a process monkey patched by eventlet')
+        cmclientimpl.CMClientImpl.__init__(self, server_ip, server_port, verbose_logger,
+                                           pool_size=pool_size, **kwargs)
+        self.pool = eventlet.GreenPool(pool_size)
+
+    def spawn(self, method, *args, **kwargs):
+        """start a call in a green thread
+
+           Arguments:
+
+           method: The name of the called method.
+
+           args, kwargs: The arguments of the method.
+
+           Return:
+
+           The GreenThread doing the call, its wait() returns the result of
+           the call or raises its exception.
+        """
+        return self.pool.spawn(getattr(self, method), *args, **kwargs)
+
+    def gather(self, calls):
+        """do calls concurrently
+
+           Arguments:
+
+           calls: A list of (method name, arguments tuple) tuples.
+
+           Return:
+
+           A list of the results of the calls in the same order.
+
+           Raise:
+
+           The exception of the first failed call in the list, after all the
+           calls have finished.
+        """
+        threads = [self.spawn(method, *args) for method, args in calls]
+        results = []
+        error = None
+        for thread in threads:
+            try:
+                results.append(thread.wait())
+            except Exception as exp:  # pylint: disable=broad-except
+                error = error or exp
+                results.append(None)
+        if error:
+            raise error
+        return results
+
+    def gather_properties(self, prop_filters):
+        """read the properties matching several filters concurrently"""
+        return self.gather([('get_properties', (prop_filter,)) for prop_filter in prop_filters])
+
+    def wait_activations(self, change_uuids):
+        """wait for several changes to be activated concurrently"""
+        return self.gather([('wait_activation', (change_uuid,)) for change_uuid in change_uuids])
@@ -19,6 +19,7 @@ from cmframework.apis.cmerror import CMError
 from cmframework.apis.cmmanage import CMManage
 from cmframework.utils.cmpluginloader import CMPluginLoader
 from cmframework.utils.cmdependencysort import CMDependencySort
+from cmframework.utils.cmdependencysort import read_dependency_file
 
 from cmdatahandlers.api.configmanager import ConfigManager
 from cmdatahandlers.api import utils
@@ -90,23 +91,7 @@ class CMUpdateImpl(object):
 
     @staticmethod
     def _read_dependency_file(file_name):
-        before_list = []
-        after_list = []
-
-        try:
-            with open(file_name, 'r') as deps_file:
-                while True:
-                    line = deps_file.readline()
-                    if not line:
-                        break
-                    if line.startswith('Before:'):
-                        before_list = line[7:].strip().replace(' ', '').split(',')
-                    if line.startswith('After:'):
-                        after_list = line[6:].strip().replace(' ', '').split(',')
-        except IOError:
-            logging.debug('Dependency file %s not found.', file_name)
-
-        return (before_list, after_list)
+        return read_dependency_file(file_name)
 
     def _load_dependencies(self):
         before_graph = {}
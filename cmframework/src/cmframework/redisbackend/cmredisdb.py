@@ -14,30 +14,95 @@
 # vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
 from __future__ import print_function
 from urlparse import urlparse
-import re
+from urlparse import parse_qs
 import time
+import random
+import logging
 import functools
+import threading
 import redis
 
 from cmframework.apis import cmerror
 from cmframework.apis import cmbackend
+from cmframework.utils import cmcircuitbreaker
+from cmframework.utils.cmkeyindex import get_literal_prefix
+from cmframework.utils.cmkeyindex import get_pattern
 
 
 def retry(func):
+    """retry the call on connection failures
+
+       The retries are done with exponential backoff and full jitter until the
+       retry deadline of the db is reached. The calls are rejected immediately
+       while the circuit breaker of the db is open.
+    """
     @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        for _ in xrange(20):
+    def wrapper(self, *args, **kwargs):
+        deadline = time.time() + self.options['retry_deadline']
+        delay = self.options['retry_delay']
+        while True:
+            self.breaker.check()
             try:
-                return func(*args, **kwargs)
-            except Exception, e:  # pylint: disable=broad-except
-                time.sleep(1)
-                retExc = e
-        raise retExc
+                result = func(self, *args, **kwargs)
+                self.breaker.success()
+                return result
+            except (redis.ConnectionError, redis.TimeoutError) as exp:
+                self.breaker.failure()
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.breaker.is_open():
+                    raise cmerror.CMError('{} failed: {}'.format(func.__name__, str(exp)))
+                logging.warning('%s failed with %s, retrying', func.__name__, str(exp))
+                time.sleep(min(random.uniform(0, delay), remaining))
+                delay = min(delay * 2, self.options['retry_max_delay'])
+            except redis.RedisError:
+                # the server answered, so it is available
+                self.breaker.success()
+                raise
+            except Exception:
+                self.breaker.cancel_trial()
+                raise
 
     return wrapper
 
 
+# characters having a special meaning in the redis glob syntax
+GLOB_SPECIAL_CHARS = '*?[]\\'
+
+
+def get_scan_glob(prop_filter):
+    """get the redis glob pattern used to narrow a SCAN for the filter"""
+    prefix = get_literal_prefix(prop_filter)
+    glob = ''.join('\\' + char if char in GLOB_SPECIAL_CHARS else char for char in prefix)
+    return glob + '*'
+
+
 class CMRedisDB(cmbackend.CMBackend):
+    # The options which can be given as query parameters in the db uri, the
+    # values are (type, default value)
+    OPTIONS = {
+        # the COUNT hint given to SCAN and the MGET batch size
+        'scan_count': (int, 1000),
+        # the size of the connection pool
+        'max_connections': (int, 50),
+        # the time to wait for a free connection in the pool
+        'pool_timeout': (float, 5.0),
+        'socket_timeout': (float, 5.0),
+        'socket_connect_timeout': (float, 2.0),
+        # the total time spent retrying a failing operation
+        'retry_deadline': (float, 20.0),
+        # the initial and maximum backoff between retries
+        'retry_delay': (float, 0.1),
+        'retry_max_delay': (float, 2.0),
+        # the consecutive failures after which the circuit breaker opens
+        'breaker_threshold': (int, 5),
+        # the time the circuit breaker stays open
+        'breaker_reset_timeout': (float, 10.0)
+    }
+
+    # The connection pools and circuit breakers are shared by all the db
+    # objects connecting to the same server
+    _connections = {}
+    _connections_lock = threading.Lock()
 
     def __init__(self, **kw):
         dburl = kw['uri']
@@ -45,12 +110,57 @@ class CMRedisDB(cmbackend.CMBackend):
         self.vip = urldata.hostname
         self.port = urldata.port
         self.password = urldata.password
-        self.client = redis.StrictRedis(host=self.vip, port=self.port, password=self.password)
+        self.options = CMRedisDB._parse_options(urldata.query)
+        self.scan_count = self.options['scan_count']
+        pool, self.breaker = self._get_connection()
+        self.client = redis.StrictRedis(connection_pool=pool)
+
+    @staticmethod
+    def _parse_options(query):
+        options = {}
+        values = parse_qs(query)
+        for name, (option_type, default) in CMRedisDB.OPTIONS.iteritems():
+            try:
+                options[name] = option_type(values.pop(name, [default])[0])
+            except ValueError:
+                raise cmerror.CMError('Invalid value for {} in backend uri'.format(name))
+        if values:
+            raise cmerror.CMError('Unknown option(s) {} in backend uri'.format(values.keys()))
+        return options
+
+    def _get_connection(self):
+        key = (self.vip, self.port, self.password,
+               tuple(sorted(self.options.iteritems())))
+        with CMRedisDB._connections_lock:
+            if key not in CMRedisDB._connections:
+                logging.info('Creating redis connection pool for %s:%s', self.vip, self.port)
+                pool = redis.BlockingConnectionPool(
+                    host=self.vip,
+                    port=self.port,
+                    password=self.password,
+                    max_connections=self.options['max_connections'],
+                    timeout=self.options['pool_timeout'],
+                    socket_timeout=self.options['socket_timeout'],
+                    socket_connect_timeout=self.options['socket_connect_timeout'])
+                breaker = cmcircuitbreaker.CMCircuitBreaker(
+                    'redis {}:{}'.format(self.vip, self.port),
+                    self.options['breaker_threshold'],
+                    self.options['breaker_reset_timeout'])
+                CMRedisDB._connections[key] = (pool, breaker)
+            return CMRedisDB._connections[key]
+
+    def get_circuit_state(self):
+        """get the state of the circuit breaker, closed, open or half-open"""
+        return self.breaker.get_state()
+
+    def get_stats(self):
+        return {'circuit': self.breaker.get_stats()}
 
     @retry
     def set_property(self, prop_name, prop_value):
         self.client.set(prop_name, prop_value)
 
+    @retry
     def get_property(self, prop_name):
         return self.client.get(prop_name)
 
@@ -65,16 +175,43 @@ class CMRedisDB(cmbackend.CMBackend):
             pipe.set(name, value)
         pipe.execute()
 
+    @retry
     def get_properties(self, prop_filter):
         # seems redis does not understand regex, it understands only glob
-        # patterns, thus we need to handle the matching by ourselves :/
-        keys = self.client.keys()
-        pattern = re.compile(prop_filter)
+        # patterns, thus we narrow the scan with the literal prefix of the
+        # filter and handle the rest of the matching by ourselves
+        pattern = get_pattern(prop_filter)
+        names = set()
+        for keys in self._scan(get_scan_glob(prop_filter)):
+            names.update(key for key in keys if pattern.match(key))
+
+        return self._get_values(sorted(names))
+
+    @retry
+    def get_properties_by_names(self, names):
+        return self._get_values(list(names))
+
+    def _scan(self, glob):
+        cursor = 0
+        while True:
+            cursor, keys = self.client.scan(cursor, match=glob, count=self.scan_count)
+            yield keys
+            if int(cursor) == 0:
+                break
+
+    def _get_values(self, names):
+        pipe = self.client.pipeline(transaction=False)
+        for i in xrange(0, len(names), self.scan_count):
+            pipe.mget(names[i:i + self.scan_count])
+
         props = {}
-        for key in keys:
-            if pattern.match(key):
-                value = self.client.get(key)
-                props[key] = value
+        index = 0
+        for values in pipe.execute():
+            for value in values:
+                # the key can be deleted after it was scanned
+                if value is not None:
+                    props[names[index]] = value
+                index += 1
         return props
 
     @retry
@@ -86,6 +223,17 @@ class CMRedisDB(cmbackend.CMBackend):
             pipe.delete(prop)
         pipe.execute()
 
+    @retry
+    def commit(self, properties, deleted):
+        # MULTI/EXEC, the deletes and sets are applied in one round trip and
+        # no other client sees the intermediate state
+        pipe = self.client.pipeline(transaction=True)
+        if deleted:
+            pipe.delete(*deleted)
+        if properties:
+            pipe.mset(properties)
+        pipe.execute()
+
 
 def main():
     import argparse
@@ -98,7 +246,9 @@ def main():
                         required=True,
                         dest='uri',
                         metavar='URI',
-                        help='The redis db uri format redis://:password@<ip>:port',
+                        help=('The redis db uri format '
+                              'redis://:password@<ip>:port[?<option>=<value>&...], '
+                              'the options are ' + ', '.join(sorted(CMRedisDB.OPTIONS))),
                         type=str,
                         action='store')
 
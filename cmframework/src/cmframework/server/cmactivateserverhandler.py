@@ -12,11 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import hashlib
+import json
 import time
+import os
+
+from eventlet import greenpool
 
 from cmframework.utils import cmpluginmanager
 from cmframework.utils import cmpluginloader
 from cmframework.utils import cmactivationwork
+from cmframework.utils import cmkeyindex
+from cmframework.utils import cmdependencysort
 
 from cmframework.apis import cmactivator
 from cmframework.server import cmactivatehandler
@@ -26,8 +33,13 @@ class CMActivateServerHandler(cmactivatehandler.CMActivateHandler,
                               cmpluginmanager.CMPluginManager,
                               cmpluginloader.CMPluginLoader.LoadingFilter):
 
-    def __init__(self, plugins_path, plugin_client, changemonitor, activationstate_handler):
+    def __init__(self, plugins_path, plugin_client, changemonitor, activationstate_handler,
+                 plugin_workers=1):
         cmpluginmanager.CMPluginManager.__init__(self, plugins_path)
+        # the plugins grouped into layers by their dependencies, the plugins
+        # of one layer are run in parallel by plugin_workers workers
+        self.plugin_layers = []
+        self.plugin_workers = plugin_workers
         self.load_plugin()
         self.plugin_client = plugin_client
         self.changemonitor = changemonitor
@@ -40,8 +52,26 @@ class CMActivateServerHandler(cmactivatehandler.CMActivateHandler,
     def load_plugin(self):
         plugin_filter = self
         pl = cmpluginloader.CMPluginLoader(self.plugins_path, plugin_filter)
-        self.pluginlist, self.filterdict = pl.load()
+        self.set_plugins(*pl.load())
         logging.info('pluginlist is %r', self.pluginlist)
+        self._load_dependencies()
+
+    def _load_dependencies(self):
+        before_graph = {}
+        after_graph = {}
+        for plugin in self.pluginlist:
+            deps_filename = '{}/{}.deps'.format(self.plugins_path, plugin)
+            before_list, after_list = cmdependencysort.read_dependency_file(deps_filename)
+            # the dependencies can refer to plugins run by the other handlers
+            before_graph[plugin] = [dep for dep in before_list if dep in self.pluginlist]
+            after_graph[plugin] = [dep for dep in after_list if dep in self.pluginlist]
+            ignored = set(before_list + after_list) - set(self.pluginlist)
+            if ignored:
+                logging.info('Ignoring dependencies %s of plugin %s', list(ignored), plugin)
+
+        sorter = cmdependencysort.CMDependencySort(after_graph, before_graph)
+        self.plugin_layers = sorter.sort_layers()
+        logging.info('Plugin layers are %r', self.plugin_layers)
 
     def activate_set(self, indata):
         return self._activate(indata, 'activate_set')
@@ -49,62 +79,118 @@ class CMActivateServerHandler(cmactivatehandler.CMActivateHandler,
     def activate_delete(self, indata):
         return self._activate(indata, 'activate_delete')
 
-    def activate_full(self, target_node, startup_activation=False):
-        return self._activate(target_node, 'activate_full', startup_activation)
-
-    def activate_node(self, target_node):
-        return self._activate(target_node, 'activate_full')
-
-    def _activate(self, indata, operation, startup_activation=False):
+    def activate_full(self, target_node, startup_activation=False, csn=None, force=False):
+        return self._activate(target_node, 'activate_full', startup_activation, csn, force)
+
+    def activate_node(self, target_node, csn=None, force=False):
+        return self._activate(target_node, 'activate_full', False, csn, force)
+
+    def _get_current_data(self):
+        # the data of the full activation, used to find the plugins whose data
+        # has not changed since their last full activation
+        try:
+            properties = self.plugin_client.get_properties('.*')
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.warning('Could not read the properties, running all plugins: %s', str(exp))
+            return None
+        return properties, cmkeyindex.CMKeyIndex(properties)
+
+    def _get_digest(self, plugin, current_data):
+        filtername = self.filterdict.get(plugin)
+        if not current_data or not filtername:
+            return None
+        properties, keyindex = current_data
+        subset = self.build_input(properties, filtername, keyindex)
+        try:
+            # the plugin has to be run again if it has been updated
+            version = os.path.getmtime('{}/{}.py'.format(self.plugins_path, plugin))
+        except OSError:
+            version = None
+        data = json.dumps([version, sorted(subset.iteritems())])
+        return hashlib.sha256(data).hexdigest()
+
+    def _activate(self, indata, operation, startup_activation=False, csn=None, force=False):
         logging.info('%s called with %s', operation, indata)
         failures = {}
-        for plugin, objectname in self.pluginlist.iteritems():
-            logging.info('Running plugin %s.%s', plugin, operation)
-            func = None
-            try:
-                class_name = getattr(objectname, plugin)
-                instance = class_name()
-                instance.plugin_client = self.plugin_client
-                func = getattr(instance, operation)
-                if operation != 'activate_full':
-                    filtername = self.filterdict[plugin]
-                    inputdata = self.build_input(indata, filtername)
-
-                    if not inputdata:
-                        logging.info('Skipping plugin %s as no input data is to be processed by it',
-                                     plugin)
-                        continue
-
-                    start_time = time.time()
-                    func(inputdata)
-                    logging.info('Plugin %s.%s took %s seconds', plugin, operation,
-                                 time.time() - start_time)
-                else:
-                    if startup_activation:
-                        if plugin not in self.activationstate_handler.get_full_failed():
-                            logging.info('Skipping plugin %s during startup as '
-                                         'it has not failed in last activation', plugin)
-                            continue
-
-                    start_time = time.time()
-                    func(indata)
-                    logging.info('Plugin %s.%s took %s seconds', plugin, operation,
-                                 time.time() - start_time)
-            except AttributeError as exp:
-                logging.info('Plugin %s does not have %s defined', plugin, operation)
-                logging.info(str(exp))
-                failures[str(plugin)] = 'Plugin does not have {} defined'.format(operation)
-                continue
-            except Exception as exp:  # pylint: disable=broad-except
-                failures[str(plugin)] = str(exp)
-                logging.error('Skipping %s, got exception %s', plugin, str(exp))
-                failures[str(plugin)] = str(exp)
-                continue
+        inputs = None
+        current_data = None
+        if operation != 'activate_full':
+            inputs = self.dispatch(indata)
+        else:
+            current_data = self._get_current_data()
+        pool = greenpool.GreenPool(self.plugin_workers)
+        for layer in self.plugin_layers:
+            for plugin in layer:
+                pool.spawn_n(self._activate_plugin, plugin, indata, operation,
+                             startup_activation, inputs, failures, csn, force, current_data)
+            # the next layer depends on the plugins of this one
+            pool.waitall()
 
         logging.info('%s done with %s', operation, indata)
 
         return failures
 
+    def _activate_plugin(self, plugin, indata, operation, startup_activation, inputs,
+                         failures, csn=None, force=False, current_data=None):
+        logging.info('Running plugin %s.%s', plugin, operation)
+        digest = None
+        func = None
+        try:
+            func = getattr(self.create_instance(plugin), operation)
+            if operation != 'activate_full':
+                inputdata = inputs.get(plugin)
+
+                if not inputdata:
+                    logging.info('Skipping plugin %s as no input data is to be processed by it',
+                                 plugin)
+                    return
+
+                start_time = time.time()
+                func(inputdata)
+                logging.info('Plugin %s.%s took %s seconds', plugin, operation,
+                             time.time() - start_time)
+            else:
+                if startup_activation:
+                    if plugin not in self.activationstate_handler.get_full_failed():
+                        logging.info('Skipping plugin %s during startup as '
+                                     'it has not failed in last activation', plugin)
+                        return
+
+                digest = self._get_digest(plugin, current_data)
+                if not force and not startup_activation and digest:
+                    watermark = self.activationstate_handler.get_watermark(plugin, indata)
+                    if watermark and watermark['hash'] == digest:
+                        logging.info('Skipping plugin %s as its data has not changed since '
+                                     'its activation at csn %s', plugin, watermark['csn'])
+                        return
+
+                start_time = time.time()
+                func(indata)
+                logging.info('Plugin %s.%s took %s seconds', plugin, operation,
+                             time.time() - start_time)
+        except AttributeError as exp:
+            logging.info('Plugin %s does not have %s defined', plugin, operation)
+            logging.info(str(exp))
+            failures[str(plugin)] = 'Plugin does not have {} defined'.format(operation)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.error('Skipping %s, got exception %s', plugin, str(exp))
+            failures[str(plugin)] = str(exp)
+
+        self._update_watermark(plugin, operation, indata, csn, digest, plugin not in failures)
+
+    def _update_watermark(self, plugin, operation, target, csn, digest, succeeded):
+        try:
+            if operation != 'activate_full':
+                if not succeeded:
+                    # the data of the plugin is not fully applied on any node
+                    self.activationstate_handler.clear_all_watermarks(plugin)
+            elif succeeded and digest:
+                self.activationstate_handler.set_watermark(plugin, target, csn, digest)
+            elif not succeeded:
+                self.activationstate_handler.clear_watermark(plugin, target)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.warning('Updating the watermark of %s failed: %s', plugin, str(exp))
+
     def activate(self, work):
         logging.debug('CMAcivateServerHandler activating %s', work)
         failures = {}
@@ -114,16 +200,17 @@ class CMActivateServerHandler(cmactivatehandler.CMActivateHandler,
             failures = self.activate_delete(work.get_props())
         elif work.get_operation() == cmactivationwork.CMActivationWork.OPER_FULL:
             startup_activation = work.is_startup_activation()
-            failures = self.activate_full(work.get_target(), startup_activation)
+            failures = self.activate_full(work.get_target(), startup_activation,
+                                          work.get_csn(), work.is_forced())
         elif work.get_operation() == cmactivationwork.CMActivationWork.OPER_NODE:
-            failures = self.activate_node(work.get_target())
+            failures = self.activate_node(work.get_target(), work.get_csn(), work.is_forced())
         else:
             logging.error('Unsupported activation operation %s', work.get_operation())
 
-        if work.uuid_value:
+        for uuid_value in work.get_uuids():
             if failures:
-                self.changemonitor.change_nok(work.uuid_value, failures)
+                self.changemonitor.change_nok(uuid_value, failures)
             else:
-                self.changemonitor.change_ok(work.uuid_value)
+                self.changemonitor.change_ok(uuid_value)
 
         return failures
@@ -12,19 +12,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from Queue import Queue
+from threading import Condition
+import collections
+import logging
+import time
 
 from cmframework.server import cmeventletrwlock
 from cmframework.server import cmactivatorworker
+from cmframework.utils import cmactivationwork
 
 
 class CMActivator(object):
-    def __init__(self, worker_count):
-        self.works = Queue()
+    """
+    Queue the activation works for the workers.
+
+    The SET and DELETE works waiting in the queue are merged into one work
+    when a worker takes them, so a burst of changes is activated in one
+    round. The merged work has the latest values and the highest csn of the
+    merged works and carries all their change uuids. Only works of the same
+    operation following each other are merged so that the changes are
+    activated in the order they were done.
+
+    If debounce_window is given the worker waits that many seconds after the
+    first work so that the works added meanwhile are merged into it.
+    """
+
+    MERGED_OPERATIONS = (cmactivationwork.CMActivationWork.OPER_SET,
+                         cmactivationwork.CMActivationWork.OPER_DELETE)
+
+    def __init__(self, worker_count, debounce_window=0.0):
+        self.works = collections.deque()
+        self.works_condition = Condition()
         self.node_works = Queue()
         self.handlers = []
         self.workers = []
         self.worker_count = worker_count
-        self.lock = cmeventletrwlock.CMEventletRWLock()
+        self.debounce_window = debounce_window
+        self.lock = cmeventletrwlock.CMEventletRWLock('activator')
 
     def add_handler(self, handler):
         self.handlers.append(handler)
@@ -33,12 +57,63 @@ class CMActivator(object):
         return self.node_works.get()
 
     def get_work(self):
-        return self.works.get()
+        with self.works_condition:
+            while not self.works:
+                self.works_condition.wait()
+            operation = self.works[0].get_operation()
+
+        if operation not in CMActivator.MERGED_OPERATIONS:
+            with self.works_condition:
+                return self.works.popleft()
+
+        if self.debounce_window:
+            time.sleep(self.debounce_window)
+
+        with self.works_condition:
+            works = [self.works.popleft()]
+            while self.works and self.works[0].get_operation() == operation:
+                works.append(self.works.popleft())
+
+        if len(works) == 1:
+            return works[0]
+        return CMActivator._merge_works(works)
+
+    @staticmethod
+    def _merge_works(works):
+        logging.info('Merging %d activation works', len(works))
+        operation = works[0].get_operation()
+        if operation == cmactivationwork.CMActivationWork.OPER_SET:
+            props = {}
+            for work in works:
+                props.update(work.get_props())
+        else:
+            props = []
+            seen = set()
+            for work in works:
+                for name in work.get_props():
+                    if name not in seen:
+                        seen.add(name)
+                        props.append(name)
+
+        merged = cmactivationwork.CMActivationWork(operation,
+                                                   max(work.get_csn() for work in works),
+                                                   props)
+        # the constructor takes the condition for the thread adding the work,
+        # the merged work is not added so it is released here
+        merged.release()
+        merged.merged_works = works
+        uuids = [work.uuid_value for work in works if work.uuid_value]
+        if uuids:
+            merged.uuid_value = uuids[0]
+            merged.merged_uuids = uuids[1:]
+        return merged
 
     def add_work(self, work):
         work.release()
         if not work.get_target():
-            self.works.put(work)
+            with self.works_condition:
+                self.works.append(work)
+                self.works_condition.notify()
         else:
             self.node_works.put(work)
 
@@ -34,9 +34,13 @@ class CMArgsParser(object):
         self.rmq_port = None
         self.activators = None
         self.validators = None
+        self.validator_workers = 1
+        self.validator_timeout = 0.0
         self.rmq_ip = None
         self.backend_uri = None
         self.backend_api = None
+        self.backend_cache_size = 0
+        self.backend_cache_check_interval = 1.0
         self.filename = None
         self.inventory_handlers = None
         self.inventory_data = None
@@ -44,6 +48,13 @@ class CMArgsParser(object):
         self.activationstate_handler_uri = None
         self.activationstate_handler_api = None
         self.activator_workers = 1
+        self.activation_debounce_window = 0.0
+        self.activator_plugin_workers = 1
+        self.change_history_size = 1000
+        self.change_history_ttl = 86400.0
+        self.persist_change_states = False
+        self.watch_buffer_size = 10000
+        self.max_request_size = 67108864
         self.snapshot_handler_uri = None
         self.snapshot_handler_api = None
         self.alarmhandler_api = None
@@ -81,6 +92,17 @@ class CMArgsParser(object):
              'verbose': repr(self.verbose),
              'disable_remote_activation': repr(self.disable_remote_activation),
              'activator_workers': '10',
+             'activation_debounce_window': '0.0',
+             'activator_plugin_workers': '1',
+             'validator_workers': '1',
+             'validator_timeout': '0.0',
+             'change_history_size': '1000',
+             'change_history_ttl': '86400.0',
+             'persist_change_states': 'False',
+             'watch_buffer_size': '10000',
+             'max_request_size': '67108864',
+             'backend_cache_size': '0',
+             'backend_cache_check_interval': '1.0',
              'alarmhandler_api': 'cmframework.lib.cmalarmhandler_dummy.AlarmHandler_Dummy',
              'snapshot_handler_api': ''})
         try:
@@ -89,10 +111,15 @@ class CMArgsParser(object):
             self.port = config.getint('cmserver', 'port')
             self.backend_api = config.get('cmserver', 'backend_api')
             self.backend_uri = config.get('cmserver', 'backend_uri')
+            self.backend_cache_size = config.getint('cmserver', 'backend_cache_size')
+            self.backend_cache_check_interval = config.getfloat('cmserver',
+                                                                'backend_cache_check_interval')
             self.verbose = config.getboolean('cmserver', 'verbose')
             self.log_level = cmlogger.CMLogger.str_to_level(config.get('cmserver', 'log_level'))
             self.log_dest = cmlogger.CMLogger.str_to_dest(config.get('cmserver', 'log_dest'))
             self.validators = CMArgsParser.dir_parser(config.get('cmserver', 'validators'))
+            self.validator_workers = config.getint('cmserver', 'validator_workers')
+            self.validator_timeout = config.getfloat('cmserver', 'validator_timeout')
             self.activators = CMArgsParser.dir_parser(config.get('cmserver', 'activators'))
             self.disable_remote_activation = \
                 config.getboolean('cmserver', 'disable_remote_activation')
@@ -106,6 +133,14 @@ class CMArgsParser(object):
             self.activationstate_handler_uri = config.get('cmserver', 'activationstate_handler_uri')
             self.activationstate_handler_api = config.get('cmserver', 'activationstate_handler_api')
             self.activator_workers = config.getint('cmserver', 'activator_workers')
+            self.activation_debounce_window = config.getfloat('cmserver',
+                                                              'activation_debounce_window')
+            self.activator_plugin_workers = config.getint('cmserver', 'activator_plugin_workers')
+            self.change_history_size = config.getint('cmserver', 'change_history_size')
+            self.change_history_ttl = config.getfloat('cmserver', 'change_history_ttl')
+            self.persist_change_states = config.getboolean('cmserver', 'persist_change_states')
+            self.watch_buffer_size = config.getint('cmserver', 'watch_buffer_size')
+            self.max_request_size = config.getint('cmserver', 'max_request_size')
             self.snapshot_handler_uri = config.get('cmserver', 'snapshot_handler_uri')
             self.snapshot_handler_api = config.get('cmserver', 'snapshot_handler_api')
             self.alarmhandler_api = config.get('cmserver', 'alarmhandler_api')
@@ -143,6 +178,24 @@ class CMArgsParser(object):
                             help='The uri needed by the backend api',
                             type=str, action='store')
 
+        parser.add_argument('--backend-cache-size',
+                            dest='backend_cache_size',
+                            metavar='BACKEND-CACHE-SIZE',
+                            required=False,
+                            default=0,
+                            help='The number of properties cached in memory, 0 disables the cache',
+                            type=int,
+                            action='store')
+
+        parser.add_argument('--backend-cache-check-interval',
+                            dest='backend_cache_check_interval',
+                            metavar='BACKEND-CACHE-CHECK-INTERVAL',
+                            required=False,
+                            default=1.0,
+                            help='The seconds after which the cache is checked against the backend',
+                            type=float,
+                            action='store')
+
         parser.add_argument('--log-level',
                             dest='log_level',
                             metavar='LOG-LEVEL',
@@ -177,6 +230,28 @@ class CMArgsParser(object):
                             type=CMArgsParser.dir_parser,
                             action='store')
 
+        parser.add_argument('--validator-workers',
+                            dest='validator_workers',
+                            metavar='VALIDATOR-WORKERS',
+                            required=False,
+                            default=1,
+                            help=('Number of validation plugins run in parallel, with more than '
+                                  'one all the rejections of a change are reported'),
+                            type=int,
+                            action='store')
+
+        parser.add_argument('--validator-timeout',
+                            dest='validator_timeout',
+                            metavar='VALIDATOR-TIMEOUT',
+                            required=False,
+                            default=0.0,
+                            help=('The seconds a validation plugin can use for validating a '
+                                  'change, 0 means no limit. The limit is checked only when '
+                                  'the plugin waits for I/O through eventlet, a plugin busy '
+                                  'with the CPU or blocking in unpatched I/O is not stopped'),
+                            type=float,
+                            action='store')
+
         parser.add_argument('--activators',
                             dest='activators',
                             metavar='ACTIVATORS-PATH',
@@ -255,6 +330,68 @@ class CMArgsParser(object):
                             type=int,
                             action='store')
 
+        parser.add_argument('--activation-debounce-window',
+                            dest='activation_debounce_window',
+                            metavar='ACTIVATION-DEBOUNCE-WINDOW',
+                            required=False,
+                            default=0.0,
+                            help='The seconds to wait for further changes before activating',
+                            type=float,
+                            action='store')
+
+        parser.add_argument('--activator-plugin-workers',
+                            dest='activator_plugin_workers',
+                            metavar='ACTIVATOR-PLUGIN-WORKERS',
+                            required=False,
+                            default=1,
+                            help='Number of activator plugins run in parallel',
+                            type=int,
+                            action='store')
+
+        parser.add_argument('--change-history-size',
+                            dest='change_history_size',
+                            metavar='CHANGE-HISTORY-SIZE',
+                            required=False,
+                            default=1000,
+                            help='The maximum number of changes whose state is remembered',
+                            type=int,
+                            action='store')
+
+        parser.add_argument('--change-history-ttl',
+                            dest='change_history_ttl',
+                            metavar='CHANGE-HISTORY-TTL',
+                            required=False,
+                            default=86400.0,
+                            help='The seconds the state of a change is remembered',
+                            type=float,
+                            action='store')
+
+        parser.add_argument('--persist-change-states',
+                            dest='persist_change_states',
+                            required=False,
+                            default=False,
+                            help=('Store the change states and the change journal with the '
+                                  'activation state handler'),
+                            action='store_true')
+
+        parser.add_argument('--watch-buffer-size',
+                            dest='watch_buffer_size',
+                            metavar='WATCH-BUFFER-SIZE',
+                            required=False,
+                            default=10000,
+                            help='The number of latest property changes kept for the watchers',
+                            type=int,
+                            action='store')
+
+        parser.add_argument('--max-request-size',
+                            dest='max_request_size',
+                            metavar='MAX-REQUEST-SIZE',
+                            required=False,
+                            default=67108864,
+                            help='The maximum size of a request body in bytes',
+                            type=int,
+                            action='store')
+
         parser.add_argument('--snapshot-handler-api',
                             dest='snapshot_handler_api',
                             metavar='SNAPSHOT-HANDLER-API',
@@ -285,10 +422,14 @@ class CMArgsParser(object):
             self.port = args.port
             self.backend_api = args.backend_api
             self.backend_uri = args.backend_uri
+            self.backend_cache_size = args.backend_cache_size
+            self.backend_cache_check_interval = args.backend_cache_check_interval
             self.verbose = args.verbose
             self.log_level = args.log_level
             self.log_dest = args.log_dest
             self.validators = args.validators
+            self.validator_workers = args.validator_workers
+            self.validator_timeout = args.validator_timeout
             self.activators = args.activators
             self.disable_remote_activation = args.disable_remote_activation
             if not self.disable_remote_activation:
@@ -300,6 +441,13 @@ class CMArgsParser(object):
             self.activationstate_handler_api = args.activationstate_handler_api
             self.activationstate_handler_uri = args.activationstate_handler_uri
             self.activator_workers = args.activator_workers
+            self.activation_debounce_window = args.activation_debounce_window
+            self.activator_plugin_workers = args.activator_plugin_workers
+            self.change_history_size = args.change_history_size
+            self.change_history_ttl = args.change_history_ttl
+            self.persist_change_states = args.persist_change_states
+            self.watch_buffer_size = args.watch_buffer_size
+            self.max_request_size = args.max_request_size
             self.snapshot_handler_api = args.snapshot_handler_api
             self.snapshot_handler_uri = args.snapshot_handler_uri
             self.alarmhandler_api = args.alarmhandler_api
@@ -338,6 +486,12 @@ class CMArgsParser(object):
     def get_backend_uri(self):
         return self.backend_uri
 
+    def get_backend_cache_size(self):
+        return self.backend_cache_size
+
+    def get_backend_cache_check_interval(self):
+        return self.backend_cache_check_interval
+
     def get_log_level(self):
         return self.log_level
 
@@ -350,6 +504,12 @@ class CMArgsParser(object):
     def get_validators(self):
         return self.validators
 
+    def get_validator_workers(self):
+        return self.validator_workers
+
+    def get_validator_timeout(self):
+        return self.validator_timeout
+
     def get_activators(self):
         return self.activators
 
@@ -380,6 +540,27 @@ class CMArgsParser(object):
     def get_activator_workers(self):
         return self.activator_workers
 
+    def get_activation_debounce_window(self):
+        return self.activation_debounce_window
+
+    def get_activator_plugin_workers(self):
+        return self.activator_plugin_workers
+
+    def get_change_history_size(self):
+        return self.change_history_size
+
+    def get_change_history_ttl(self):
+        return self.change_history_ttl
+
+    def get_persist_change_states(self):
+        return self.persist_change_states
+
+    def get_watch_buffer_size(self):
+        return self.watch_buffer_size
+
+    def get_max_request_size(self):
+        return self.max_request_size
+
     def get_snapshot_handler_api(self):
         return self.snapshot_handler_api
 
@@ -402,6 +583,8 @@ def main():
         print 'log-dest = %s' % cmlogger.CMLogger.dest_to_str(cm_parser.get_log_dest())
         print 'verbose = %s' % repr(cm_parser.get_verbose())
         print 'validators = %s' % repr(cm_parser.get_validators())
+        print 'validator-workers = %s' % repr(cm_parser.get_validator_workers())
+        print 'validator-timeout = %s' % repr(cm_parser.get_validator_timeout())
         print 'activators = %s' % repr(cm_parser.get_activators())
         print 'rmq-ip = %s' % repr(cm_parser.get_rmq_ip())
         print 'rmq-port = %s' % repr(cm_parser.get_rmq_port())
@@ -411,6 +594,7 @@ def main():
         print 'activationstate-handler-api = %s' % repr(cm_parser.get_activationstate_handler_api())
         print 'activationstate-handler-uri = %s' % repr(cm_parser.get_activationstate_handler_uri())
         print 'activator-workers = %s' % repr(cm_parser.get_activator_workers())
+        print 'max-request-size = %s' % repr(cm_parser.get_max_request_size())
         print 'snapshot-handler-api = %s' % repr(cm_parser.get_snapshot_handler_api())
         print 'snapshot-handler-uri = %s' % repr(cm_parser.get_snapshot_handler_uri())
         print 'alarmhandler-api = %s' % cm_parser.get_alarmhandler_api()
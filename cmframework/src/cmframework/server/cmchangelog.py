@@ -0,0 +1,121 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import threading
+
+from eventlet import event
+
+from cmframework.utils import cmkeyindex
+
+
+class CMChangeLog(object):
+    """
+    Ring buffer of the latest property changes.
+
+    Every event is a dictionary with the csn of the change, the name of the
+    property and either its new value or deleted set to True. The changes are
+    recorded when they are committed by the processor, which is also the
+    recorder of the writes done by the plugins. When the buffer is full the
+    oldest events are dropped, the readers asking for changes after a csn
+    whose events have been dropped have to read the whole configuration again
+    (resync).
+    """
+
+    MAX_EVENTS = 10000
+
+    def __init__(self, csn, max_events=MAX_EVENTS):
+        """
+        Arguments:
+
+        csn: The current csn, the changes done before it are not known.
+
+        max_events: The maximum number of events kept.
+        """
+        self.events = collections.deque()
+        self.max_events = max_events
+        self.lock = threading.Lock()
+        # the events up to this csn are not (all) in the buffer
+        self.lost_csn = csn
+        self.csn = csn
+        self.new_events = event.Event()
+
+    def record(self, csn, props, deleted):
+        """add the events of a change
+
+           Arguments:
+
+           csn: The csn of the change.
+
+           props: A dictionary of the set properties.
+
+           deleted: A list of the deleted property names.
+        """
+        with self.lock:
+            for name in sorted(deleted):
+                self.events.append({'csn': csn, 'name': name, 'deleted': True})
+            for name, value in sorted(props.iteritems()):
+                self.events.append({'csn': csn, 'name': name, 'value': value})
+            while len(self.events) > self.max_events:
+                self.lost_csn = max(self.lost_csn, self.events.popleft()['csn'])
+            self.csn = csn
+            new_events, self.new_events = self.new_events, event.Event()
+        new_events.send()
+
+    def reset(self, csn):
+        """forget the events, used when the whole configuration is replaced"""
+        with self.lock:
+            self.events.clear()
+            self.lost_csn = csn
+            self.csn = csn
+            new_events, self.new_events = self.new_events, event.Event()
+        new_events.send()
+
+    def get_csn(self):
+        return self.csn
+
+    def get_events(self, since_csn, prop_filter='.*'):
+        """get the events of the changes done after a csn
+
+           Arguments:
+
+           since_csn: The csn up to which the changes are already known.
+
+           prop_filter: The re matching the names of the returned events.
+
+           Return:
+
+           A (events, csn) tuple, csn is the csn of the last change. The events
+           is None if they are not available anymore and a resync is needed.
+        """
+        pattern = cmkeyindex.get_pattern(prop_filter)
+        with self.lock:
+            if since_csn < self.lost_csn or since_csn > self.csn:
+                return None, self.csn
+            # the events are in csn order, only the new ones are looked at
+            events = []
+            for item in reversed(self.events):
+                if item['csn'] <= since_csn:
+                    break
+                if pattern.match(item['name']):
+                    events.append(item)
+            events.reverse()
+            return events, self.csn
+
+    def wait(self, since_csn, timeout):
+        """wait at most timeout seconds for a change after since_csn"""
+        with self.lock:
+            if self.csn != since_csn:
+                return
+            new_events = self.new_events
+        new_events.wait(timeout)
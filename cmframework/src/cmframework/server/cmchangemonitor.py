@@ -11,44 +11,157 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-
 import logging
 import uuid
-import copy
+import time
+import collections
+
+from eventlet import event
+
 from cmframework.apis import cmchangestate
 from cmframework.server import cmeventletrwlock
 
 
 class CMChangeMonitorState(object):
-    def __init__(self):
+    def __init__(self, parts=1):
         self.state = cmchangestate.CM_CHANGE_STATE_ONGOING
         self.failed_plugins = {}
+        # the number of activations still running for the change
+        self.pending_parts = parts
+        self.failed = False
+        # the time the change was started or finished
+        self.updated = time.time()
+        self.finished = event.Event()
+
+    def get_info(self):
+        return {'state': self.state, 'failed-plugins': dict(self.failed_plugins)}
 
 
 class CMChangeMonitor(object):
-    def __init__(self):
-        self.changes = {}
-        self.lock = cmeventletrwlock.CMEventletRWLock()
+    """
+    Track the states of the changes.
+
+    At most max_changes changes are remembered, the oldest finished changes
+    are forgotten first. The finished changes not updated in ttl seconds are
+    forgotten too. The ongoing changes are never forgotten, so there can be
+    more than max_changes changes while they are all ongoing. If a state
+    handler is given, the states are stored with it and the
+    changes ongoing when the server stopped are reported failed after a
+    restart.
+    """
+
+    MAX_CHANGES = 1000
+    TTL = 24 * 3600
+
+    def __init__(self, max_changes=MAX_CHANGES, ttl=TTL, state_handler=None):
+        self.changes = collections.OrderedDict()
+        self.lock = cmeventletrwlock.CMEventletRWLock('changemonitor')
+        self.max_changes = max_changes
+        self.ttl = ttl
+        self.state_handler = state_handler
+        if self.state_handler:
+            self._load()
+
+    def _load(self):
+        try:
+            states = self.state_handler.get_change_states()
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.warning('Reading the change states failed: %s', str(exp))
+            return
+
+        for uuid_value, info in sorted(states.iteritems(), key=lambda item: item[1]['updated']):
+            changestate = CMChangeMonitorState(0)
+            changestate.state = info['state']
+            changestate.failed_plugins = info['failed-plugins']
+            changestate.updated = info['updated']
+            if changestate.state == cmchangestate.CM_CHANGE_STATE_ONGOING:
+                changestate.state = cmchangestate.CM_CHANGE_STATE_NOK
+                changestate.failed_plugins['cmserver'] = \
+                    'The server was restarted during the activation'
+                self._store(uuid_value, changestate)
+            changestate.finished.send()
+            self.changes[uuid_value] = changestate
+        self._evict()
+
+    def _store(self, uuid_value, changestate):
+        if not self.state_handler:
+            return
+        info = changestate.get_info()
+        info['updated'] = changestate.updated
+        try:
+            self.state_handler.set_change_state(uuid_value, info)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.warning('Storing the state of change %s failed: %s', uuid_value, str(exp))
+
+    def _forget(self, uuid_value):
+        del self.changes[uuid_value]
+        if not self.state_handler:
+            return
+        try:
+            self.state_handler.delete_change_state(uuid_value)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.warning('Deleting the state of change %s failed: %s', uuid_value, str(exp))
+
+    def _evict(self):
+        oldest = time.time() - self.ttl
+        excess = len(self.changes) - self.max_changes
+        # the changes are in the order they were started, the ongoing ones
+        # are kept as the clients may still wait for them
+        for uuid_value, changestate in self.changes.items():
+            if changestate.state == cmchangestate.CM_CHANGE_STATE_ONGOING:
+                continue
+            if excess > 0 or changestate.updated < oldest:
+                self._forget(uuid_value)
+                excess -= 1
+
+    def start_change(self, parts=1):
+        """start tracking a change
 
-    def start_change(self):
+           Arguments:
+
+           parts: The number of activations done for the change, the change
+                  is finished when all of them are finished.
+
+           Return:
+
+           The uuid of the change.
+        """
         with self.lock.writer():
-            changestate = CMChangeMonitorState()
+            changestate = CMChangeMonitorState(parts)
             uuid_value = str(uuid.uuid4())
             self.changes[uuid_value] = changestate
+            if not parts:
+                changestate.state = cmchangestate.CM_CHANGE_STATE_OK
+                changestate.finished.send()
+            self._store(uuid_value, changestate)
+            self._evict()
             return uuid_value
 
+    def _part_finished(self, uuid_value, changestate):
+        changestate.pending_parts -= 1
+        if changestate.pending_parts <= 0:
+            if changestate.failed:
+                changestate.state = cmchangestate.CM_CHANGE_STATE_NOK
+            else:
+                changestate.state = cmchangestate.CM_CHANGE_STATE_OK
+            changestate.updated = time.time()
+            self._store(uuid_value, changestate)
+            if not changestate.finished.ready():
+                changestate.finished.send()
+
     def change_nok(self, uuid_value, failed_plugins):
         with self.lock.writer():
             if uuid_value in self.changes:
-                self.changes[uuid_value].state = cmchangestate.CM_CHANGE_STATE_NOK
-                self.changes[uuid_value].failed_plugins = failed_plugins
+                self.changes[uuid_value].failed = True
+                self.changes[uuid_value].failed_plugins.update(failed_plugins)
+                self._part_finished(uuid_value, self.changes[uuid_value])
             else:
                 logging.warning('Invalid change uuid %s', uuid_value)
 
     def change_ok(self, uuid_value):
         with self.lock.writer():
             if uuid_value in self.changes:
-                self.changes[uuid_value].state = cmchangestate.CM_CHANGE_STATE_OK
+                self._part_finished(uuid_value, self.changes[uuid_value])
             else:
                 logging.warning('Invalid change uuid %s', uuid_value)
 
@@ -56,6 +169,31 @@ class CMChangeMonitor(object):
         with self.lock.reader():
             return self.changes[uuid_value]
 
+    def wait_change(self, uuid_value, timeout):
+        """wait for a change to finish
+
+           Arguments:
+
+           uuid_value: The uuid of the change.
+
+           timeout: The maximum seconds to wait.
+
+           Return:
+
+           The state of the change, it is still ongoing if the timeout
+           expired.
+
+           Raise:
+
+           KeyError is raised if the change is not known.
+        """
+        changestate = self.get_change_state(uuid_value)
+        if changestate.state == cmchangestate.CM_CHANGE_STATE_ONGOING and timeout > 0:
+            changestate.finished.wait(timeout)
+        return changestate
+
     def get_all_changes_states(self):
+        """get the state and the failed plugins of all the changes by uuid"""
         with self.lock.reader():
-            return copy.deepcopy(self.changes)
+            return {uuid_value: changestate.get_info()
+                    for uuid_value, changestate in self.changes.iteritems()}
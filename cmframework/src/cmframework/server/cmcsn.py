@@ -27,7 +27,7 @@ class CMCSN(object):
         self._get_config()
         logging.info('Current csn is %d', self.get())
 
-    def _update_csn(self, node_name=None):
+    def _get_new_config(self, node_name=None):
         new_config = copy.deepcopy(self.config)
 
         if not node_name:
@@ -37,6 +37,10 @@ class CMCSN(object):
             new_config['csn']['nodes'][node_name] = new_config['csn']['global']
             logging.info('Updating csn for node %s to %s', node_name, new_config['csn']['global'])
 
+        return new_config
+
+    def _update_csn(self, node_name=None):
+        new_config = self._get_new_config(node_name)
         self.backend_handler.set_property(CMCSN.CONFIG_NAME, json.dumps(new_config))
         self.config = new_config
 
@@ -48,8 +52,21 @@ class CMCSN(object):
         except Exception as exp:  # pylint: disable=broad-except
             logging.warning('Got error: %s', exp)
 
-    def increment(self):
-        self._update_csn()
+    def increment(self, props=None, deleted=None):
+        """increment the csn
+
+           If props or deleted are given the change of the configuration data
+           is committed together with the new csn as one backend operation.
+        """
+        if props is None and deleted is None:
+            self._update_csn()
+            return
+
+        new_config = self._get_new_config()
+        changes = dict(props or {})
+        changes[CMCSN.CONFIG_NAME] = json.dumps(new_config)
+        self.backend_handler.commit(changes, deleted or [])
+        self.config = new_config
 
     def get(self):
         return self.config['csn']['global']
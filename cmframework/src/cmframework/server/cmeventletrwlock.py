@@ -12,69 +12,191 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from __future__ import print_function
-from eventlet import greenthread, hubs
+import collections
+import time
+import weakref
 
+import eventlet
+from eventlet import event, greenthread
 
-class CMEventletRWLock(object):
-    def __init__(self):
-        self.counter = 0
-        self._read_waiters = set()
-        self._write_waiters = set()
-
-    def reader(self):
-        return self.Reader(self)
+from cmframework.apis import cmerror
 
-    def writer(self):
-        return self.Writer(self)
+_locks = weakref.WeakSet()
 
-    class Base(object):
-        def __init__(self, parent):
-            self.parent = parent
 
-        def _acquire(self, waiters):
-            waiters.add(greenthread.getcurrent())
+def get_all_stats():
+    """get the statistics of all the existing locks sorted by their names"""
+    return sorted([lock.get_stats() for lock in list(_locks)], key=lambda stats: stats['name'])
 
-            try:
-                while self.parent.counter != 0:
-                    hubs.get_hub().switch()
-            finally:
-                waiters.discard(greenthread.getcurrent())
 
-        def _exit(self):
-            for waiters, fn in (
-                    (self.parent._read_waiters, lambda x: x >= 0),
-                    (self.parent._write_waiters, lambda x: x == 0),
-            ):
-                if not waiters:
-                    continue
+class CMEventletRWLock(object):
+    """
+    Fair reader-writer lock of green threads.
+
+    The lock is given in the order it was asked for, a waiting writer blocks
+    the readers coming after it, so a stream of readers cannot starve the
+    writers. The lock is not reentrant. The acquires can have a timeout.
+    Statistics of the waits and holds are kept, get_stats() returns them.
+    """
+
+    READ = 'read'
+    WRITE = 'write'
+
+    def __init__(self, name=None):
+        self.name = name or 'lock-{:x}'.format(id(self))
+        self.readers = 0
+        self.writing = False
+        # the waiting (kind, event, start time) tuples in arrival order
+        self.waiters = collections.deque()
+        # id of the context manager -> (kind, greenthread, start time)
+        self.holders = {}
+        self.stats = {CMEventletRWLock.READ: CMEventletRWLock._new_stats(),
+                      CMEventletRWLock.WRITE: CMEventletRWLock._new_stats()}
+        self.max_queue_depth = 0
+        _locks.add(self)
+
+    def reader(self, timeout=None):
+        """get a context manager holding the lock for reading
+
+           Arguments:
+
+           timeout: The maximum seconds to wait for the lock, by default the
+                    wait is not limited. CMError is raised if the lock is not
+                    got in time.
+        """
+        return self.Reader(self, timeout)
+
+    def writer(self, timeout=None):
+        """get a context manager holding the lock for writing
+
+           Arguments:
+
+           timeout: The maximum seconds to wait for the lock, by default the
+                    wait is not limited. CMError is raised if the lock is not
+                    got in time.
+        """
+        return self.Writer(self, timeout)
+
+    def get_stats(self):
+        """get the statistics of the lock
+
+           Return:
+
+           A dictionary with the name of the lock, the statistics of the read
+           and write acquires, the current and maximum number of waiters, and
+           the current waiters and holders with the seconds they have waited
+           or held the lock.
+        """
+        now = time.time()
+        stats = {'name': self.name,
+                 'queue-depth': len(self.waiters),
+                 'max-queue-depth': self.max_queue_depth,
+                 'waiters': [{'kind': kind, 'waited': now - start}
+                             for kind, _, start in self.waiters],
+                 'holders': [{'kind': kind, 'greenthread': '{:x}'.format(id(thread)),
+                              'held': now - start}
+                             for kind, thread, start in self.holders.itervalues()]}
+        for kind, kind_stats in self.stats.iteritems():
+            stats[kind] = dict(kind_stats)
+        return stats
+
+    @staticmethod
+    def _new_stats():
+        return {'acquired': 0, 'waited': 0, 'timeouts': 0,
+                'wait-time': 0.0, 'max-wait-time': 0.0,
+                'hold-time': 0.0, 'max-hold-time': 0.0}
+
+    def _is_free(self, kind):
+        if kind == CMEventletRWLock.WRITE:
+            return not self.writing and self.readers == 0
+        return not self.writing
+
+    def _take(self, kind):
+        if kind == CMEventletRWLock.WRITE:
+            self.writing = True
+        else:
+            self.readers += 1
+
+    def _give(self, kind):
+        if kind == CMEventletRWLock.WRITE:
+            self.writing = False
+        else:
+            self.readers -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # the first waiters are given the lock while it is free for them, so
+        # the readers after a waiting writer have to wait for it
+        while self.waiters and self._is_free(self.waiters[0][0]):
+            kind, waiter, _ = self.waiters.popleft()
+            self._take(kind)
+            waiter.send()
+
+    def _acquire(self, kind, timeout):
+        start = time.time()
+        stats = self.stats[kind]
+        if not self.waiters and self._is_free(kind):
+            self._take(kind)
+            stats['acquired'] += 1
+            return
+
+        item = (kind, event.Event(), start)
+        self.waiters.append(item)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.waiters))
+        timer = eventlet.Timeout(timeout) if timeout is not None else None
+        try:
+            item[1].wait()
+        except BaseException as exp:
+            if not item[1].ready():
+                self.waiters.remove(item)
+                # a removed writer may have blocked the readers after it
+                self._wake_waiters()
+                if exp is timer:
+                    stats['timeouts'] += 1
+                    raise cmerror.CMError('Timed out after {} seconds waiting for the {} lock '
+                                          'of {}'.format(timeout, kind, self.name))
+                raise
+            # the lock was given just before the exception
+            if exp is not timer:
+                self._give(kind)
+                raise
+        finally:
+            if timer:
+                timer.cancel()
+
+        waited = time.time() - start
+        stats['acquired'] += 1
+        stats['waited'] += 1
+        stats['wait-time'] += waited
+        stats['max-wait-time'] = max(stats['max-wait-time'], waited)
+
+    def _release(self, kind, start):
+        held = time.time() - start
+        stats = self.stats[kind]
+        stats['hold-time'] += held
+        stats['max-hold-time'] = max(stats['max-hold-time'], held)
+        self._give(kind)
 
-                hubs.get_hub().schedule_call_global(
-                    0, self._release, waiters, fn,
-                )
+    class Base(object):
+        kind = None
 
-        def _release(self, waiters, fn):
-            if waiters and fn(self.parent.counter):
-                waiters.pop().switch()
+        def __init__(self, parent, timeout):
+            self.parent = parent
+            self.timeout = timeout
 
-    class Reader(Base):
         def __enter__(self):
-            if self.parent.counter < 0:
-                self._acquire(self.parent._read_waiters)
-            self.parent.counter += 1
+            self.parent._acquire(self.kind, self.timeout)
+            self.parent.holders[id(self)] = (self.kind, greenthread.getcurrent(), time.time())
 
         def __exit__(self, *args, **kwargs):
-            self.parent.counter -= 1
-            self._exit()
+            _, _, start = self.parent.holders.pop(id(self))
+            self.parent._release(self.kind, start)
 
-    class Writer(Base):
-        def __enter__(self):
-            if self.parent.counter != 0:
-                self._acquire(self.parent._write_waiters)
-            self.parent.counter -= 1
+    class Reader(Base):
+        kind = 'read'
 
-        def __exit__(self, *args, **kwargs):
-            self.parent.counter += 1
-            self._exit()
+    class Writer(Base):
+        kind = 'write'
 
 
 def main():
@@ -85,6 +207,8 @@ def main():
     with lock.writer():
         print('Got write lock')
 
+    print(get_all_stats())
+
 
 if __name__ == '__main__':
     main()
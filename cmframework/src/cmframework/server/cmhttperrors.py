@@ -36,6 +36,8 @@ class CMHTTPErrors(object):
     HTTP_METHOD_NOT_ALLOWED = 405
     # indicates the resource at this point is no longer available
     HTTP_GONE = 410
+    # the request body is larger than the server accepts
+    HTTP_PAYLOAD_TOO_LARGE = 413
     # if incorrect content type was provided as part of the request
     HTTP_UNSUPPORTED_MEDIA_TYPE = 415
     # used for validation errors
@@ -53,6 +55,10 @@ class CMHTTPErrors(object):
     def get_object_created_successfully_status():
         return '%d Created' % CMHTTPErrors.HTTP_CREATED
 
+    @staticmethod
+    def get_not_modified_status():
+        return '%d Not modified' % CMHTTPErrors.HTTP_NOT_MODIFIED
+
     @staticmethod
     def get_request_not_ok_status():
         return '%d Bad request' % CMHTTPErrors.HTTP_BAD_REQUEST
@@ -61,6 +67,10 @@ class CMHTTPErrors(object):
     def get_resource_not_found_status():
         return '%d Not found' % CMHTTPErrors.HTTP_NOT_FOUND
 
+    @staticmethod
+    def get_request_too_large_status():
+        return '%d Request too large' % CMHTTPErrors.HTTP_PAYLOAD_TOO_LARGE
+
     @staticmethod
     def get_unsupported_content_type_status():
         return '%d Unsupported content type' % CMHTTPErrors.HTTP_UNSUPPORTED_MEDIA_TYPE
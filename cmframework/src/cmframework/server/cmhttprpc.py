@@ -19,8 +19,15 @@ class HTTPRPC(object):
         self.req_filter = ''
         self.req_params = {}
         self.req_method = ''
+        # the request headers, the names are in lower case
+        self.req_headers = {}
         self.rep_body = ''
         self.rep_status = ''
+        # an iterable sent as the body instead of rep_body
+        self.rep_stream = None
+        self.rep_content_type = 'application/json'
+        # (name, value) tuples of the extra reply headers
+        self.rep_headers = []
 
     def __str__(self):
         return str.format('REQ: body:{body} filter:{filter} '
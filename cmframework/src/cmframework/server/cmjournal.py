@@ -0,0 +1,205 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import collections
+
+
+class CMJournal(object):
+    """
+    Journal of the property changes.
+
+    The journal maps the names of the changed properties to the csn of their
+    last change and the names of the deleted properties to the csn of the
+    delete (tombstones). The changes done before the horizon csn are not
+    known, the properties not in the journal have been changed at latest in
+    it. At most max_entries names are remembered, the horizon is moved forward
+    when the oldest ones are dropped.
+
+    The journal is kept in memory. If a state handler is given, the names
+    changed by every change are also stored through it as one entry, so the
+    journal survives restarts and storing it costs as much as the change.
+    Without a state handler the journal starts at the current csn.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self, csn, state_handler=None, max_entries=MAX_ENTRIES):
+        self.state_handler = state_handler
+        self.max_entries = max_entries
+        self.horizon = csn
+        # name -> csn, in the order of the csn
+        self.modified = collections.OrderedDict()
+        self.deleted = collections.OrderedDict()
+        # the csns of the changes stored through the state handler
+        self.stored = collections.deque()
+        self.pending = None
+        if self.state_handler:
+            self._load(csn)
+
+    def _load(self, csn):
+        try:
+            horizon, changes = self.state_handler.get_journal()
+            if horizon is None or horizon > csn:
+                logging.info('Change journal not found, starting it at csn %d', csn)
+                self._clear(csn)
+                return
+
+            # the changes are known only if all of them after the horizon are
+            # stored, a change stored just before a failed commit is dropped
+            missing = csn
+            while missing > horizon and missing in changes:
+                missing -= 1
+            if missing > horizon:
+                logging.warning('Change journal misses the change %d', missing)
+                horizon = missing
+                self.state_handler.set_journal_horizon(horizon)
+
+            self.horizon = horizon
+            for change_csn in sorted(changes):
+                if change_csn <= horizon or change_csn > csn:
+                    self.state_handler.delete_journal_entry(change_csn)
+                    continue
+                change = changes[change_csn]
+                self._apply(change_csn, change['set'], change['deleted'])
+                self.stored.append(change_csn)
+            logging.info('Change journal starts at csn %d', self.horizon)
+            self._trim()
+        except (ValueError, TypeError, KeyError) as exp:
+            logging.warning('Invalid change journal (%s), starting it at csn %d', str(exp), csn)
+            self._clear(csn)
+
+    def _clear(self, csn):
+        self.horizon = csn
+        self.modified.clear()
+        self.deleted.clear()
+        self.stored.clear()
+        if self.state_handler:
+            self.state_handler.clear_journal()
+            self.state_handler.set_journal_horizon(csn)
+
+    def reset(self, csn):
+        """forget the changes after the whole configuration was replaced
+
+           The changes before csn are forgotten, as they can be different from
+           what the clients have seen before the replacement.
+        """
+        self._clear(csn)
+
+    def prepare(self, csn, props, deleted):
+        """store a change before it is committed
+
+           Arguments:
+
+           csn: The csn of the change.
+
+           props: A dictionary of the set properties.
+
+           deleted: A list of the deleted property names.
+
+           The change is taken into use with commit() after it is committed
+           to the backend. A change whose commit failed is replaced by the
+           next change, as it gets the same csn.
+        """
+        # a change not fitting in the journal moves the horizon past it
+        store = bool(self.state_handler) and len(props) + len(deleted) <= self.max_entries
+        if store:
+            self.state_handler.set_journal_entry(csn, sorted(props), sorted(deleted))
+        self.pending = (csn, props, deleted, store)
+
+    def commit(self):
+        """take the change given to the last prepare into use"""
+        csn, props, deleted, store = self.pending
+        self.pending = None
+        self._apply(csn, props, deleted)
+        if store:
+            self.stored.append(csn)
+        self._trim()
+
+    def _apply(self, csn, props, deleted):
+        for name in props:
+            self.modified.pop(name, None)
+            self.modified[name] = csn
+            self.deleted.pop(name, None)
+        for name in deleted:
+            self.modified.pop(name, None)
+            self.deleted.pop(name, None)
+            self.deleted[name] = csn
+
+    def _trim(self):
+        horizon = self.horizon
+        while len(self.modified) + len(self.deleted) > self.max_entries:
+            horizon = max(horizon, self._get_oldest()[1])
+            self._drop_oldest()
+        while len(self.stored) > self.max_entries:
+            horizon = max(horizon, self.stored[0])
+            self._drop_stored()
+        if horizon == self.horizon:
+            return
+
+        self.horizon = horizon
+        while self.modified or self.deleted:
+            if self._get_oldest()[1] > horizon:
+                break
+            self._drop_oldest()
+        if self.state_handler:
+            self.state_handler.set_journal_horizon(horizon)
+            while self.stored and self.stored[0] <= horizon:
+                self._drop_stored()
+
+    def _get_oldest(self):
+        # the (names, csn) of the dictionary having the oldest change first
+        if not self.deleted:
+            return self.modified, next(self.modified.itervalues())
+        if not self.modified:
+            return self.deleted, next(self.deleted.itervalues())
+        modified_csn = next(self.modified.itervalues())
+        deleted_csn = next(self.deleted.itervalues())
+        if modified_csn <= deleted_csn:
+            return self.modified, modified_csn
+        return self.deleted, deleted_csn
+
+    def _drop_oldest(self):
+        self._get_oldest()[0].popitem(last=False)
+
+    def _drop_stored(self):
+        self.state_handler.delete_journal_entry(self.stored.popleft())
+
+    def get_changes(self, since_csn, csn):
+        """get the properties changed after a csn
+
+           Arguments:
+
+           since_csn: The csn after which the changes are returned.
+
+           csn: The current csn.
+
+           Return:
+
+           A (modified, deleted) tuple of lists of property names, None is
+           returned if the changes after since_csn are not known.
+        """
+        if since_csn < self.horizon or since_csn > csn:
+            return None
+        return (CMJournal._get_newer(self.modified, since_csn),
+                CMJournal._get_newer(self.deleted, since_csn))
+
+    @staticmethod
+    def _get_newer(names, since_csn):
+        result = []
+        for name in reversed(names):
+            if names[name] <= since_csn:
+                break
+            result.append(name)
+        result.reverse()
+        return result
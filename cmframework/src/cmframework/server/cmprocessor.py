@@ -12,13 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import threading
+import uuid
 
 from cmframework.utils import cmactivationwork
 from cmframework.server import cmeventletrwlock
 from cmframework.server import cmcsn
 from cmframework.server import cmsnapshot
+from cmframework.server import cmchangelog
+from cmframework.server import cmjournal
+from cmframework.utils import cmkeyindex
 from cmframework.utils.cmflagfile import CMFlagFile
 from cmframework.utils import cmalarm
+from cmframework.apis import cmerror
 
 
 class CMProcessor(object):
@@ -30,11 +36,13 @@ class CMProcessor(object):
                  activator,
                  changemonitor,
                  activationstate_handler,
-                 snapshot_handler):
+                 snapshot_handler,
+                 changelog_size=cmchangelog.CMChangeLog.MAX_EVENTS,
+                 journal_state_handler=None):
         logging.debug('CMProcessor constructed')
 
         self.backend_handler = backend_handler
-        self.lock = cmeventletrwlock.CMEventletRWLock()
+        self.lock = cmeventletrwlock.CMEventletRWLock('processor')
         self.csn = cmcsn.CMCSN(self.backend_handler)
         self.validator = validator
         self.activator = activator
@@ -43,6 +51,15 @@ class CMProcessor(object):
         self.changemonitor = changemonitor
         self.activationstate_handler = activationstate_handler
         self.snapshot = cmsnapshot.CMSnapshot(snapshot_handler)
+        self.changelog = cmchangelog.CMChangeLog(self.csn.get(), changelog_size)
+        self.journal = cmjournal.CMJournal(self.csn.get(), journal_state_handler)
+        # serializes the changes, they are done also by the plugins writing
+        # through the backend handler without the processor lock
+        self.commit_lock = threading.RLock()
+        self.backend_handler.set_recorder(self._commit, cmcsn.CMCSN.CONFIG_NAME)
+        # changed when the csn can go backwards, so a version is never reused
+        # for different data
+        self.generation = uuid.uuid4().hex[:8]
 
     def reboot_request(self, node_name):
         logging.debug('reboot_request called for %s', node_name)
@@ -62,6 +79,16 @@ class CMProcessor(object):
         for node_name in self.reboot_requests:
             reboot_request_alarm.raise_alarm_for_node(node_name)
 
+    def get_version(self):
+        """get the version of the configuration
+
+           The version changes whenever the configuration changes, also on
+           the writes not changing the csn like the syncs of the node csns. It
+           is read without accessing the backend.
+        """
+        return '{}-{}-{}'.format(self.generation, self.csn.get(),
+                                 self.backend_handler.get_write_count())
+
     def get_property(self, prop_name, snapshot_name=None):
         logging.debug('get_property called for %s', prop_name)
 
@@ -84,6 +111,66 @@ class CMProcessor(object):
 
             return self.backend_handler.get_properties(prop_filter)
 
+    def get_properties_page(self, prop_filter, cursor=None, limit=None, snapshot_name=None):
+        """get a page of the properties matching a filter
+
+           Return:
+
+           A list of at most limit (name, value) tuples with the names after
+           cursor, sorted by the name.
+        """
+        logging.debug('get_properties_page called with filter %s after %s', prop_filter, cursor)
+
+        with self.lock.reader():
+            if snapshot_name:
+                self.snapshot.load(snapshot_name)
+
+                props = sorted(self.snapshot.get_properties(prop_filter).iteritems())
+                if cursor is not None:
+                    props = [(name, value) for name, value in props if name > cursor]
+                return props[:limit] if limit is not None else props
+
+            return self.backend_handler.get_properties_page(prop_filter, cursor, limit)
+
+    def get_backend_stats(self):
+        logging.debug('get_backend_stats called')
+
+        return self.backend_handler.get_stats()
+
+    def get_changed_properties(self, since_csn, prop_filter='.*'):
+        """get the properties changed after a csn
+
+           Arguments:
+
+           since_csn: The csn after which the changes are returned.
+
+           prop_filter: The re matching the returned properties.
+
+           Return:
+
+           A (csn, properties, deleted) tuple, csn is the current csn,
+           properties is a dictionary of the properties set and deleted a list
+           of the properties deleted after since_csn. properties and deleted
+           are None if the changes are not known and all the properties have
+           to be read.
+        """
+        logging.debug('get_changed_properties called since csn %d with filter %s',
+                      since_csn, prop_filter)
+
+        pattern = cmkeyindex.get_pattern(prop_filter)
+        with self.lock.reader():
+            with self.commit_lock:
+                csn = self.csn.get()
+                changes = self.journal.get_changes(since_csn, csn)
+            if changes is None:
+                return csn, None, None
+
+            modified, deleted = changes
+            props = self.backend_handler.get_properties_by_names(
+                [name for name in modified if pattern.match(name)])
+            deleted = [name for name in deleted if pattern.match(name)]
+            return csn, props, deleted
+
     def set_property(self, prop_name, prop_value):
         logging.debug('set_property called %s=%s', prop_name, prop_value)
 
@@ -94,59 +181,234 @@ class CMProcessor(object):
     def set_properties(self, props, overwrite=False):
         logging.debug('set_properties called for %s', str(props))
 
+        uuid_value, _ = self.set_properties_with_diff(props, overwrite)
+        return uuid_value
+
+    @staticmethod
+    def _get_diff(orig_props, props):
+        diff = {'added': [], 'changed': [], 'deleted': []}
+        for name, value in props.iteritems():
+            if name not in orig_props:
+                diff['added'].append(name)
+            elif orig_props[name] != value:
+                diff['changed'].append(name)
+        diff['deleted'] = [name for name in orig_props
+                           if name not in props and name != cmcsn.CMCSN.CONFIG_NAME]
+        for names in diff.itervalues():
+            names.sort()
+        return diff
+
+    def set_properties_with_diff(self, props, overwrite=False):
+        """set the properties
+
+           Arguments:
+
+           props: A dictionary of the properties to set.
+
+           overwrite: If True props is the whole new configuration, only the
+                      properties differing from the current configuration are
+                      written and activated, the properties missing from props
+                      are deleted.
+
+           Return:
+
+           A (change uuid, diff) tuple, diff is None if overwrite is False,
+           otherwise a dictionary with the sorted lists of the 'added',
+           'changed' and 'deleted' property names.
+        """
+        logging.debug('set_properties_with_diff called for %s', str(props))
+
+        diff = None
+        deleted = []
         with self.lock.writer():
-            self._validate_set(props)
             if overwrite:
-                logging.debug('Deleting old configuration data as requested')
-                orig_props = self.backend_handler.get_properties('.*')
-                self.backend_handler.delete_properties(orig_props.keys())
-            self.backend_handler.set_properties(props)
-            self.csn.increment()
+                logging.debug('Comparing with the old configuration data as requested')
+                diff = CMProcessor._get_diff(self.backend_handler.get_properties('.*'), props)
+                logging.info('Overwrite adds %d, changes %d and deletes %d properties',
+                             len(diff['added']), len(diff['changed']), len(diff['deleted']))
+                props = {name: props[name] for name in diff['added'] + diff['changed']}
+                deleted = diff['deleted']
+                if deleted:
+                    self._validate_delete(deleted)
+                if props:
+                    self._validate_set(props)
+                if props or deleted:
+                    self._commit(props, deleted)
+            else:
+                self._validate_set(props)
+                self._commit(props, deleted)
 
         if not self.automatic_activation_disabled:
-            return self._activate_set(props)
+            if overwrite:
+                return self._activate_changes(props, deleted), diff
+            return self._activate_set(props), diff
 
-        return "0"
+        return "0", diff
 
     def delete_property(self, prop_name):
         logging.debug('delete_property called for %s', prop_name)
 
         props = []
         props.append(prop_name)
-        return self._delete_properties(props, None)
+        return self._delete_properties(props)
 
     def delete_properties(self, arg):
         logging.debug('delete_properties called with arg %r', arg)
 
         keys = []
-        prop_filter = None
         if isinstance(arg, str):
-            prop_filter = arg
-            props = self.get_properties(prop_filter)
+            props = self.get_properties(arg)
             keys = props.keys()
         else:
             keys = arg
-        return self._delete_properties(keys, prop_filter)
+        return self._delete_properties(keys)
 
-    def _delete_properties(self, props, props_filter):
-        logging.debug('_delete_properties called with props %s filter %s', props, props_filter)
+    def _delete_properties(self, props):
+        logging.debug('_delete_properties called with props %s', props)
 
         with self.lock.writer():
+            # the names not in the backend are skipped, the delete fails only
+            # if none of them is there
+            props = self._get_existing(props)
+            if not props:
+                raise cmerror.CMError('Property not found')
             self._validate_delete(props)
-            if props_filter:
-                self.backend_handler.delete_properties(props_filter)
-            else:
-                if len(props) == 1:
-                    self.backend_handler.delete_property(props[0])
-                else:
-                    self.backend_handler.delete_properties(props)
-            self.csn.increment()
+            self._commit({}, props)
 
         if not self.automatic_activation_disabled:
             return self._activate_delete(props)
 
         return "0"
 
+    def _get_existing(self, names):
+        existing = self.backend_handler.get_properties_by_names(names)
+        return [name for name in names if name in existing]
+
+    def batch(self, operations):
+        """run a list of operations as one change
+
+           The operations are run in order under one lock, the gets see the
+           sets and deletes done before them in the batch. All the sets and
+           deletes are validated and stored together with one csn increment
+           and activated as one change. If any operation fails nothing is
+           changed.
+
+           Arguments:
+
+           operations: A list of dictionaries, each with the operation and its
+                       arguments:
+                       {'operation': 'get', 'name': <name>}
+                       {'operation': 'get', 'filter': <re>}
+                       {'operation': 'set', 'properties': {<name>: <value>, ...}}
+                       {'operation': 'delete', 'properties': [<name>, ...]}
+                       {'operation': 'snapshot', 'name': <snapshot name>}
+                       The snapshots are created of the configuration before
+                       the batch, so they must be before the sets and
+                       deletes.
+
+           Return:
+
+           A (change uuid, results) tuple, the change uuid is None if nothing
+           was changed. results has a dictionary for every operation, it
+           contains 'value' for a get of a name and 'properties' for a get
+           with a filter.
+
+           Raise:
+
+           ValueError if an operation is invalid, CMError if an operation
+           fails.
+        """
+        logging.debug('batch called with %d operations', len(operations))
+
+        props = {}
+        deleted = set()
+        snapshots = []
+        results = []
+        with self.lock.writer():
+            for operation in operations:
+                results.append(self._batch_operation(operation, props, deleted, snapshots))
+
+            deleted = self._get_existing(list(deleted))
+            if deleted:
+                self._validate_delete(deleted)
+            if props:
+                self._validate_set(props)
+            created = []
+            try:
+                for snapshot_name in snapshots:
+                    self.snapshot.create(snapshot_name, self.backend_handler)
+                    created.append(snapshot_name)
+                if props or deleted:
+                    self._commit(props, deleted)
+            except Exception:
+                # the snapshots of a failed batch are removed with it
+                for snapshot_name in created:
+                    self._delete_snapshot_of_failed_batch(snapshot_name)
+                raise
+
+        if not props and not deleted:
+            return None, results
+        if not self.automatic_activation_disabled:
+            return self._activate_changes(props, deleted), results
+        return "0", results
+
+    def _delete_snapshot_of_failed_batch(self, snapshot_name):
+        try:
+            self.snapshot.delete(snapshot_name)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.error('Deleting snapshot %s of a failed batch failed: %s',
+                          snapshot_name, str(exp))
+
+    def _batch_operation(self, operation, props, deleted, snapshots):
+        try:
+            name = operation['operation']
+            if name == 'get' and 'filter' in operation:
+                pattern = cmkeyindex.get_pattern(operation['filter'])
+                result = self.backend_handler.get_properties(operation['filter'])
+                for prop_name in deleted:
+                    result.pop(prop_name, None)
+                result.update({prop_name: value for prop_name, value in props.iteritems()
+                               if pattern.match(prop_name)})
+                return {'properties': result}
+            elif name == 'get':
+                prop_name = operation['name']
+                if prop_name in props:
+                    return {'value': props[prop_name]}
+                if prop_name in deleted:
+                    raise cmerror.CMError('Property {} is deleted in the batch'.format(prop_name))
+                return {'value': self.backend_handler.get_property(prop_name)}
+            elif name == 'set':
+                for prop_name, value in operation['properties'].iteritems():
+                    props[prop_name] = value
+                    deleted.discard(prop_name)
+                return {}
+            elif name == 'delete':
+                if not isinstance(operation['properties'], list):
+                    raise TypeError('properties is not a list')
+                for prop_name in operation['properties']:
+                    props.pop(prop_name, None)
+                    deleted.add(prop_name)
+                return {}
+            elif name == 'snapshot':
+                if props or deleted:
+                    raise ValueError('Snapshots must be before the sets and deletes')
+                snapshots.append(operation['name'])
+                return {}
+        except (KeyError, TypeError, AttributeError) as exp:
+            raise ValueError('Invalid batch operation {}: {}'.format(operation, exp))
+        raise ValueError('Unknown batch operation {}'.format(name))
+
+    def _commit(self, props, deleted):
+        # also the recorder of the backend handler, so the properties written
+        # by the plugins get a csn and are seen by the journal and the watchers
+        with self.commit_lock:
+            # the change is stored in the journal before it is committed, so a
+            # committed change is never missing from it
+            self.journal.prepare(self.csn.get() + 1, props, deleted)
+            self.csn.increment(props, deleted)
+            self.journal.commit()
+            self.changelog.record(self.csn.get(), props, deleted)
+
     def _validate_set(self, props):
         logging.debug('_validate_set called for %s', str(props))
 
@@ -169,6 +431,27 @@ class CMProcessor(object):
         with self.lock.reader():
             return self._activate_set_no_lock(props)
 
+    def _activate_changes(self, props, deleted):
+        logging.debug('_activate_changes called for %s, deleting %s', str(props), deleted)
+
+        with self.lock.reader():
+            # one change tracking the activation of the deletes and the sets
+            parts = 1 if props else 0
+            if deleted:
+                parts += 1
+            uuid_value = self.changemonitor.start_change(parts)
+            if deleted:
+                work = cmactivationwork.CMActivationWork(
+                    cmactivationwork.CMActivationWork.OPER_DELETE, self.csn.get(), deleted)
+                work.uuid_value = uuid_value
+                self.activator.add_work(work)
+            if props:
+                work = cmactivationwork.CMActivationWork(
+                    cmactivationwork.CMActivationWork.OPER_SET, self.csn.get(), props)
+                work.uuid_value = uuid_value
+                self.activator.add_work(work)
+            return uuid_value
+
     def _validate_delete(self, props):
         logging.debug('_validate_delete called for %s', str(props))
 
@@ -199,9 +482,13 @@ class CMProcessor(object):
 
             self._validate_set(self.snapshot.get_properties())
 
-            self.snapshot.restore(self.backend_handler)
+            with self.commit_lock:
+                self.snapshot.restore(self.backend_handler)
 
-            self.csn = cmcsn.CMCSN(self.backend_handler)
+                self.csn = cmcsn.CMCSN(self.backend_handler)
+                self.changelog.reset(self.csn.get())
+                self.journal.reset(self.csn.get())
+                self.generation = uuid.uuid4().hex[:8]
 
             self._activate_set_no_lock(self.snapshot.get_properties())
 
@@ -220,8 +507,8 @@ class CMProcessor(object):
         with self.lock.writer():
             self.snapshot.delete(snapshot_name)
 
-    def activate(self, node_name=None, startup_activation=False):
-        logging.debug('activate called, node is %s', node_name)
+    def activate(self, node_name=None, startup_activation=False, force=False):
+        logging.debug('activate called, node is %s, force is %s', node_name, force)
 
         activation_alarm = cmalarm.CMActivationFailedAlarm()
         if node_name:
@@ -234,11 +521,11 @@ class CMProcessor(object):
             if not node_name:
                 work = cmactivationwork.CMActivationWork(
                     cmactivationwork.CMActivationWork.OPER_FULL,
-                    self.csn.get(), {}, None, startup_activation)
+                    self.csn.get(), {}, None, startup_activation, force)
             else:
                 work = cmactivationwork.CMActivationWork(
                     cmactivationwork.CMActivationWork.OPER_FULL,
-                    self.csn.get(), {}, node_name)
+                    self.csn.get(), {}, node_name, force=force)
             work.uuid_value = uuid_value
             self.activator.add_work(work)
 
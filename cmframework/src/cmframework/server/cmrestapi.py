@@ -120,6 +120,46 @@ class CMRestAPI(cmwsgicallbacks.CMWSGICallbacks):
             rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
             rpc.rep_status += ', only GET is possible to this resource'
 
+    def handle_change(self, rpc):
+        logging.debug('handle_change called')
+        if rpc.req_method == 'GET':
+            self.get_change_state(rpc)
+        else:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ', only GET is possible to this resource'
+
+    def handle_watch(self, rpc):
+        logging.debug('handle_watch called')
+        if rpc.req_method == 'GET':
+            self.watch(rpc)
+        else:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ', only GET is possible to this resource'
+
+    def handle_debug_locks(self, rpc):
+        logging.debug('handle_debug_locks called')
+        if rpc.req_method == 'GET':
+            self.get_lock_stats(rpc)
+        else:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ', only GET is possible to this resource'
+
+    def handle_debug_backend(self, rpc):
+        logging.debug('handle_debug_backend called')
+        if rpc.req_method == 'GET':
+            self.get_backend_stats(rpc)
+        else:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ', only GET is possible to this resource'
+
+    def handle_batch(self, rpc):
+        logging.debug('handle_batch called')
+        if rpc.req_method == 'POST':
+            self.batch(rpc)
+        else:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ', only POST is possible to this resource'
+
     # pylint: disable=no-self-use
     def get_property(self, rpc):
         logging.error('get_property not implemented')
@@ -191,6 +231,31 @@ class CMRestAPI(cmwsgicallbacks.CMWSGICallbacks):
         rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
         raise cmerror.CMError('Not implemented')
 
+    def get_change_state(self, rpc):
+        logging.error('get_change_state not implemented')
+        rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        raise cmerror.CMError('Not implemented')
+
+    def watch(self, rpc):
+        logging.error('watch not implemented')
+        rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        raise cmerror.CMError('Not implemented')
+
+    def batch(self, rpc):
+        logging.error('batch not implemented')
+        rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        raise cmerror.CMError('Not implemented')
+
+    def get_lock_stats(self, rpc):
+        logging.error('get_lock_stats not implemented')
+        rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        raise cmerror.CMError('Not implemented')
+
+    def get_backend_stats(self, rpc):
+        logging.error('get_backend_stats not implemented')
+        rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        raise cmerror.CMError('Not implemented')
+
     def set_automatic_activation_state(self, rpc, state):
         logging.error('set_automatic_activation_state not implemented')
         rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
@@ -13,13 +13,26 @@
 # limitations under the License.
 import logging
 import json
+import re
+import hashlib
 
 from cmframework.apis import cmerror
 from cmframework.server import cmrestapi
+from cmframework.server import cmeventletrwlock
+from cmframework.utils import cmkeyindex
+from cmframework.utils import cmjsonstream
 from cmframework.server.cmhttperrors import CMHTTPErrors
 
 
 class CMRestAPIV1(cmrestapi.CMRestAPI):
+    # the maximum seconds a request waits for a change to finish
+    MAX_CHANGE_WAIT = 60
+    # the values of the boolean query parameters meaning true
+    TRUE_VALUES = ('true', 'yes', '1')
+    # the seconds after which the csn is sent to the watchers if there have
+    # been no changes
+    WATCH_HEARTBEAT = 30
+
     def __init__(self, processor):
         logging.debug('CMRestAPIV1 constructor called')
         cmrestapi.CMRestAPI.__init__(self, 'v1.0', 'current', '1.0', processor)
@@ -32,6 +45,10 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
                 "name": "<name of the property>",
                 "value": "<value of the property>",
             }
+
+            Without snapshot the reply has an ETag header, if the request has
+            an If-None-Match header with it the reply is 304 Not modified
+            without a body.
         """
 
         logging.debug('get_property called')
@@ -40,12 +57,19 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             if isinstance(snapshot_name, list):
                 snapshot_name = snapshot_name[0]
             prop_name = rpc.req_params['property']
+            etag = None
+            if not snapshot_name:
+                etag = self._get_etag('property', prop_name)
+                if self._is_not_modified(rpc, etag):
+                    return
             value = self.processor.get_property(prop_name, snapshot_name)
             reply = {}
             reply['name'] = prop_name
             reply['value'] = value
             rpc.rep_status = CMHTTPErrors.get_ok_status()
             rpc.rep_body = json.dumps(reply)
+            if etag:
+                rpc.rep_headers.append(('ETag', etag))
         except cmerror.CMError as exp:
             rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
             rpc.rep_status += ','
@@ -60,7 +84,9 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
     def get_properties(self, rpc):
         """
             Request: GET http://<cm-vip:port>/cm/v1.0/properties?
-                             prop-name-filter=<filter>&snapshot=<snapshot name>
+                             prop-name-filter=<filter>&snapshot=<snapshot name>&
+                             limit=<count>&cursor=<cursor>&names-only=<true|false>&
+                             max-value-bytes=<count>
             Response: {
                 "properties": [
                     {
@@ -69,11 +95,43 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
                     },
                     {
                         "name": "<name of the property>",
-                        "value": "<value of the property>"
+                        "value": "<value of the property>",
+                        "truncated": true
                     }
                     ....
-                ]
+                ],
+                "next-cursor": "<cursor>"
+            }
+
+            With limit or cursor the properties are returned in the order of
+            their names, at most limit of them starting after the cursor. The
+            next-cursor is returned if there are more properties, it is given
+            as the cursor to get the next page. With names-only the values are
+            not returned, with max-value-bytes the longer values are cut to it
+            and marked truncated.
+
+            Request: GET http://<cm-vip:port>/cm/v1.0/properties?
+                             prop-name-filter=<filter>&since-csn=<csn>
+            Response: {
+                "csn": <current csn>,
+                "properties": [
+                    {
+                        "name": "<name of the property>",
+                        "value": "<value of the property>"
+                    },
+                    ....
+                ],
+                "deleted": ["<name of the property>", ...]
+            }
+            or if the changes after since-csn are not known anymore
+            {
+                "csn": <current csn>,
+                "resync": true
             }
+
+            Without snapshot and since-csn the reply has an ETag header, if
+            the request has an If-None-Match header with it the reply is 304
+            Not modified without a body.
         """
 
         logging.debug('get_properties called')
@@ -81,23 +139,38 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             prop_name_filter = rpc.req_filter.get('prop-name-filter', '')
             if isinstance(prop_name_filter, list):
                 prop_name_filter = prop_name_filter[0]
+            since_csn = rpc.req_filter.get('since-csn', None)
+            if since_csn:
+                self._get_changed_properties(rpc, prop_name_filter or '.*', since_csn[0])
+                return
             snapshot_name = rpc.req_filter.get('snapshot', None)
             if isinstance(snapshot_name, list):
                 snapshot_name = snapshot_name[0]
-            result = self.processor.get_properties(prop_name_filter, snapshot_name)
-            if not bool(result):
+            try:
+                options = CMRestAPIV1._get_listing_options(rpc)
+            except ValueError as exp:
+                rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+                rpc.rep_status += ','
+                rpc.rep_status += str(exp)
+                return
+            etag = None
+            if not snapshot_name:
+                etag = self._get_etag('properties',
+                                      repr((prop_name_filter, sorted(options.items()))))
+                if self._is_not_modified(rpc, etag):
+                    return
+            result, next_cursor = self._get_listing(prop_name_filter, snapshot_name, options)
+            if not result and options['cursor'] is None:
                 rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
             else:
-                reply = {}
-                items = []
-                for key, value in result.iteritems():
-                    tmp = {}
-                    tmp['name'] = key
-                    tmp['value'] = value
-                    items.append(tmp)
-                reply['properties'] = items
+                # the reply is encoded while it is sent, one property at a time
+                items = (CMRestAPIV1._get_item(name, value, options) for name, value in result)
+                members = {'next-cursor': next_cursor} if next_cursor else None
                 rpc.rep_status = CMHTTPErrors.get_ok_status()
-                rpc.rep_body = json.dumps(reply)
+                rpc.rep_stream = cmjsonstream.iter_encode_list('properties', items,
+                                                               members=members)
+                if etag:
+                    rpc.rep_headers.append(('ETag', etag))
         except cmerror.CMError as exp:
             rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
             rpc.rep_status += ','
@@ -107,6 +180,97 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             rpc.rep_status += ','
             rpc.rep_status += str(exp)
 
+    @staticmethod
+    def _get_listing_options(rpc):
+        options = {'limit': None, 'cursor': None, 'names_only': False,
+                   'max_value_bytes': None}
+        if 'limit' in rpc.req_filter:
+            options['limit'] = int(rpc.req_filter['limit'][0])
+            if options['limit'] < 1:
+                raise ValueError('limit must be positive')
+        if 'cursor' in rpc.req_filter:
+            options['cursor'] = rpc.req_filter['cursor'][0]
+        if 'names-only' in rpc.req_filter:
+            options['names_only'] = \
+                rpc.req_filter['names-only'][0].lower() in CMRestAPIV1.TRUE_VALUES
+        if 'max-value-bytes' in rpc.req_filter:
+            options['max_value_bytes'] = int(rpc.req_filter['max-value-bytes'][0])
+            if options['max_value_bytes'] < 0:
+                raise ValueError('max-value-bytes must not be negative')
+        return options
+
+    def _get_listing(self, prop_name_filter, snapshot_name, options):
+        # only the requested page is read, one more property is asked for to
+        # know if there are more pages
+        limit = options['limit']
+        cursor = options['cursor']
+        if limit is None and cursor is None:
+            return self.processor.get_properties(prop_name_filter, snapshot_name).viewitems(), None
+        result = self.processor.get_properties_page(prop_name_filter, cursor,
+                                                    limit + 1 if limit else None,
+                                                    snapshot_name)
+        if limit is not None and len(result) > limit:
+            result = result[:limit]
+            return result, result[-1][0]
+        return result, None
+
+    @staticmethod
+    def _get_item(name, value, options):
+        if options['names_only']:
+            return {'name': name}
+        max_value_bytes = options['max_value_bytes']
+        if max_value_bytes is not None:
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            if len(value) > max_value_bytes:
+                return {'name': name, 'value': CMRestAPIV1._truncate(value, max_value_bytes),
+                        'truncated': True}
+        return {'name': name, 'value': value}
+
+    @staticmethod
+    def _truncate(value, max_bytes):
+        # the value is cut at a character boundary, the utf-8 continuation
+        # bytes of a cut character are dropped
+        end = max_bytes
+        while end > 0 and 0x80 <= ord(value[end]) < 0xc0:
+            end -= 1
+        return value[:end]
+
+    def _get_etag(self, resource, name):
+        # the version is taken before reading the data, so the data is never
+        # older than the version in the etag
+        digest = hashlib.sha1('{}:{}'.format(resource, name)).hexdigest()[:16]
+        return '"{}-{}"'.format(self.processor.get_version(), digest)
+
+    @staticmethod
+    def _is_not_modified(rpc, etag):
+        tags = rpc.req_headers.get('if-none-match', '')
+        if etag not in [tag.strip() for tag in tags.split(',')]:
+            return False
+        rpc.rep_status = CMHTTPErrors.get_not_modified_status()
+        rpc.rep_headers.append(('ETag', etag))
+        return True
+
+    def _get_changed_properties(self, rpc, prop_name_filter, since_csn):
+        try:
+            cmkeyindex.get_pattern(prop_name_filter)
+            since_csn = int(since_csn)
+        except (ValueError, re.error) as exp:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+            return
+        csn, props, deleted = self.processor.get_changed_properties(since_csn, prop_name_filter)
+        reply = {'csn': csn}
+        if props is None:
+            reply['resync'] = True
+        else:
+            reply['properties'] = [{'name': name, 'value': value}
+                                   for name, value in props.iteritems()]
+            reply['deleted'] = deleted
+        rpc.rep_status = CMHTTPErrors.get_ok_status()
+        rpc.rep_body = json.dumps(reply)
+
     def set_property(self, rpc):
         """
             Request: POST http://<cm-vip:port>/cm/v1.0/properties/<property-name>
@@ -162,8 +326,15 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
                 }
             Response:
                 {
-                     "change-uuid": "<uuid>"
+                     "change-uuid": "<uuid>",
+                     "diff": {
+                         "added": ["<name>", ...],
+                         "changed": ["<name>", ...],
+                         "deleted": ["<name>", ...]
+                     }
                 }
+                The diff is returned only when overwrite is True, only the
+                properties in the diff are written and activated.
         """
 
         logging.debug('set_properties called')
@@ -171,20 +342,27 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             if not rpc.req_body:
                 rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
             else:
-                request = json.loads(rpc.req_body)
+                data = {}
+
+                def add_property(entry):
+                    try:
+                        data[entry['name']] = entry['value']
+                    except (KeyError, TypeError):
+                        raise ValueError('Invalid property {}'.format(json.dumps(entry)))
+
+                request = cmjsonstream.decode_object(rpc.req_body,
+                                                     {'properties': add_property}, strict=True)
                 overwrite = False
                 if 'overwrite' in request:
                     overwrite = request['overwrite']
-                items = request['properties']
-                data = {}
-                for entry in items:
-                    name = entry['name']
-                    value = entry['value']
-                    data[name] = value
-                uuid_value = self.processor.set_properties(data, overwrite)
+                if 'properties' not in request:
+                    raise KeyError('properties')
+                uuid_value, diff = self.processor.set_properties_with_diff(data, overwrite)
                 rpc.rep_status = CMHTTPErrors.get_ok_status()
                 reply = {}
                 reply['change-uuid'] = uuid_value
+                if diff is not None:
+                    reply['diff'] = diff
                 rpc.rep_body = json.dumps(reply)
         except cmerror.CMError as exp:
             rpc.rep_status = CMHTTPErrors.get_internal_error_status()
@@ -192,6 +370,10 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             rpc.rep_status += str(exp)
         except KeyError:
             rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+        except ValueError as exp:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
         except Exception as exp:  # pylint: disable=broad-except
             rpc.rep_status = CMHTTPErrors.get_internal_error_status()
             rpc.rep_status += ','
@@ -362,17 +544,20 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
 
     def activate(self, rpc):
         """
-            Request: POST http://<cm-vip:port>/cm/v1.0/activator/<node-name>
+            Request: POST http://<cm-vip:port>/cm/v1.0/activator/<node-name>?force=<true|false>
             Response: http response with proper status
             {
                 "change-uuid": "<uuid>"
             }
+            The plugins whose data has not changed since their last successful
+            activation are skipped unless force is true.
         """
 
         logging.debug('activate called')
         try:
             node_name = rpc.req_params.get('node', None)
-            uuid_value = self.processor.activate(node_name)
+            force = rpc.req_filter.get('force', ['false'])[0].lower() == 'true'
+            uuid_value = self.processor.activate(node_name, force=force)
             rpc.rep_status = CMHTTPErrors.get_ok_status()
             reply = {}
             reply['change-uuid'] = uuid_value
@@ -483,16 +668,232 @@ class CMRestAPIV1(cmrestapi.CMRestAPI):
             if change_uuid_list:
                 change_uuid_value = change_uuid_list[0]
                 state = changemonitor.get_change_state(change_uuid_value)
-                reply[change_uuid_value] = {}
-                reply[change_uuid_value]["state"] = state.state
-                reply[change_uuid_value]["failed-plugins"] = state.failed_plugins
+                reply[change_uuid_value] = state.get_info()
             else:
-                changes = changemonitor.get_all_changes_states()
-                for change_uuid, state in changes.iteritems():
-                    reply[change_uuid] = {}
-                    reply[change_uuid]["state"] = state.state
-                    reply[change_uuid]["failed-plugins"] = state.failed_plugins
+                reply = changemonitor.get_all_changes_states()
+
+            rpc.rep_status = CMHTTPErrors.get_ok_status()
+            rpc.rep_body = json.dumps(reply)
+        except cmerror.CMError as exp:
+            rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+        except KeyError:
+            rpc.rep_status = CMHTTPErrors.get_resource_not_found_status()
+        except Exception as exp:  # pylint: disable=broad-except
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+
+    def watch(self, rpc):
+        """
+            Request: GET http://<cm-vip:port>/cm/v1.0/watch?prop-name-filter=<filter>&
+                             since-csn=<csn>
+            Response: a stream of json objects, one per line
+                {"csn": <csn>, "name": "<name>", "value": "<value>"}
+                {"csn": <csn>, "name": "<name>", "deleted": true}
+                {"csn": <csn>}
+                {"csn": <csn>, "resync": true}
+
+            The changes of the matching properties done after since-csn (the
+            current csn by default) are sent as they are done. A line with
+            only the csn is sent when there are no matching changes in
+            WATCH_HEARTBEAT seconds. If the changes after since-csn are not
+            known anymore the resync line is sent and the stream ends, the
+            properties have to be read again and watched since the csn in it.
+        """
+
+        logging.debug('watch called')
+        try:
+            prop_name_filter = rpc.req_filter.get('prop-name-filter', ['.*'])[0]
+            changelog = self.processor.changelog
+            since_csn = rpc.req_filter.get('since-csn', None)
+            try:
+                cmkeyindex.get_pattern(prop_name_filter)
+                if since_csn:
+                    since_csn = int(since_csn[0])
+                else:
+                    since_csn = changelog.get_csn()
+            except (ValueError, re.error) as exp:
+                rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+                rpc.rep_status += ','
+                rpc.rep_status += str(exp)
+                return
+            rpc.rep_status = CMHTTPErrors.get_ok_status()
+            rpc.rep_content_type = 'application/x-ndjson'
+            rpc.rep_stream = CMRestAPIV1._get_watch_stream(changelog, prop_name_filter,
+                                                           since_csn)
+        except Exception as exp:  # pylint: disable=broad-except
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+
+    @staticmethod
+    def _get_watch_stream(changelog, prop_filter, since_csn):
+        while True:
+            events, csn = changelog.get_events(since_csn, prop_filter)
+            if events is None:
+                logging.info('Changes after csn %d are not known, watcher has to resync',
+                             since_csn)
+                yield json.dumps({'csn': csn, 'resync': True}) + '\n'
+                return
+            if events:
+                for item in events:
+                    yield json.dumps(item) + '\n'
+            else:
+                yield json.dumps({'csn': csn}) + '\n'
+            since_csn = csn
+            changelog.wait(since_csn, CMRestAPIV1.WATCH_HEARTBEAT)
+
+    def batch(self, rpc):
+        """
+            Request: POST http://<cm-vip:port>/cm/v1.0/batch
+                {
+                    "operations": [
+                        {"operation": "snapshot", "name": "<snapshot name>"},
+                        {"operation": "get", "name": "<name of the property>"},
+                        {"operation": "get", "filter": "<filter>"},
+                        {"operation": "set", "properties": {"<name>": "<value>", ...}},
+                        {"operation": "delete", "properties": ["<name>", ...]},
+                        ....
+                    ]
+                }
+            Response:
+                {
+                    "change-uuid": "<uuid>",
+                    "results": [
+                        {},
+                        {"value": "<value of the property>"},
+                        {"properties": {"<name>": "<value>", ...}},
+                        {},
+                        {},
+                        ....
+                    ]
+                }
+                The operations are done in order as one change, if one fails
+                nothing is changed. change-uuid is null if nothing was
+                changed.
+        """
+
+        logging.debug('batch called')
+        try:
+            if not rpc.req_body:
+                rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+                return
+            operations = json.loads(rpc.req_body)['operations']
+            if not isinstance(operations, list):
+                raise ValueError('operations is not a list')
+            uuid_value, results = self.processor.batch(operations)
+            rpc.rep_status = CMHTTPErrors.get_ok_status()
+            rpc.rep_body = json.dumps({'change-uuid': uuid_value, 'results': results})
+        except cmerror.CMError as exp:
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+        except (KeyError, TypeError, ValueError, re.error) as exp:
+            rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+        except Exception as exp:  # pylint: disable=broad-except
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+
+    def get_lock_stats(self, rpc):
+        """
+            Request: GET http://<cm-vip:port>/cm/v1.0/debug/locks
+            Response: {
+                "locks": [
+                    {
+                        "name": "<name of the lock>",
+                        "queue-depth": <number of waiters>,
+                        "max-queue-depth": <maximum number of waiters>,
+                        "waiters": [{"kind": "read|write", "waited": <seconds>}, ...],
+                        "holders": [{"kind": "read|write", "greenthread": "<id>",
+                                     "held": <seconds>}, ...],
+                        "read": {
+                            "acquired": <count>,
+                            "waited": <count of the acquires that waited>,
+                            "timeouts": <count>,
+                            "wait-time": <seconds>,
+                            "max-wait-time": <seconds>,
+                            "hold-time": <seconds>,
+                            "max-hold-time": <seconds>
+                        },
+                        "write": {....}
+                    },
+                    ....
+                ]
+            }
+        """
 
+        logging.debug('get_lock_stats called')
+        try:
+            rpc.rep_status = CMHTTPErrors.get_ok_status()
+            rpc.rep_body = json.dumps({'locks': cmeventletrwlock.get_all_stats()})
+        except Exception as exp:  # pylint: disable=broad-except
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+
+    def get_backend_stats(self, rpc):
+        """
+            Request: GET http://<cm-vip:port>/cm/v1.0/debug/backend
+            Response: {
+                "backend": {
+                    "circuit": {
+                        "name": "<name of the circuit breaker>",
+                        "state": "closed|open|half-open",
+                        "failures": <consecutive failures>
+                    }
+                },
+                "cache": {
+                    "hits": <count>,
+                    "misses": <count>,
+                    "invalidations": <count>,
+                    "entries": <number of cached entries>,
+                    "size": <number of cached properties>
+                }
+            }
+
+            The content of the backend member depends on the backend plugin,
+            the cache member is there only when the property cache is enabled.
+        """
+
+        logging.debug('get_backend_stats called')
+        try:
+            rpc.rep_status = CMHTTPErrors.get_ok_status()
+            rpc.rep_body = json.dumps(self.processor.get_backend_stats())
+        except Exception as exp:  # pylint: disable=broad-except
+            rpc.rep_status = CMHTTPErrors.get_internal_error_status()
+            rpc.rep_status += ','
+            rpc.rep_status += str(exp)
+
+    def get_change_state(self, rpc):
+        """
+            Request: GET http://<cm-vip:port>/cm/v1.0/changes/<change-uuid>?wait=<seconds>
+            Response: {
+                "<change-uuid>"" : {
+                                    "state": "<state>",
+                                    "failed-plugins": { "plugin-name":"error",  ... }
+            }
+
+            With wait the response is sent when the change is not ongoing
+            anymore, or when the seconds (at most MAX_CHANGE_WAIT) have passed.
+        """
+
+        logging.debug('get_change_state called')
+        try:
+            change_uuid_value = rpc.req_params['change']
+            wait = rpc.req_filter.get('wait', ['0'])[0]
+            try:
+                wait = min(float(wait), CMRestAPIV1.MAX_CHANGE_WAIT)
+            except ValueError:
+                rpc.rep_status = CMHTTPErrors.get_request_not_ok_status()
+                rpc.rep_status += ', invalid wait time'
+                return
+            state = self.processor.changemonitor.wait_change(change_uuid_value, wait)
+            reply = {change_uuid_value: state.get_info()}
             rpc.rep_status = CMHTTPErrors.get_ok_status()
             rpc.rep_body = json.dumps(reply)
         except cmerror.CMError as exp:
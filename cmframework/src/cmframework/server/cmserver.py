@@ -38,6 +38,7 @@ from cmframework.server import cmvalidator
 from cmframework.server import cmactivator
 from cmframework.server import cmactivateserverhandler
 from cmframework.server import cmchangemonitor
+from cmframework.server import cmcsn
 from cmframework.utils.cmansibleinventory import AnsibleInventory
 
 
@@ -58,19 +59,20 @@ def main():
 
         logging.info('CM server is starting up')
 
-        # initialize the change monitor object
-        changemonitor = cmchangemonitor.CMChangeMonitor()
-
         # load backend plugin
         logging.info('Initializing backend handler')
         backend_args = {}
         backend_args['uri'] = parser.get_backend_uri()
         backend = cmbackendhandler.CMBackendHandler(parser.get_backend_api(), **backend_args)
+        if parser.get_backend_cache_size():
+            backend.enable_cache(parser.get_backend_cache_size(),
+                                 cmcsn.CMCSN.CONFIG_NAME,
+                                 parser.get_backend_cache_check_interval())
 
         # construct the plugin client library
         logging.info('Initialize plugin client library')
         plugin_client = cmbackendpluginclient.CMBackendPluginClient(parser.get_backend_api(),
-                                                                    **backend_args)
+                                                                    backend)
 
         # load activation state handler
         logging.info('Initializing activation state handler')
@@ -79,13 +81,24 @@ def main():
         activationstate_handler = cmactivationstatehandler.CMActivationStateHandler(
             parser.get_activationstate_handler_api(), **activationstatehandler_args)
 
+        # initialize the change monitor object
+        changestate_handler = None
+        if parser.get_persist_change_states():
+            changestate_handler = activationstate_handler
+        changemonitor = cmchangemonitor.CMChangeMonitor(parser.get_change_history_size(),
+                                                        parser.get_change_history_ttl(),
+                                                        changestate_handler)
+
         # initialize validator
         logging.info('Initializing validator')
-        validator = cmvalidator.CMValidator(parser.get_validators(), plugin_client)
+        validator = cmvalidator.CMValidator(parser.get_validators(), plugin_client,
+                                            parser.get_validator_workers(),
+                                            parser.get_validator_timeout())
 
         # initializing activation handling process
         logging.info('Initializing activator')
-        activator = cmactivator.CMActivator(parser.get_activator_workers())
+        activator = cmactivator.CMActivator(parser.get_activator_workers(),
+                                            parser.get_activation_debounce_window())
 
         # initialize activator rmq handler
         if not parser.get_disable_remote_activation():
@@ -98,7 +111,8 @@ def main():
         # initialize activator server handler
         logging.info('Initializing activator server handler')
         activateserverhandler = cmactivateserverhandler.CMActivateServerHandler(
-            parser.get_activators(), plugin_client, changemonitor, activationstate_handler)
+            parser.get_activators(), plugin_client, changemonitor, activationstate_handler,
+            parser.get_activator_plugin_workers())
         activator.add_handler(activateserverhandler)
 
         # starting activator
@@ -125,7 +139,9 @@ def main():
                                             activator,
                                             changemonitor,
                                             activationstate_handler,
-                                            snapshot_handler)
+                                            snapshot_handler,
+                                            parser.get_watch_buffer_size(),
+                                            changestate_handler)
 
         if not parser.is_install_phase():
             # generate inventory file
@@ -155,7 +171,8 @@ def main():
 
         # initialize wsgi handler
         logging.info('Initializing the WSGI handler')
-        wsgihandler = cmwsgihandler.CMWSGIHandler(rest_api_factory)
+        wsgihandler = cmwsgihandler.CMWSGIHandler(rest_api_factory,
+                                                  parser.get_max_request_size())
 
         # start the http server
         logging.info('Start listening to http requests')
@@ -12,10 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
-import re
 import datetime
 
 from cmframework.apis import cmerror
+from cmframework.utils import cmkeyindex
 
 
 class CMSnapshot(object):
@@ -25,26 +25,19 @@ class CMSnapshot(object):
         self._handler = handler
         self._metadata = {}
         self._data = {}
+        self._keys = cmkeyindex.CMKeyIndex()
 
     def get_property(self, prop_name):
         if not self._metadata:
             raise cmerror.CMError('No data: create or load first')
 
-        properties = self.get_properties(prop_name)
-
-        return properties.get(prop_name)
+        return self._data.get(prop_name)
 
     def get_properties(self, prop_filter='.*'):
         if not self._data:
             raise cmerror.CMError('No data: create or load first')
 
-        matched_properties = {}
-        pattern = re.compile(prop_filter)
-        for key, value in self._data:
-            if pattern.match(key):
-                matched_properties[key] = value
-
-        return matched_properties
+        return {key: self._data[key] for key in self._keys.match(prop_filter)}
 
     def create(self, snapshot_name, source_backend, custom_metadata=None):
         logging.debug('create_snapshot called, snapshot name is %s', snapshot_name)
@@ -58,6 +51,7 @@ class CMSnapshot(object):
         self._metadata['custom'] = custom_metadata
 
         self._data = source_backend.get_properties('.*')
+        self._keys = cmkeyindex.CMKeyIndex(self._data)
 
         snapshot_data = {'snapshot_properties': self._data, 'snapshot_metadata': self._metadata}
         self._handler.set_data(snapshot_name, snapshot_data)
@@ -75,6 +69,7 @@ class CMSnapshot(object):
             raise cmerror.CMError('Could not load snapshot metadata for {}'.format(snapshot_name))
 
         self._data = snapshot_data.get('snapshot_properties')
+        self._keys = cmkeyindex.CMKeyIndex(self._data or {})
 
     def restore(self, target_backend):
         logging.debug('restore_snapshot called')
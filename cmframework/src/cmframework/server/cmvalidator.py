@@ -14,20 +14,33 @@
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 import logging
 
+import eventlet
+from eventlet import greenpool
+
+from cmframework.apis import cmerror
 from cmframework.utils.cmpluginloader import CMPluginLoader
 from cmframework.utils.cmpluginmanager import CMPluginManager
+from cmframework.utils import cmconfigview
 
 
 class CMValidator(CMPluginManager):
-    def __init__(self, plugins_path, plugin_client):
+    def __init__(self, plugins_path, plugin_client, workers=1, plugin_timeout=0):
         logging.info('Validator constructor, plugins_path is %s', plugins_path)
         CMPluginManager.__init__(self, plugins_path)
         self.load_plugin()
         self.plugin_client = plugin_client
+        # the number of plugins validating a change in parallel, with one
+        # worker the validation stops at the first rejection
+        self.workers = workers
+        # the seconds a plugin may use for validating a change, 0 is no limit.
+        # The timeout is cooperative, it fires only when the plugin yields to
+        # eventlet, so a plugin busy with the CPU or blocking in unpatched I/O
+        # still holds the change until it returns.
+        self.plugin_timeout = plugin_timeout
 
     def load_plugin(self):
         pl = CMPluginLoader(self.plugins_path)
-        self.pluginlist, self.filterdict = pl.load()
+        self.set_plugins(*pl.load())
         logging.info('Plugin(s): %r', self.pluginlist)
         logging.info('Subscription(s): %r', self.filterdict)
 
@@ -38,18 +51,61 @@ class CMValidator(CMPluginManager):
         self.validate_plugins(indata, 'validate_set')
 
     def validate_plugins(self, indata, operation):
-        # import pdb; pdb.set_trace()
         logging.debug('validate_plugins called with data %s', indata)
-        for plugin, objectname in self.pluginlist.iteritems():
-            filtername = self.filterdict[plugin]
-            inputdata = self.build_input(indata, filtername)
-            if inputdata:
-                logging.debug('Calling validation plugin %s with %s', plugin, inputdata)
-                class_name = getattr(objectname, plugin)
-                instance = class_name()
-                instance.plugin_client = self.plugin_client
-                try:
-                    func = getattr(instance, operation)
-                    func(inputdata)
-                except AttributeError:
-                    logging.info('Plugin %s does have function %s implemented', plugin, operation)
+        inputs = sorted(self.dispatch(indata).iteritems())
+        # the backend does not change during the validation, the plugins
+        # share what has been read from it and the view of the changed data
+        client = cmconfigview.CMCachingPluginClient(self.plugin_client)
+        if operation == 'validate_delete':
+            view = cmconfigview.CMConfigView(client, deleted=indata)
+        else:
+            view = cmconfigview.CMConfigView(client, properties=indata)
+
+        if self.workers <= 1 or len(inputs) <= 1:
+            for plugin, inputdata in inputs:
+                self._validate_plugin(plugin, inputdata, operation, client, view)
+            return
+
+        errors = {}
+        pool = greenpool.GreenPool(self.workers)
+        for plugin, inputdata in inputs:
+            pool.spawn_n(self._collect_errors, plugin, inputdata, operation, client, view,
+                         errors)
+        pool.waitall()
+
+        if len(errors) == 1:
+            raise errors.values()[0]
+        if errors:
+            raise cmerror.CMError('Validation failed: {}'.format(
+                '; '.join('{}: {}'.format(plugin, str(exp))
+                          for plugin, exp in sorted(errors.iteritems()))))
+
+    def _collect_errors(self, plugin, inputdata, operation, client, view, errors):
+        try:
+            self._validate_plugin(plugin, inputdata, operation, client, view)
+        except Exception as exp:  # pylint: disable=broad-except
+            logging.info('Plugin %s rejected the change: %s', plugin, str(exp))
+            errors[plugin] = exp
+
+    def _validate_plugin(self, plugin, inputdata, operation, client, view):
+        logging.debug('Calling validation plugin %s with %s', plugin, inputdata)
+        instance = self.create_instance(plugin, client)
+        instance.config_view = view
+        timeout = None
+        if self.plugin_timeout:
+            timeout = eventlet.Timeout(self.plugin_timeout)
+        try:
+            func = getattr(instance, operation)
+            func(inputdata)
+        except AttributeError:
+            logging.info('Plugin %s does have function %s implemented', plugin, operation)
+        except eventlet.Timeout as exp:
+            if exp is not timeout:
+                raise
+            logging.error('Plugin %s did not validate the change in %s seconds',
+                          plugin, self.plugin_timeout)
+            raise cmerror.CMError('Validation plugin {} timed out after {} seconds'.format(
+                plugin, self.plugin_timeout))
+        finally:
+            if timeout is not None:
+                timeout.cancel()
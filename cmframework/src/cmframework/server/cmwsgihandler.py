@@ -23,7 +23,12 @@ from cmframework.server import cmhttprpc
 
 
 class CMWSGIHandler(object):
-    def __init__(self, rest_api_factory):
+    # the default maximum size of a request body in bytes
+    MAX_REQUEST_SIZE = 64 * 1024 * 1024
+    # the size of the parts the request body is read in
+    READ_CHUNK_SIZE = 65536
+
+    def __init__(self, rest_api_factory, max_request_size=MAX_REQUEST_SIZE):
         logging.debug('CMWSGIHandler constructor called')
         self.mapper = routes.Mapper()
         self.mapper.connect(None, '/cm/apis', action='get_apis')
@@ -39,9 +44,30 @@ class CMWSGIHandler(object):
         self.mapper.connect(None, '/cm/{api}/activator', action='handle_activate')
         self.mapper.connect(None, '/cm/{api}/reboot', action='handle_reboot')
         self.mapper.connect(None, '/cm/{api}/changes', action='handle_changes')
+        self.mapper.connect(None, '/cm/{api}/changes/{change}', action='handle_change')
+        self.mapper.connect(None, '/cm/{api}/watch', action='handle_watch')
+        self.mapper.connect(None, '/cm/{api}/batch', action='handle_batch')
+        self.mapper.connect(None, '/cm/{api}/debug/locks', action='handle_debug_locks')
+        self.mapper.connect(None, '/cm/{api}/debug/backend', action='handle_debug_backend')
         self.rest_api_factory = rest_api_factory
+        self.max_request_size = max_request_size
 
     def __call__(self, environ, start_response):
+        rpc = self._handle_request(environ)
+
+        logging.info('Replying with rpc=%s', str(rpc))
+        if rpc.rep_stream is not None and rpc.rep_status == CMHTTPErrors.get_ok_status():
+            start_response(rpc.rep_status,
+                           [('Content-type', rpc.rep_content_type)] + rpc.rep_headers)
+            # send every part of the stream as soon as it is available
+            environ['eventlet.minimum_write_chunk_size'] = 0
+            return rpc.rep_stream
+
+        response_headers = [('Content-type', 'application/json')] + rpc.rep_headers
+        start_response(rpc.rep_status, response_headers)
+        return [rpc.rep_body]
+
+    def _handle_request(self, environ):
         logging.debug('Handling request started, environ=%s', str(environ))
         # for debug, print environment
         # pprint.pprint(environ)
@@ -52,6 +78,9 @@ class CMWSGIHandler(object):
 
         # get the interesting fields
         rpc.req_method = environ['REQUEST_METHOD']
+        for key, value in environ.iteritems():
+            if key.startswith('HTTP_'):
+                rpc.req_headers[key[5:].replace('_', '-').lower()] = value
         path = environ['PATH_INFO']
         try:
             rpc.req_filter = urlparse.parse_qs(urllib.unquote(environ['QUERY_STRING']))
@@ -80,11 +109,11 @@ class CMWSGIHandler(object):
             if content_size and int(content_size):
                 size = int(content_size)
                 if content_type == 'application/json':
-                    totalread = 0
-                    while totalread < size:
-                        data = environ['wsgi.input'].read()
-                        totalread += len(data)
-                        rpc.req_body += data
+                    if size > self.max_request_size:
+                        rpc.rep_status = CMHTTPErrors.get_request_too_large_status()
+                        rpc.rep_status += ', the maximum size is %d bytes' % self.max_request_size
+                        return rpc
+                    rpc.req_body = CMWSGIHandler._read_body(environ['wsgi.input'], size)
                 else:
                     rpc.rep_status = CMHTTPErrors.get_unsupported_content_type_status()
                     raise cmerror.CMError('Only json content is supported')
@@ -106,11 +135,20 @@ class CMWSGIHandler(object):
             rpc.rep_status = CMHTTPErrors.get_internal_error_status()
             rpc.rep_status += ','
             rpc.rep_status += str(exp)
-        finally:
-            logging.info('Replying with rpc=%s', str(rpc))
-            response_headers = [('Content-type', 'application/json')]
-            start_response(rpc.rep_status, response_headers)
-            yield rpc.rep_body
+
+        return rpc
+
+    @staticmethod
+    def _read_body(stream, size):
+        chunks = []
+        totalread = 0
+        while totalread < size:
+            data = stream.read(min(CMWSGIHandler.READ_CHUNK_SIZE, size - totalread))
+            if not data:
+                raise cmerror.CMError('The request body is shorter than its content length')
+            chunks.append(data)
+            totalread += len(data)
+        return ''.join(chunks)
 
     def get_apis(self, rpc):
         logging.debug('get_apis called')
@@ -180,6 +218,36 @@ class CMWSGIHandler(object):
         if api:
             api.handle_changes(rpc)
 
+    def handle_change(self, rpc):
+        logging.debug('handle_change called')
+        api = self._get_api(rpc)
+        if api:
+            api.handle_change(rpc)
+
+    def handle_watch(self, rpc):
+        logging.debug('handle_watch called')
+        api = self._get_api(rpc)
+        if api:
+            api.handle_watch(rpc)
+
+    def handle_batch(self, rpc):
+        logging.debug('handle_batch called')
+        api = self._get_api(rpc)
+        if api:
+            api.handle_batch(rpc)
+
+    def handle_debug_locks(self, rpc):
+        logging.debug('handle_debug_locks called')
+        api = self._get_api(rpc)
+        if api:
+            api.handle_debug_locks(rpc)
+
+    def handle_debug_backend(self, rpc):
+        logging.debug('handle_debug_backend called')
+        api = self._get_api(rpc)
+        if api:
+            api.handle_debug_backend(rpc)
+
     def _get_api(self, rpc):
         logging.debug('_get_api called')
         api = None
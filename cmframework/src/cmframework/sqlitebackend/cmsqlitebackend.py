@@ -0,0 +1,211 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import print_function
+import logging
+import threading
+import sqlite3
+import re
+import os
+import stat
+
+from cmframework.apis import cmbackend
+from cmframework.apis import cmerror
+from cmframework.utils.cmkeyindex import get_literal_prefix
+
+# the default limit of the host parameters in one sqlite statement is 999
+MAX_VARIABLES = 500
+
+
+def _regexp(pattern, name):
+    # the re module caches the compiled patterns
+    return re.match(pattern, name) is not None
+
+
+def _get_prefix_upper_bound(prefix):
+    # the smallest string greater than all the strings starting with prefix,
+    # sqlite compares the utf-8 encoded bytes of the names
+    if isinstance(prefix, unicode):
+        prefix = prefix.encode('utf-8')
+    prefix = prefix.rstrip('\xff')
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class CMSQLiteBackend(cmbackend.CMBackend):
+    """
+    Store the properties in an sqlite database in WAL mode.
+
+    The names are the primary key of the properties table, so single
+    properties and filters starting with a literal prefix are looked up via the
+    index. The rest of the filter is matched with the REGEXP function. Every
+    operation is done in one transaction.
+    """
+
+    def __init__(self, **kw):
+        self.uri = kw['uri']
+        logging.debug('CMSQLiteBackend constructor called, uri=%s', self.uri)
+        self.lock = threading.Lock()
+        try:
+            self.connection = sqlite3.connect(self.uri, check_same_thread=False)
+            os.chmod(self.uri, stat.S_IRUSR | stat.S_IWUSR)
+            # return the values as str like the other backends do
+            self.connection.text_factory = str
+            self.connection.create_function('REGEXP', 2, _regexp)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=FULL')
+            with self.connection:
+                self.connection.execute('CREATE TABLE IF NOT EXISTS properties ('
+                                        'name TEXT PRIMARY KEY NOT NULL, '
+                                        'value TEXT NOT NULL)')
+        except (sqlite3.Error, OSError) as exp:
+            raise cmerror.CMError(str(exp))
+
+    def _execute(self, statement, args=()):
+        with self.lock:
+            try:
+                return self.connection.execute(statement, args).fetchall()
+            except sqlite3.Error as exp:
+                raise cmerror.CMError(str(exp))
+
+    def _get_filter_condition(self, prop_filter):
+        # use the index for the range of names starting with the literal
+        # prefix of the filter
+        conditions = []
+        args = []
+        prefix = get_literal_prefix(prop_filter)
+        if prefix:
+            conditions.append('name >= ?')
+            args.append(prefix)
+            upper_bound = _get_prefix_upper_bound(prefix)
+            if upper_bound:
+                conditions.append('name < ?')
+                args.append(upper_bound)
+        conditions.append('name REGEXP ?')
+        args.append(prop_filter)
+        return ' AND '.join(conditions), args
+
+    def get_property(self, prop_name):
+        logging.debug('get_property called for %s', prop_name)
+        rows = self._execute('SELECT value FROM properties WHERE name = ?', (prop_name,))
+        if not rows:
+            raise cmerror.CMError('Invalid property name')
+        return rows[0][0]
+
+    def get_properties(self, prop_filter):
+        logging.debug('get_properties called with filter %s', prop_filter)
+        condition, args = self._get_filter_condition(prop_filter)
+        rows = self._execute('SELECT name, value FROM properties WHERE ' + condition, args)
+        return dict(rows)
+
+    def get_properties_page(self, prop_filter, cursor=None, limit=None):
+        logging.debug('get_properties_page called with filter %s after %s', prop_filter, cursor)
+        condition, args = self._get_filter_condition(prop_filter)
+        if cursor is not None:
+            condition = 'name > ? AND ' + condition
+            args.insert(0, cursor)
+        statement = 'SELECT name, value FROM properties WHERE ' + condition + ' ORDER BY name'
+        if limit is not None:
+            statement += ' LIMIT ?'
+            args.append(limit)
+        return self._execute(statement, args)
+
+    def get_properties_by_names(self, names):
+        logging.debug('get_properties_by_names called for %s', names)
+        names = list(names)
+        props = {}
+        for i in xrange(0, len(names), MAX_VARIABLES):
+            part = names[i:i + MAX_VARIABLES]
+            rows = self._execute('SELECT name, value FROM properties WHERE name IN ({})'.format(
+                ', '.join('?' * len(part))), part)
+            props.update(rows)
+        return props
+
+    def set_property(self, prop_name, prop_value):
+        logging.debug('set_property %s=%s', prop_name, prop_value)
+        self.commit({prop_name: prop_value}, [])
+
+    def set_properties(self, properties):
+        logging.debug('set_properties called props=%s', str(properties))
+        self.commit(properties, [])
+
+    def delete_property(self, prop_name):
+        logging.debug('delete_property called for %s', prop_name)
+        with self.lock:
+            try:
+                with self.connection:
+                    cursor = self.connection.execute('DELETE FROM properties WHERE name = ?',
+                                                     (prop_name,))
+                    if not cursor.rowcount:
+                        raise cmerror.CMError('Property not found')
+            except sqlite3.Error as exp:
+                raise cmerror.CMError(str(exp))
+
+    def delete_properties(self, arg):
+        logging.debug('delete_properties called with arg %s', arg)
+        if isinstance(arg, str):
+            condition, args = self._get_filter_condition(arg)
+            with self.lock:
+                try:
+                    with self.connection:
+                        self.connection.execute('DELETE FROM properties WHERE ' + condition,
+                                                args)
+                except sqlite3.Error as exp:
+                    raise cmerror.CMError(str(exp))
+        else:
+            self.commit({}, arg)
+
+    def commit(self, properties, deleted):
+        logging.debug('commit called props=%s, deleted=%s', str(properties), deleted)
+        with self.lock:
+            try:
+                with self.connection:
+                    self.connection.executemany('DELETE FROM properties WHERE name = ?',
+                                                ((name,) for name in deleted))
+                    self.connection.executemany('INSERT OR REPLACE INTO properties '
+                                                '(name, value) VALUES (?, ?)',
+                                                properties.iteritems())
+            except sqlite3.Error as exp:
+                raise cmerror.CMError(str(exp))
+
+
+def main():
+    import sys
+
+    filepath = sys.argv[1]
+    try:
+        print('Initializing backend at %s' % filepath)
+        backend = CMSQLiteBackend(uri=filepath)
+        print('Adding key1=value1')
+        backend.set_property("key1", "value1")
+        properties = {'key2': 'value2', 'key3': 'value3'}
+        print('Adding %s' % str(properties))
+        backend.set_properties(properties)
+        print('Getting key1')
+        value = backend.get_property('key1')
+        print('value of key1 is %s' % value)
+        print('Deleting key2')
+        backend.delete_property('key2')
+        print('Getting *')
+        properties = backend.get_properties('.*')
+        print('Got %s' % str(properties))
+        print('Delete all properties')
+        backend.delete_properties('.*')
+    except cmerror.CMError as exp:
+        print('Got exeption %s' % str(exp))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,11 @@ from cmframework.utils.cmstatehandler import CMStateHandler
 
 
 class CMActivationStateHandler(CMStateHandler):
+    WATERMARK_DOMAIN = 'cm.activation_watermark'
+    CHANGES_DOMAIN = 'cm.changes'
+    JOURNAL_DOMAIN = 'cm.journal'
+    JOURNAL_HORIZON = 'horizon'
+
     def set_full_failed(self, failed_activators):
         logging.debug('set_full_failed called with: %s', failed_activators)
 
@@ -37,3 +42,110 @@ class CMActivationStateHandler(CMStateHandler):
         logging.debug('clear_full_failed called')
 
         self.plugin.set('cm.activation_status', 'full', json.dumps([]))
+
+    @staticmethod
+    def _get_watermark_name(plugin, target):
+        if not target:
+            return plugin
+        return '{}@{}'.format(plugin, target)
+
+    def get_watermark(self, plugin, target=None):
+        """get the csn and the hash of the data of the last successful full
+           activation of the plugin, None is returned if there is no such
+           activation
+        """
+        logging.debug('get_watermark called for %s %s', plugin, target)
+
+        watermark = self.plugin.get(CMActivationStateHandler.WATERMARK_DOMAIN,
+                                    CMActivationStateHandler._get_watermark_name(plugin, target))
+        if not watermark:
+            return None
+
+        return json.loads(watermark)
+
+    def set_watermark(self, plugin, target, csn, digest):
+        logging.debug('set_watermark called for %s %s: %s %s', plugin, target, csn, digest)
+
+        self.plugin.set(CMActivationStateHandler.WATERMARK_DOMAIN,
+                        CMActivationStateHandler._get_watermark_name(plugin, target),
+                        json.dumps({'csn': csn, 'hash': digest}))
+
+    def clear_watermark(self, plugin, target=None):
+        logging.debug('clear_watermark called for %s %s', plugin, target)
+
+        self.plugin.delete(CMActivationStateHandler.WATERMARK_DOMAIN,
+                           CMActivationStateHandler._get_watermark_name(plugin, target))
+
+    def clear_all_watermarks(self, plugin):
+        """clear the watermarks of the plugin for all the targets"""
+        logging.debug('clear_all_watermarks called for %s', plugin)
+
+        watermarks = self.plugin.get_domain(CMActivationStateHandler.WATERMARK_DOMAIN) or []
+        prefix = '{}@'.format(plugin).lower()
+        for name, _ in watermarks:
+            if name.lower() == plugin.lower() or name.lower().startswith(prefix):
+                self.plugin.delete(CMActivationStateHandler.WATERMARK_DOMAIN, name)
+
+    def set_change_state(self, uuid_value, info):
+        logging.debug('set_change_state called for %s: %s', uuid_value, info)
+
+        # the error messages can contain % which has a special meaning for
+        # some of the state handlers, in json it can only be in a string
+        value = json.dumps(info).replace('%', '\\u0025')
+        self.plugin.set(CMActivationStateHandler.CHANGES_DOMAIN, uuid_value, value)
+
+    def get_change_states(self):
+        """get the stored change states by the change uuid"""
+        logging.debug('get_change_states called')
+
+        changes = self.plugin.get_domain(CMActivationStateHandler.CHANGES_DOMAIN) or []
+        return {uuid_value: json.loads(info) for uuid_value, info in changes}
+
+    def delete_change_state(self, uuid_value):
+        logging.debug('delete_change_state called for %s', uuid_value)
+
+        self.plugin.delete(CMActivationStateHandler.CHANGES_DOMAIN, uuid_value)
+
+    def get_journal(self):
+        """get the stored change journal
+
+           Return:
+
+           A (horizon, changes) tuple, changes is a dictionary of the changes
+           by their csn, each change is a dictionary with the lists of the
+           'set' and 'deleted' property names. The horizon is None if the
+           journal is not stored.
+        """
+        logging.debug('get_journal called')
+
+        horizon = None
+        changes = {}
+        for name, value in self.plugin.get_domain(CMActivationStateHandler.JOURNAL_DOMAIN) or []:
+            if name == CMActivationStateHandler.JOURNAL_HORIZON:
+                horizon = int(value)
+            else:
+                changes[int(name)] = json.loads(value)
+        return horizon, changes
+
+    def set_journal_entry(self, csn, props, deleted):
+        logging.debug('set_journal_entry called for %d', csn)
+
+        # the names can contain %, see set_change_state
+        value = json.dumps({'set': props, 'deleted': deleted}).replace('%', '\\u0025')
+        self.plugin.set(CMActivationStateHandler.JOURNAL_DOMAIN, str(csn), value)
+
+    def delete_journal_entry(self, csn):
+        logging.debug('delete_journal_entry called for %d', csn)
+
+        self.plugin.delete(CMActivationStateHandler.JOURNAL_DOMAIN, str(csn))
+
+    def set_journal_horizon(self, horizon):
+        logging.debug('set_journal_horizon called with %d', horizon)
+
+        self.plugin.set(CMActivationStateHandler.JOURNAL_DOMAIN,
+                        CMActivationStateHandler.JOURNAL_HORIZON, str(horizon))
+
+    def clear_journal(self):
+        logging.debug('clear_journal called')
+
+        self.plugin.delete_domain(CMActivationStateHandler.JOURNAL_DOMAIN)
@@ -43,7 +43,8 @@ class CMActivationWork(object):
                  csn=0,
                  props=None,
                  target=None,
-                 startup_activation=False):
+                 startup_activation=False,
+                 force=False):
         self.operation = operation
         self.csn = csn
         if not props:
@@ -55,14 +56,22 @@ class CMActivationWork(object):
         self.condition.acquire()
         self.result = None
         self.uuid_value = None
+        # the uuids of the changes merged into this work besides uuid_value
+        self.merged_uuids = []
+        # the works merged into this work
+        self.merged_works = []
         self.startup_activation = startup_activation
+        # run all the plugins of a full activation even if their data has
+        # not changed since their last activation
+        self.force = force
 
     def __str__(self):
-        return '(%r %d %r %r %r)' % (self._get_operation_name(),
-                                     self.csn,
-                                     self.props,
-                                     self.target,
-                                     self.startup_activation)
+        return '(%r %d %r %r %r %r)' % (self._get_operation_name(),
+                                        self.csn,
+                                        self.props,
+                                        self.target,
+                                        self.startup_activation,
+                                        self.force)
 
     def _get_operation_name(self):
         return CMActivationWork.OPER_NAMES[self.operation]
@@ -79,11 +88,18 @@ class CMActivationWork(object):
     def get_target(self):
         return self.target
 
+    def get_uuids(self):
+        if not self.uuid_value:
+            return []
+        return [self.uuid_value] + self.merged_uuids
+
     def add_result(self, result):
         self.condition.acquire()
         self.result = result
         self.condition.notify()
         self.condition.release()
+        for work in self.merged_works:
+            work.add_result(result)
 
     def get_result(self):
         self.condition.acquire()
@@ -98,6 +114,9 @@ class CMActivationWork(object):
     def is_startup_activation(self):
         return self.startup_activation
 
+    def is_forced(self):
+        return self.force
+
     def serialize(self):
         try:
             data = {}
@@ -106,6 +125,7 @@ class CMActivationWork(object):
             data['properties'] = self.props
             data['result'] = self.result
             data['startup_activation'] = self.startup_activation
+            data['force'] = self.force
             return json.dumps(data)
         except Exception as exp:
             raise cmerror.CMError(str(exp))
@@ -118,6 +138,7 @@ class CMActivationWork(object):
             self.props = data['properties']
             self.result = data['result']
             self.startup_activation = data['startup_activation']
+            self.force = data.get('force', False)
         except Exception as exp:
             raise cmerror.CMError(str(exp))
 
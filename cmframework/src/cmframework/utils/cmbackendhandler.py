@@ -13,7 +13,9 @@
 # limitations under the License.
 from __future__ import print_function
 import logging
+import threading
 from cmframework.apis import cmerror
+from cmframework.utils import cmpropertycache
 
 
 class CMBackendHandler(object):
@@ -33,27 +35,176 @@ class CMBackendHandler(object):
             raise cmerror.CMError(str(exp1))
         except Exception as exp2:
             raise cmerror.CMError(str(exp2))
+        self.cache = None
+        # the number of the writes done through the handler, it changes also
+        # on the writes not changing the csn
+        self.writes = 0
+        self.writes_lock = threading.Lock()
+        self.recorder = None
+        self.csn_name = None
+
+    def set_recorder(self, recorder, csn_name):
+        """give the changes written through the handler to a recorder
+
+           The server records every change with a new csn, also the ones
+           written by the plugins through the handler.
+
+           Arguments:
+
+           recorder: A callable taking the props and deleted of a change, it
+                     writes the change together with a new csn through the
+                     handler and records it.
+
+           csn_name: The name of the property containing the csn, the writes
+                     changing it are done by the recorder and not recorded
+                     again.
+        """
+        self.recorder = recorder
+        self.csn_name = csn_name
+
+    def enable_cache(self, max_entries, version_name, check_interval):
+        """cache the properties read through the handler
+
+           Arguments:
+
+           max_entries: The maximum number of cached properties.
+
+           version_name: The name of the property changed on every write, the
+                         cache is dropped when its value is changed by another
+                         writer.
+
+           check_interval: The time in seconds after which the version
+                           property is read again from the backend.
+        """
+        logging.info('Enabling property cache of %d entries', max_entries)
+        self.cache = cmpropertycache.CMPropertyCache(max_entries, version_name, check_interval)
+
+    def get_stats(self):
+        """get the state and statistics of the backend plugin and the cache"""
+        stats = {'backend': self.plugin.get_stats()}
+        if self.cache:
+            stats['cache'] = self.cache.get_stats()
+        return stats
+
+    def get_cache_stats(self):
+        if not self.cache:
+            return {}
+        return self.cache.get_stats()
+
+    def _get_version(self):
+        try:
+            return self.plugin.get_property(self.cache.version_name)
+        except cmerror.CMError:
+            return None
+
+    def _read(self, kind, key, func):
+        if not self.cache:
+            return func(key)
+        self.cache.validate(self._get_version)
+        value = self.cache.get(kind, key)
+        if value is None:
+            generation = self.cache.get_generation()
+            value = func(key)
+            self.cache.add(kind, key, value, generation)
+        return value
+
+    def get_write_count(self):
+        with self.writes_lock:
+            return self.writes
+
+    def _is_recorded(self, props, deleted):
+        return (self.recorder is not None and props is not None and
+                self.csn_name not in props and self.csn_name not in deleted)
+
+    def _write(self, props, deleted, func, *args):
+        try:
+            if self._is_recorded(props, deleted):
+                if props or deleted:
+                    self.recorder(props, deleted)
+                return None
+            return self._write_through_cache(props, deleted, func, *args)
+        finally:
+            with self.writes_lock:
+                self.writes += 1
+
+    def _write_through_cache(self, props, deleted, func, *args):
+        if not self.cache:
+            return func(*args)
+        # a change done by another writer after the last check would be
+        # hidden by the new version written now
+        self.cache.validate(self._get_version, force=True)
+        try:
+            result = func(*args)
+        except Exception:
+            # the backend can be partly updated
+            self.cache.clear()
+            raise
+        if props is None:
+            self.cache.clear()
+        else:
+            self.cache.apply(props, deleted)
+        return result
 
     def get_property(self, prop_name):
         logging.debug('get_property called for %s', prop_name)
-        return self.plugin.get_property(prop_name)
+        return self._read(cmpropertycache.CMPropertyCache.PROPERTY, prop_name,
+                          self.plugin.get_property)
 
     def get_properties(self, prop_filter):
         logging.debug('get_properties called with filter %s', prop_filter)
-        return self.plugin.get_properties(prop_filter)
+        return self._read(cmpropertycache.CMPropertyCache.FILTER, prop_filter,
+                          self.plugin.get_properties)
+
+    def get_properties_page(self, prop_filter, cursor=None, limit=None):
+        logging.debug('get_properties_page called with filter %s after %s', prop_filter, cursor)
+        # the pages are not cached, the writes are done through the backend
+        # so it is always up to date
+        return self.plugin.get_properties_page(prop_filter, cursor, limit)
+
+    def get_properties_by_names(self, names):
+        logging.debug('get_properties_by_names called for %s', names)
+        if not self.cache:
+            return self.plugin.get_properties_by_names(names)
+        self.cache.validate(self._get_version)
+        props = {}
+        missing = []
+        for name in names:
+            value = self.cache.get(cmpropertycache.CMPropertyCache.PROPERTY, name)
+            if value is None:
+                missing.append(name)
+            else:
+                props[name] = value
+        if missing:
+            generation = self.cache.get_generation()
+            values = self.plugin.get_properties_by_names(missing)
+            for name, value in values.iteritems():
+                self.cache.add(cmpropertycache.CMPropertyCache.PROPERTY, name, value, generation)
+            props.update(values)
+        return props
 
     def set_property(self, prop_name, prop_value):
         logging.debug('set_property called for setting %s=%s', prop_name, prop_value)
-        return self.plugin.set_property(prop_name, prop_value)
+        return self._write({prop_name: prop_value}, [],
+                           self.plugin.set_property, prop_name, prop_value)
 
     def set_properties(self, props):
         logging.debug('set_properties called for properties %s', str(props))
-        return self.plugin.set_properties(props)
+        return self._write(props, [], self.plugin.set_properties, props)
 
     def delete_property(self, prop_name):
         logging.debug('delete_property called for %s', prop_name)
-        return self.plugin.delete_property(prop_name)
+        return self._write({}, [prop_name], self.plugin.delete_property, prop_name)
 
     def delete_properties(self, prop_filter):
         logging.debug('delete_properties called with filter %s', prop_filter)
-        return self.plugin.delete_properties(prop_filter)
+        if isinstance(prop_filter, str):
+            if self.recorder is not None:
+                # the names of the recorded deletes must be known
+                return self.delete_properties(self.get_properties(prop_filter).keys())
+            # the deleted names are not known
+            return self._write(None, None, self.plugin.delete_properties, prop_filter)
+        return self._write({}, prop_filter, self.plugin.delete_properties, prop_filter)
+
+    def commit(self, props, deleted):
+        logging.debug('commit called for properties %s, deleting %s', str(props), deleted)
+        return self._write(props, deleted, self.plugin.commit, props, deleted)
@@ -16,8 +16,19 @@ from cmframework.utils import cmbackendhandler
 
 
 class CMBackendPluginClient(cmpluginclient.CMPluginClient):
-    def __init__(self, plugin_path, **args):
-        self.backend = cmbackendhandler.CMBackendHandler(plugin_path, **args)
+    def __init__(self, plugin_path, backend=None, **args):
+        """
+        Arguments:
+
+        plugin_path: The module.class of the backend plugin.
+
+        backend: The CMBackendHandler to use, the server gives its own so
+                 that the writes of the plugins go through its cache. If not
+                 given a new handler of the plugin is constructed with args.
+        """
+        if backend is None:
+            backend = cmbackendhandler.CMBackendHandler(plugin_path, **args)
+        self.backend = backend
 
     def get_property(self, prop_name):
         return self.backend.get_property(prop_name)
@@ -0,0 +1,84 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import time
+
+from cmframework.apis import cmerror
+
+
+class CMCircuitBreaker(object):
+    """
+    Fail fast while a remote service is known to be down.
+
+    The breaker is closed as long as the calls succeed. After failure_threshold
+    consecutive failures it opens and all calls are rejected for reset_timeout
+    seconds. After that one call is let through (half-open), its result decides
+    whether the breaker closes again or stays open for another period.
+    """
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_ongoing = False
+
+    def get_state(self):
+        if self.opened_at is None:
+            return CMCircuitBreaker.STATE_CLOSED
+        if time.time() - self.opened_at < self.reset_timeout:
+            return CMCircuitBreaker.STATE_OPEN
+        return CMCircuitBreaker.STATE_HALF_OPEN
+
+    def get_stats(self):
+        return {'name': self.name,
+                'state': self.get_state(),
+                'failures': self.failures}
+
+    def is_open(self):
+        return self.get_state() == CMCircuitBreaker.STATE_OPEN
+
+    def check(self):
+        state = self.get_state()
+        if state == CMCircuitBreaker.STATE_OPEN:
+            raise cmerror.CMError('{} is not available'.format(self.name))
+        if state == CMCircuitBreaker.STATE_HALF_OPEN:
+            if self.trial_ongoing:
+                raise cmerror.CMError('{} is not available'.format(self.name))
+            logging.info('Circuit for %s is half-open, trying a call', self.name)
+            self.trial_ongoing = True
+
+    def success(self):
+        if self.opened_at is not None:
+            logging.info('Circuit for %s closed', self.name)
+        self.failures = 0
+        self.opened_at = None
+        self.trial_ongoing = False
+
+    def cancel_trial(self):
+        # the call failed before reaching the service
+        self.trial_ongoing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.trial_ongoing or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logging.error('Circuit for %s opened after %d failures', self.name, self.failures)
+            self.opened_at = time.time()
+        self.trial_ongoing = False
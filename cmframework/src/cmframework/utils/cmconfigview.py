@@ -0,0 +1,130 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+
+from cmdatahandlers.api import configmanager
+
+from cmframework.apis import cmerror
+from cmframework.apis import cmpluginclient
+from cmframework.utils import cmkeyindex
+
+
+class CMCachingPluginClient(cmpluginclient.CMPluginClient):
+    """
+    Plugin client remembering what it has read from the backend.
+
+    It is used while the backend is known not to change, like during the
+    validation of one change, so the plugins reading the same properties cause
+    only one backend read.
+    """
+
+    def __init__(self, plugin_client):
+        self.plugin_client = plugin_client
+        self.properties = {}
+        self.filters = {}
+
+    def get_property(self, prop_name):
+        if prop_name not in self.properties:
+            self.properties[prop_name] = self.plugin_client.get_property(prop_name)
+        return self.properties[prop_name]
+
+    def get_properties(self, prop_filter):
+        if prop_filter not in self.filters:
+            self.filters[prop_filter] = self.plugin_client.get_properties(prop_filter)
+        return dict(self.filters[prop_filter])
+
+    def set_property(self, name, value):
+        self.properties.clear()
+        self.filters.clear()
+        return self.plugin_client.set_property(name, value)
+
+
+class CMConfigView(cmpluginclient.CMPluginClient):
+    """
+    Read-only view of the configuration with pending changes applied.
+
+    The properties are read from the backend on demand through a caching
+    client, the pending changes are applied on top of them. The values are
+    decoded from json only when asked for and the decoded values and the
+    ConfigManager built from them are shared by all the users of the view.
+    """
+
+    def __init__(self, plugin_client, properties=None, deleted=None):
+        """
+        Arguments:
+
+        plugin_client: The client used to read the backend, usually a
+                       CMCachingPluginClient.
+
+        properties: A dictionary of the pending property values.
+
+        deleted: A list of the pending deleted property names.
+        """
+        self.plugin_client = plugin_client
+        self.properties = properties or {}
+        self.deleted = set(deleted or [])
+        self.keys = None
+        self.decoded = {}
+        self.confman = None
+
+    def get_property(self, prop_name):
+        if prop_name in self.properties:
+            return self.properties[prop_name]
+        if prop_name in self.deleted:
+            raise cmerror.CMError('Invalid property name')
+        return self.plugin_client.get_property(prop_name)
+
+    def get_properties(self, prop_filter):
+        props = self.plugin_client.get_properties(prop_filter)
+        for name in self.deleted:
+            props.pop(name, None)
+        if self.properties:
+            if self.keys is None:
+                self.keys = cmkeyindex.CMKeyIndex(self.properties)
+            for name in self.keys.match(prop_filter):
+                props[name] = self.properties[name]
+        return props
+
+    def set_property(self, name, value):
+        raise cmerror.CMError('The configuration view is read-only')
+
+    def get_json(self, prop_name):
+        """get the json decoded value of a property
+
+           The value is decoded only once and shared by all the users of the
+           view, so it must not be modified.
+        """
+        if prop_name not in self.decoded:
+            self.decoded[prop_name] = json.loads(self.get_property(prop_name))
+        return self.decoded[prop_name]
+
+    def get_config_manager(self):
+        """get a ConfigManager of the configuration with the pending changes
+
+           The ConfigManager is built on the first call and shared by all the
+           users of the view, so it must not be modified.
+        """
+        if self.confman is None:
+            propsjson = {}
+            for name, value in self.get_properties('.*').iteritems():
+                if name not in self.decoded:
+                    try:
+                        self.decoded[name] = json.loads(value)
+                    except ValueError:
+                        logging.debug('Property %s is not json, not adding it', name)
+                        continue
+                propsjson[name] = self.decoded[name]
+            self.confman = configmanager.ConfigManager(propsjson)
+        return self.confman
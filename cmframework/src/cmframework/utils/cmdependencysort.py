@@ -12,9 +12,38 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import logging
+
 from cmframework.apis.cmerror import CMError
 
 
+def read_dependency_file(file_name):
+    """read the Before: and After: lists from a .deps file
+
+       Return:
+
+       A (before list, after list) tuple, the lists are empty if the file does
+       not exist.
+    """
+    before_list = []
+    after_list = []
+
+    try:
+        with open(file_name, 'r') as deps_file:
+            while True:
+                line = deps_file.readline()
+                if not line:
+                    break
+                if line.startswith('Before:'):
+                    before_list = line[7:].strip().replace(' ', '').split(',')
+                if line.startswith('After:'):
+                    after_list = line[6:].strip().replace(' ', '').split(',')
+    except IOError:
+        logging.debug('Dependency file %s not found.', file_name)
+
+    return (before_list, after_list)
+
+
 class CMDependencySort(object):
     def __init__(self, after=None, before=None):
         if not after:
@@ -51,6 +80,29 @@ class CMDependencySort(object):
         self._sort_entries()
         return self._sorted_entries
 
+    def sort_layers(self):
+        """sort the entries into layers
+
+           The entries of a layer depend only on the entries of the previous
+           layers, so the entries of one layer can be handled in parallel.
+
+           Return:
+
+           A list of the layers, a layer is a sorted list of entries.
+        """
+        self._sort_entries()
+        levels = dict.fromkeys(self._sorted_entries, 0)
+        for entry in self._sorted_entries:
+            for dep in self._before.get(entry, []):
+                levels[dep] = max(levels[dep], levels[entry] + 1)
+
+        layers = [[] for _ in range(max(levels.values()) + 1)] if levels else []
+        for entry, level in levels.iteritems():
+            layers[level].append(entry)
+        for layer in layers:
+            layer.sort()
+        return layers
+
     def _sort_entries(self):
         sorted_list = []
         permanent_mark_list = []
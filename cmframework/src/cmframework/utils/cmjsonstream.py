@@ -0,0 +1,141 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import re
+
+
+# the approximate size of the parts the encoded data is returned in
+CHUNK_SIZE = 65536
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_encode_list(key, items, chunk_size=CHUNK_SIZE, members=None):
+    """encode an object with one list member as json part by part
+
+       The items are encoded one at a time, so only about chunk_size bytes of
+       the encoded data and the item being encoded are in memory at a time.
+
+       Arguments:
+
+       key: The name of the list member.
+
+       items: An iterable of the items of the list.
+
+       chunk_size: The approximate size of the returned parts.
+
+       members: A dictionary of the other members of the object.
+
+       Return:
+
+       A generator of the parts of the encoded object.
+    """
+    parts = ['{']
+    for name, value in (members or {}).iteritems():
+        parts.append('%s: %s, ' % (json.dumps(name), json.dumps(value)))
+    parts.append('%s: [' % json.dumps(key))
+    parts = [''.join(parts)]
+    size = len(parts[0])
+    separator = ''
+    for item in items:
+        encoded = separator + json.dumps(item)
+        separator = ', '
+        parts.append(encoded)
+        size += len(encoded)
+        if size >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    parts.append(']}')
+    yield ''.join(parts)
+
+
+def decode_object(data, arrays, strict=False):
+    """decode a json object giving the items of some arrays one at a time
+
+       The items of the array members named in arrays are decoded one at a
+       time and given to the callback of the member without building a list
+       of them.
+
+       Arguments:
+
+       data: A string containing the json object.
+
+       arrays: A dictionary of the names of the array members and the
+               callbacks called with each item of them.
+
+       strict: If True the members named in arrays must be arrays, otherwise
+               their other values are returned as they are.
+
+       Return:
+
+       A dictionary of the members of the object, the value of a member whose
+       items were given to a callback is the number of the items.
+
+       Raise:
+
+       ValueError if the data is not a valid json object or a member named in
+       arrays is not an array in strict mode.
+    """
+    decoder = json.JSONDecoder()
+    members = {}
+    idx = _skip(data, _expect(data, _skip(data, 0), '{'))
+    if data[idx:idx + 1] == '}':
+        idx += 1
+    else:
+        while True:
+            key, idx = decoder.raw_decode(data, idx)
+            if not isinstance(key, basestring):
+                raise ValueError('Expecting property name at %d' % idx)
+            idx = _skip(data, _expect(data, _skip(data, idx), ':'))
+            if key in arrays and data[idx:idx + 1] == '[':
+                members[key], idx = _decode_array(decoder, data, idx + 1, arrays[key])
+            elif key in arrays and strict:
+                raise ValueError('Expecting array for %s at %d' % (key, idx))
+            else:
+                members[key], idx = decoder.raw_decode(data, idx)
+            idx = _skip(data, idx)
+            if data[idx:idx + 1] != ',':
+                break
+            idx = _skip(data, idx + 1)
+        idx = _expect(data, idx, '}')
+    if _skip(data, idx) != len(data):
+        raise ValueError('Extra data at %d' % idx)
+    return members
+
+
+def _decode_array(decoder, data, idx, callback):
+    count = 0
+    idx = _skip(data, idx)
+    if data[idx:idx + 1] == ']':
+        return count, idx + 1
+    while True:
+        item, idx = decoder.raw_decode(data, idx)
+        callback(item)
+        count += 1
+        idx = _skip(data, idx)
+        if data[idx:idx + 1] != ',':
+            break
+        idx = _skip(data, idx + 1)
+    return count, _expect(data, idx, ']')
+
+
+def _skip(data, idx):
+    return _WHITESPACE.match(data, idx).end()
+
+
+def _expect(data, idx, char):
+    if data[idx:idx + 1] != char:
+        raise ValueError('Expecting %s at %d' % (char, idx))
+    return idx + 1
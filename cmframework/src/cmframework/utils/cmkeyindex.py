@@ -0,0 +1,190 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import bisect
+import collections
+import re
+import threading
+
+
+# the number of compiled filters kept in the pattern cache
+PATTERN_CACHE_SIZE = 256
+
+_pattern_cache = collections.OrderedDict()
+_pattern_cache_lock = threading.Lock()
+
+# characters having a special meaning in the python re syntax, a literal
+# prefix of a filter ends at the first of these
+RE_SPECIAL_CHARS = '.^$*+?{}[]\\|()'
+
+
+def get_literal_prefix(prop_filter):
+    """get the literal prefix every name matched by the filter starts with
+
+       Arguments:
+
+       prop_filter: A string containing the re used to match the properties.
+
+       Return:
+
+       The literal prefix, an empty string is returned if the filter does not
+       start with a literal.
+    """
+    if '|' in prop_filter:
+        # the prefix of one alternative says nothing about the other ones
+        return ''
+
+    if get_pattern(prop_filter).flags & (re.IGNORECASE | re.VERBOSE):
+        # inline flags change the meaning of the literal characters
+        return ''
+
+    prefix = []
+    index = 0
+    if prop_filter.startswith('^'):
+        index = 1
+    while index < len(prop_filter):
+        char = prop_filter[index]
+        if char == '\\':
+            if index + 1 >= len(prop_filter) or prop_filter[index + 1].isalnum():
+                # character classes like \d or back references
+                break
+            char = prop_filter[index + 1]
+            index += 2
+        elif char in RE_SPECIAL_CHARS:
+            break
+        else:
+            index += 1
+        if index < len(prop_filter) and prop_filter[index] in '*?{':
+            # the last literal character is optional
+            break
+        prefix.append(char)
+
+    return ''.join(prefix)
+
+
+def get_pattern(prop_filter):
+    """get the compiled re of the filter from a LRU cache"""
+    with _pattern_cache_lock:
+        try:
+            pattern = _pattern_cache.pop(prop_filter)
+        except KeyError:
+            pattern = re.compile(prop_filter)
+            if len(_pattern_cache) >= PATTERN_CACHE_SIZE:
+                _pattern_cache.popitem(last=False)
+        _pattern_cache[prop_filter] = pattern
+        return pattern
+
+
+def get_prefix_upper_bound(prefix):
+    """get the smallest string greater than all the strings starting with prefix
+
+       None is returned if there is no such string.
+    """
+    prefix = prefix.rstrip(unichr(0x10ffff) if isinstance(prefix, unicode) else '\xff')
+    if not prefix:
+        return None
+    return prefix[:-1] + (unichr if isinstance(prefix, unicode) else chr)(ord(prefix[-1]) + 1)
+
+
+class CMKeyIndex(object):
+    """
+    Keep the property names in sorted order.
+
+    The names matching a filter with a literal prefix are in one contiguous
+    range of the sorted names, the range is found with bisect and the re is
+    matched only against the names inside it. Filters without a literal
+    prefix are matched against all the names.
+
+    The index is not thread safe, the caller serializes the updates with the
+    lookups.
+    """
+
+    def __init__(self, names=()):
+        self._names = sorted(set(names))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        index = bisect.bisect_left(self._names, name)
+        return index < len(self._names) and self._names[index] == name
+
+    def add(self, name):
+        index = bisect.bisect_left(self._names, name)
+        if index == len(self._names) or self._names[index] != name:
+            self._names.insert(index, name)
+
+    def remove(self, name):
+        index = bisect.bisect_left(self._names, name)
+        if index < len(self._names) and self._names[index] == name:
+            del self._names[index]
+
+    def update(self, names):
+        names = set(names)
+        if len(names) > len(self._names) / 8:
+            # cheaper to sort everything once than to insert one by one
+            self._names = sorted(names.union(self._names))
+        else:
+            for name in names:
+                self.add(name)
+
+    def discard_all(self, names):
+        names = set(names)
+        if len(names) > len(self._names) / 8:
+            self._names = [name for name in self._names if name not in names]
+        else:
+            for name in names:
+                self.remove(name)
+
+    def clear(self):
+        self._names = []
+
+    def get_range(self, prefix):
+        """get the names starting with prefix"""
+        start = bisect.bisect_left(self._names, prefix)
+        upper_bound = get_prefix_upper_bound(prefix)
+        if upper_bound is None:
+            end = len(self._names)
+        else:
+            end = bisect.bisect_left(self._names, upper_bound, start)
+        return self._names[start:end]
+
+    def match(self, prop_filter):
+        """get the sorted list of the names matching the filter"""
+        pattern = get_pattern(prop_filter)
+        prefix = get_literal_prefix(prop_filter)
+        candidates = self.get_range(prefix) if prefix else self._names
+        return [name for name in candidates if pattern.match(name)]
+
+    def match_page(self, prop_filter, cursor=None, limit=None):
+        """get the sorted list of the names matching the filter after cursor
+
+           At most limit names are returned, the names are matched only until
+           the limit is reached.
+        """
+        pattern = get_pattern(prop_filter)
+        prefix = get_literal_prefix(prop_filter)
+        start = bisect.bisect_left(self._names, prefix)
+        if cursor is not None:
+            start = max(start, bisect.bisect_right(self._names, cursor))
+        upper_bound = get_prefix_upper_bound(prefix) if prefix else None
+        names = []
+        for index in xrange(start, len(self._names)):
+            name = self._names[index]
+            if upper_bound is not None and name >= upper_bound:
+                break
+            if pattern.match(name):
+                names.append(name)
+                if limit is not None and len(names) >= limit:
+                    break
+        return names
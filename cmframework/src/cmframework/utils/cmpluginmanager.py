@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
-import re
 import logging
 
 from cmframework.apis import cmerror
+from cmframework.utils import cmkeyindex
+from cmframework.utils import cmsubscriptionindex
 
 
 class CMPluginManager(object):
@@ -24,25 +25,71 @@ class CMPluginManager(object):
         self.pluginlist = {}
         self.filterdict = {}
         self.plugins_path = plugins_path
+        self.plugin_client = None
+        self.subscriptions = cmsubscriptionindex.CMSubscriptionIndex({})
 
     # pylint: disable=no-self-use
     def load_plugin(self):
         raise cmerror.CMError('Not implemented')
 
+    def set_plugins(self, pluginlist, filterdict):
+        """take the loaded plugins and their subscriptions into use
+
+           The subscription index is built once for all the changes.
+        """
+        self.pluginlist = pluginlist
+        self.filterdict = filterdict
+        self.subscriptions = cmsubscriptionindex.CMSubscriptionIndex(filterdict)
+
+    def create_instance(self, plugin, plugin_client=None):
+        """create an instance of a plugin
+
+           A new instance is created for every call, so the plugins run in
+           parallel by the activations and validations do not share their
+           state.
+
+           Arguments:
+
+           plugin: The plugin name.
+
+           plugin_client: The plugin client given to the instance, by default
+                          the one of the manager.
+        """
+        class_name = getattr(self.pluginlist[plugin], plugin)
+        instance = class_name()
+        instance.plugin_client = plugin_client or self.plugin_client
+        return instance
+
+    def dispatch(self, indata):
+        """get the input of every plugin subscribed to some of indata"""
+        return self.subscriptions.dispatch(indata)
+
     # pylint: disable=no-self-use
-    def build_input(self, indata, filtername):
-        search_re = re.compile(filtername)
-        if isinstance(indata, dict):
-            filter_data = {}
-            for key, value in indata.iteritems():
-                logging.debug('Matching %s against %s', key, filtername)
-                if search_re.match(key):
-                    filter_data[key] = value
+    def build_input(self, indata, filtername, keyindex=None):
+        """get the part of indata matching the filter of a plugin
+
+           Arguments:
+
+           indata: A dictionary of properties or a list of property names.
+
+           filtername: The re used to match the names.
+
+           keyindex: Optional CMKeyIndex of the names in indata, when the same
+                     indata is matched against many filters the index makes
+                     the prefix anchored filters cheap.
+
+           Return:
+
+           The matching properties as a dictionary or the matching names as a
+           list.
+        """
+        logging.debug('Matching %s against %s', indata, filtername)
+        if keyindex is not None:
+            names = keyindex.match(filtername)
         else:
-            filter_data = []
-            for key in indata:
-                logging.debug('Matching %s against %s', key, filtername)
-                if search_re.match(key):
-                    filter_data.append(key)
+            pattern = cmkeyindex.get_pattern(filtername)
+            names = [key for key in indata if pattern.match(key)]
 
-        return filter_data
+        if isinstance(indata, dict):
+            return {key: indata[key] for key in names}
+        return names
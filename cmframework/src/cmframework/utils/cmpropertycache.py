@@ -0,0 +1,196 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+import collections
+import time
+
+from cmframework.utils import cmkeyindex
+
+
+class CMPropertyCache(object):
+    """
+    Bounded LRU cache of single properties and filter results.
+
+    The cache is kept up to date by applying the changes written through it.
+    Changes done by other writers are detected by comparing the value of the
+    version property (the csn) with the one in the backend, the whole cache
+    is dropped when it changes. The version is checked at most once per
+    check_interval seconds, 0 checks it on every read.
+
+    The size of the cache is the number of cached properties, a filter result
+    counts as the number of properties in it plus one.
+    """
+
+    PROPERTY = 'property'
+    FILTER = 'filter'
+
+    def __init__(self, max_entries, version_name, check_interval=1.0):
+        self.max_entries = max_entries
+        self.version_name = version_name
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        # (PROPERTY, name) -> value, (FILTER, filter) -> properties
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.version = None
+        self.last_check = None
+        # incremented on every change, a value read from the backend is not
+        # cached if the generation changed during the read
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _get_cost(key, value):
+        if key[0] == CMPropertyCache.FILTER:
+            return len(value) + 1
+        return 1
+
+    def validate(self, get_version, force=False):
+        """drop the cache if the version in the backend has changed
+
+           Arguments:
+
+           get_version: A function returning the current value of the version
+                        property in the backend.
+
+           force: Check the version even if it was checked less than
+                  check_interval seconds ago.
+        """
+        now = time.time()
+        with self.lock:
+            if not force and self.last_check is not None and \
+                    now - self.last_check < self.check_interval:
+                return
+            generation = self.generation
+
+        version = get_version()
+
+        with self.lock:
+            if generation != self.generation:
+                # own write during the read, the version is up to date
+                return
+            self.last_check = now
+            if version != self.version:
+                if self.entries:
+                    logging.info('Version of the properties changed, dropping the cache')
+                    self.invalidations += 1
+                self._clear()
+                self.version = version
+
+    def get(self, kind, key):
+        """get a cached entry, None is returned if the entry is not cached"""
+        with self.lock:
+            value = self.entries.pop((kind, key), None)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries[(kind, key)] = value
+            self.hits += 1
+            if kind == CMPropertyCache.FILTER:
+                return dict(value)
+            return value
+
+    def get_generation(self):
+        with self.lock:
+            return self.generation
+
+    def add(self, kind, key, value, generation):
+        """cache a value read from the backend
+
+           Arguments:
+
+           kind: PROPERTY or FILTER.
+
+           key: The property name or the filter.
+
+           value: The property value or the dictionary of the properties
+                  matching the filter.
+
+           generation: The generation returned by get_generation before the
+                       value was read.
+        """
+        if value is None:
+            return
+        entry_key = (kind, key)
+        cost = CMPropertyCache._get_cost(entry_key, value)
+        if cost > self.max_entries:
+            return
+        with self.lock:
+            if generation != self.generation or self.last_check is None:
+                return
+            if kind == CMPropertyCache.FILTER:
+                value = dict(value)
+            old = self.entries.pop(entry_key, None)
+            if old is not None:
+                self.size -= CMPropertyCache._get_cost(entry_key, old)
+            self.entries[entry_key] = value
+            self.size += cost
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_entries:
+            key, value = self.entries.popitem(last=False)
+            self.size -= CMPropertyCache._get_cost(key, value)
+
+    def apply(self, properties, deleted):
+        """update the cache with the changes written to the backend"""
+        deleted = set(deleted)
+        with self.lock:
+            self.generation += 1
+            for key in self.entries.keys():
+                kind, name = key
+                if kind == CMPropertyCache.PROPERTY:
+                    if name in properties:
+                        self.entries[key] = properties[name]
+                    elif name in deleted:
+                        del self.entries[key]
+                        self.size -= 1
+                    continue
+
+                result = self.entries[key]
+                old_size = len(result)
+                for prop in deleted:
+                    result.pop(prop, None)
+                pattern = cmkeyindex.get_pattern(name)
+                for prop, value in properties.iteritems():
+                    if pattern.match(prop):
+                        result[prop] = value
+                self.size += len(result) - old_size
+            if self.version_name in properties:
+                self.version = properties[self.version_name]
+            elif self.version_name in deleted:
+                self.version = None
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self._clear()
+            # the version has to be read again before the next value is cached
+            self.last_check = None
+
+    def _clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'invalidations': self.invalidations,
+                    'entries': len(self.entries),
+                    'size': self.size}
@@ -0,0 +1,108 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import threading
+import re
+
+from cmframework.apis import cmerror
+from cmframework.utils.cmkeyindex import get_literal_prefix
+
+
+class CMSubscriptionIndex(object):
+    """
+    Classify property names to the plugins subscribed to them.
+
+    The subscription filters are compiled once and grouped by their literal
+    prefix. A name is matched only against the filters whose prefix it starts
+    with, so a change is dispatched in one pass over its names instead of
+    matching every name against the filter of every plugin. The plugins
+    interested in a name are kept in a bounded cache as the same names tend to
+    be changed again and again.
+    """
+
+    # the number of names whose plugins are cached
+    CACHE_SIZE = 4096
+
+    def __init__(self, subscriptions, cache_size=CACHE_SIZE):
+        """
+        Arguments:
+
+        subscriptions: A dictionary of plugin name -> the re used to match the
+                       property names the plugin is interested in.
+
+        cache_size: The number of names whose plugins are cached.
+        """
+        # literal prefix -> [(plugin, compiled filter)]
+        self.prefixes = {}
+        for plugin, prop_filter in sorted(subscriptions.iteritems()):
+            if prop_filter is None:
+                continue
+            try:
+                pattern = re.compile(prop_filter)
+            except re.error as exp:
+                raise cmerror.CMError('Invalid subscription {} of plugin {}: {}'.format(
+                    prop_filter, plugin, str(exp)))
+            prefix = get_literal_prefix(prop_filter)
+            self.prefixes.setdefault(prefix, []).append((plugin, pattern))
+        self.prefix_lengths = sorted(set(len(prefix) for prefix in self.prefixes))
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_plugins(self, name):
+        """get the plugins subscribed to a name as a sorted tuple"""
+        with self.lock:
+            plugins = self.cache.pop(name, None)
+            if plugins is not None:
+                self.cache[name] = plugins
+                return plugins
+
+        plugins = []
+        for length in self.prefix_lengths:
+            if length > len(name):
+                break
+            for plugin, pattern in self.prefixes.get(name[:length], ()):
+                if pattern.match(name):
+                    plugins.append(plugin)
+        plugins = tuple(sorted(plugins))
+
+        with self.lock:
+            self.cache[name] = plugins
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return plugins
+
+    def dispatch(self, indata):
+        """split the changed data to the inputs of the subscribed plugins
+
+           Arguments:
+
+           indata: A dictionary of properties or a list of property names.
+
+           Return:
+
+           A dictionary of plugin name -> the part of indata matching the
+           subscription of the plugin, as a dictionary or a list like indata.
+           The plugins not interested in any of the data are not included.
+        """
+        inputs = {}
+        if isinstance(indata, dict):
+            for name, value in indata.iteritems():
+                for plugin in self.get_plugins(name):
+                    inputs.setdefault(plugin, {})[name] = value
+        else:
+            for name in indata:
+                for plugin in self.get_plugins(name):
+                    inputs.setdefault(plugin, []).append(name)
+        return inputs
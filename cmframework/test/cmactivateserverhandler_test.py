@@ -0,0 +1,115 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import eventlet
+
+from cmframework.server.cmactivateserverhandler import CMActivateServerHandler
+from cmframework.utils.cmactivationstatehandler import CMActivationStateHandler
+
+
+class CMActivateServerHandlerTest(unittest.TestCase):
+    def _create_handler(self, deps, plugin_workers, events, failing=(), filters=None,
+                        state_handler=None):
+        plugins = {}
+        for name in ('a', 'b', 'c', 'd'):
+            def activate_full(_, target, name=name):
+                events.append('start ' + name)
+                eventlet.sleep(0)
+                events.append('end ' + name)
+                if name in failing:
+                    raise Exception('{} failed'.format(name))
+            def activate_set(_, props, name=name):
+                raise Exception('{} failed'.format(name))
+            module = mock.MagicMock()
+            setattr(module, name, type(name, (object,), {'activate_full': activate_full,
+                                                         'activate_set': activate_set}))
+            plugins[name] = module
+
+        with mock.patch('cmframework.server.cmactivateserverhandler.cmpluginloader.'
+                        'CMPluginLoader') as mock_loader, \
+                mock.patch('cmframework.server.cmactivateserverhandler.cmdependencysort.'
+                           'read_dependency_file') as mock_read:
+            mock_loader.return_value.load.return_value = (plugins, filters or {})
+            mock_read.side_effect = lambda path: deps.get(path, ([], []))
+            return CMActivateServerHandler('path', mock.MagicMock(), mock.MagicMock(),
+                                           state_handler or mock.MagicMock(), plugin_workers)
+
+    def test_layers(self):
+        events = []
+        deps = {'path/c.deps': ([], ['a', 'b', 'x']), 'path/d.deps': ([], ['c'])}
+        handler = self._create_handler(deps, 4, events, failing=('a',))
+
+        self.assertEqual(handler.plugin_layers, [['a', 'b'], ['c'], ['d']])
+
+        failures = handler.activate_full(None)
+
+        self.assertEqual(failures, {'a': 'a failed'})
+        self.assertEqual(events, ['start a', 'start b', 'end a', 'end b',
+                                  'start c', 'end c', 'start d', 'end d'])
+
+    def test_one_worker(self):
+        events = []
+        handler = self._create_handler({}, 1, events)
+
+        self.assertEqual(handler.plugin_layers, [['a', 'b', 'c', 'd']])
+
+        self.assertEqual(handler.activate_full(None), {})
+        self.assertEqual(events, ['start a', 'end a', 'start b', 'end b',
+                                  'start c', 'end c', 'start d', 'end d'])
+
+
+    def test_watermarks(self):
+        events = []
+        state = {}
+        state_handler = CMActivationStateHandler(
+            'cmframework.utils.cmstatedummyhandler.CMStateDummyHandler')
+        state_handler.plugin = mock.MagicMock()
+        state_handler.plugin.get.side_effect = lambda domain, name: state.get(name)
+        state_handler.plugin.set.side_effect = lambda domain, name, value: \
+            state.__setitem__(name, value)
+        state_handler.plugin.delete.side_effect = lambda domain, name: state.pop(name, None)
+        state_handler.plugin.get_domain.side_effect = lambda domain: state.items()
+        handler = self._create_handler({}, 1, events, failing=('c',),
+                                       filters={'a': 'a\\..*', 'b': 'b\\..*', 'c': 'c\\..*'},
+                                       state_handler=state_handler)
+        properties = {'a.1': '1', 'b.1': '1', 'c.1': '1'}
+        handler.plugin_client.get_properties.return_value = properties
+
+        handler.activate_full('node-1', csn=5)
+        self.assertEqual(json.loads(state['a@node-1'])['csn'], 5)
+        self.assertNotIn('c@node-1', state)
+
+        del events[:]
+        properties['b.1'] = '2'
+        handler.activate_full('node-1', csn=6)
+        # d has no subscription, it is always run
+        self.assertEqual(events, ['start b', 'end b', 'start c', 'end c', 'start d', 'end d'])
+
+        del events[:]
+        handler.activate_full('node-1', csn=7, force=True)
+        self.assertEqual(len(events), 8)
+
+        handler.activate_full('node-2', csn=7)
+        handler.set_plugins(handler.pluginlist, dict(handler.filterdict, a='x'))
+        handler.activate_set({'x': '1'})
+        self.assertNotIn('a@node-1', state)
+        self.assertNotIn('a@node-2', state)
+        self.assertIn('b@node-1', state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.server.cmactivator import CMActivator
+from cmframework.server.cmactivateserverhandler import CMActivateServerHandler
+from cmframework.utils.cmactivationwork import CMActivationWork
+
+
+def create_work(operation, csn, props, uuid_value):
+    work = CMActivationWork(operation, csn, props)
+    work.uuid_value = uuid_value
+    return work
+
+
+class CMActivatorTest(unittest.TestCase):
+    def test_merge_pending_works(self):
+        activator = CMActivator(1)
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 1, {'a': '1', 'b': '1'}, 'u1'))
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 2, {'a': '2'}, 'u2'))
+        activator.add_work(create_work(CMActivationWork.OPER_DELETE, 3, ['a'], 'u3'))
+        activator.add_work(create_work(CMActivationWork.OPER_DELETE, 4, ['b', 'a'], 'u4'))
+        activator.add_work(create_work(CMActivationWork.OPER_FULL, 4, {}, 'u5'))
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 5, {'c': '1'}, 'u6'))
+
+        work = activator.get_work()
+        self.assertEqual(work.get_operation(), CMActivationWork.OPER_SET)
+        self.assertEqual(work.get_props(), {'a': '2', 'b': '1'})
+        self.assertEqual(work.get_csn(), 2)
+        self.assertEqual(work.get_uuids(), ['u1', 'u2'])
+        # the condition of the merged work is not held by this thread
+        self.assertFalse(work.condition._is_owned())
+
+        work = activator.get_work()
+        self.assertEqual(work.get_operation(), CMActivationWork.OPER_DELETE)
+        self.assertEqual(work.get_props(), ['a', 'b'])
+        self.assertEqual(work.get_csn(), 4)
+        self.assertEqual(work.get_uuids(), ['u3', 'u4'])
+
+        self.assertEqual(activator.get_work().get_uuids(), ['u5'])
+        self.assertEqual(activator.get_work().get_uuids(), ['u6'])
+
+    @mock.patch('cmframework.server.cmactivator.time.sleep')
+    def test_debounce_window(self, mock_sleep):
+        activator = CMActivator(1, debounce_window=0.5)
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 1, {'a': '1'}, 'u1'))
+        mock_sleep.side_effect = lambda _: activator.add_work(
+            create_work(CMActivationWork.OPER_SET, 2, {'b': '1'}, 'u2'))
+
+        work = activator.get_work()
+
+        mock_sleep.assert_called_once_with(0.5)
+        self.assertEqual(work.get_props(), {'a': '1', 'b': '1'})
+        self.assertEqual(work.get_uuids(), ['u1', 'u2'])
+
+    @mock.patch.object(CMActivateServerHandler, 'load_plugin')
+    def test_all_merged_changes_resolved(self, mock_load_plugin):
+        changemonitor = mock.MagicMock()
+        handler = CMActivateServerHandler('path', mock.MagicMock(), changemonitor,
+                                          mock.MagicMock())
+        activator = CMActivator(1)
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 1, {'a': '1'}, 'u1'))
+        activator.add_work(create_work(CMActivationWork.OPER_SET, 2, {'b': '1'}, 'u2'))
+
+        handler.activate(activator.get_work())
+
+        changemonitor.change_ok.assert_has_calls([mock.call('u1'), mock.call('u2')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import eventlet
+
+from cmframework.apis.cmerror import CMError
+from cmframework.server.cmchangelog import CMChangeLog
+from cmframework.server.cmprocessor import CMProcessor
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+from cmframework.utils.cmbackendhandler import CMBackendHandler
+from cmframework.utils.cmbackendpluginclient import CMBackendPluginClient
+
+
+class CMChangeLogTest(unittest.TestCase):
+    def test_events(self):
+        changelog = CMChangeLog(5, max_events=3)
+        changelog.record(6, {'a.1': '1', 'b.1': '1'}, [])
+        changelog.record(7, {}, ['a.2'])
+
+        self.assertEqual(changelog.get_events(5, 'a.*'),
+                         ([{'csn': 6, 'name': 'a.1', 'value': '1'},
+                           {'csn': 7, 'name': 'a.2', 'deleted': True}], 7))
+        self.assertEqual(changelog.get_events(6),
+                         ([{'csn': 7, 'name': 'a.2', 'deleted': True}], 7))
+        self.assertEqual(changelog.get_events(7), ([], 7))
+        # the changes before the start and after the current csn are not known
+        self.assertEqual(changelog.get_events(4), (None, 7))
+        self.assertEqual(changelog.get_events(8), (None, 7))
+
+        changelog.record(8, {'c': '1'}, [])
+        self.assertEqual(changelog.get_events(5), (None, 8))
+        self.assertEqual(len(changelog.get_events(6)[0]), 2)
+
+        changelog.reset(3)
+        self.assertEqual(changelog.get_events(6), (None, 3))
+        self.assertEqual(changelog.get_events(3), ([], 3))
+
+    def test_wait(self):
+        changelog = CMChangeLog(1)
+        waiter = eventlet.spawn(changelog.wait, 1, 10)
+        eventlet.sleep(0)
+        self.assertFalse(waiter.dead)
+
+        changelog.record(2, {'a': '1'}, [])
+        waiter.wait()
+        # returns immediately as there are newer changes
+        changelog.wait(1, 10)
+
+    def test_watch(self):
+        processor = mock.MagicMock()
+        processor.changelog = CMChangeLog(1)
+        api = CMRestAPIV1(processor)
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'prop-name-filter': ['a.*']}
+        api.watch(rpc)
+        self.assertEqual(rpc.rep_status, CMHTTPErrors.get_ok_status())
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 1})
+
+        processor.changelog.record(2, {'a': '1', 'b': '1'}, [])
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 2, 'name': 'a', 'value': '1'})
+
+        processor.changelog.record(3, {'b': '2'}, [])
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 3})
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'since-csn': ['0']}
+        api.watch(rpc)
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 3, 'resync': True})
+        with self.assertRaises(StopIteration):
+            next(rpc.rep_stream)
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'since-csn': ['x']}
+        api.watch(rpc)
+        self.assertIsNone(rpc.rep_stream)
+        self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_request_not_ok_status()))
+
+    @mock.patch('cmframework.utils.cmflagfile.os')
+    def test_watch_plugin_writes(self, mock_flagfile_os):
+        mock_flagfile_os.path.exists.return_value = False
+        handler = CMBackendHandler('cmframework.apis.cmbackend.CMBackend')
+        handler.plugin = mock.MagicMock()
+        handler.plugin.get_property.side_effect = CMError('Invalid property name')
+        processor = CMProcessor(handler, mock.MagicMock(), mock.MagicMock(), mock.MagicMock(),
+                                mock.MagicMock(), mock.MagicMock())
+        api = CMRestAPIV1(processor)
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'since-csn': ['0']}
+        api.watch(rpc)
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 0})
+
+        CMBackendPluginClient(None, handler).set_property('a', '1')
+        self.assertEqual(json.loads(next(rpc.rep_stream)), {'csn': 1, 'name': 'a', 'value': '1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
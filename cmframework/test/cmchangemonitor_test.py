@@ -0,0 +1,122 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import eventlet
+
+from cmframework.apis import cmchangestate
+from cmframework.server.cmchangemonitor import CMChangeMonitor
+from cmframework.utils.cmactivationstatehandler import CMActivationStateHandler
+
+
+class CMChangeMonitorTest(unittest.TestCase):
+    def test_max_changes(self):
+        monitor = CMChangeMonitor(max_changes=2)
+
+        first = monitor.start_change()
+        second = monitor.start_change()
+        monitor.change_ok(second)
+        third = monitor.start_change()
+
+        self.assertEqual(monitor.changes.keys(), [first, third])
+
+        # the ongoing changes are kept over the limit
+        fourth = monitor.start_change()
+        self.assertEqual(monitor.changes.keys(), [first, third, fourth])
+
+        monitor.change_ok(third)
+        monitor.change_ok(first)
+        monitor.start_change()
+        self.assertNotIn(first, monitor.changes)
+        self.assertNotIn(third, monitor.changes)
+        self.assertEqual(len(monitor.get_all_changes_states()), 2)
+
+    @mock.patch('cmframework.server.cmchangemonitor.time.time')
+    def test_ttl(self, mock_time):
+        mock_time.return_value = 100
+        monitor = CMChangeMonitor(ttl=10)
+        first = monitor.start_change()
+        second = monitor.start_change()
+
+        mock_time.return_value = 105
+        monitor.change_nok(second, {'a': 'failed'})
+        mock_time.return_value = 111
+        third = monitor.start_change()
+
+        # the ongoing changes do not expire
+        self.assertEqual(monitor.get_all_changes_states(),
+                         {first: {'state': cmchangestate.CM_CHANGE_STATE_ONGOING,
+                                  'failed-plugins': {}},
+                          second: {'state': cmchangestate.CM_CHANGE_STATE_NOK,
+                                   'failed-plugins': {'a': 'failed'}},
+                          third: {'state': cmchangestate.CM_CHANGE_STATE_ONGOING,
+                                  'failed-plugins': {}}})
+
+        monitor.change_ok(first)
+        mock_time.return_value = 116
+        monitor.start_change()
+        self.assertNotIn(second, monitor.changes)
+        self.assertIn(first, monitor.changes)
+
+    def test_wait(self):
+        monitor = CMChangeMonitor()
+        uuid_value = monitor.start_change(2)
+
+        state = monitor.wait_change(uuid_value, 0.01)
+        self.assertEqual(state.state, cmchangestate.CM_CHANGE_STATE_ONGOING)
+
+        waiter = eventlet.spawn(monitor.wait_change, uuid_value, 10)
+        eventlet.sleep(0)
+        monitor.change_ok(uuid_value)
+        eventlet.sleep(0)
+        self.assertFalse(waiter.dead)
+        monitor.change_ok(uuid_value)
+
+        self.assertEqual(waiter.wait().state, cmchangestate.CM_CHANGE_STATE_OK)
+        self.assertIs(monitor.wait_change(uuid_value, 10), state)
+
+    def test_persistence(self):
+        stored = {}
+        state_handler = CMActivationStateHandler(
+            'cmframework.utils.cmstatedummyhandler.CMStateDummyHandler')
+        state_handler.plugin = mock.MagicMock()
+        state_handler.plugin.set.side_effect = lambda domain, name, value: \
+            stored.__setitem__(name, value)
+        state_handler.plugin.delete.side_effect = lambda domain, name: stored.pop(name)
+        state_handler.plugin.get_domain.side_effect = lambda domain: stored.items()
+
+        monitor = CMChangeMonitor(max_changes=2, state_handler=state_handler)
+        first = monitor.start_change()
+        monitor.change_nok(first, {'a': '100% failed'})
+        second = monitor.start_change()
+        third = monitor.start_change()
+        self.assertEqual(sorted(stored), sorted([second, third]))
+
+        monitor.change_nok(second, {'a': '100% failed'})
+        self.assertIn('\\u0025', stored[second])
+        self.assertEqual(json.loads(stored[second])['failed-plugins'], {'a': '100% failed'})
+
+        monitor = CMChangeMonitor(state_handler=state_handler)
+        self.assertEqual(sorted(monitor.changes), sorted([second, third]))
+        self.assertEqual(monitor.get_change_state(second).failed_plugins, {'a': '100% failed'})
+        state = monitor.wait_change(third, 10)
+        self.assertEqual(state.state, cmchangestate.CM_CHANGE_STATE_NOK)
+        self.assertIn('cmserver', state.failed_plugins)
+        self.assertEqual(json.loads(stored[third])['state'], cmchangestate.CM_CHANGE_STATE_NOK)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.utils.cmcircuitbreaker import CMCircuitBreaker
+from cmframework.apis.cmerror import CMError
+
+
+class CMCircuitBreakerTest(unittest.TestCase):
+    @mock.patch('cmframework.utils.cmcircuitbreaker.time.time')
+    @mock.patch('cmframework.utils.cmcircuitbreaker.logging')
+    def test_open_and_close(self, mock_logging, mock_time):
+        mock_time.return_value = 100
+        breaker = CMCircuitBreaker('test', failure_threshold=2, reset_timeout=10)
+
+        breaker.check()
+        breaker.failure()
+        self.assertEqual(breaker.get_state(), CMCircuitBreaker.STATE_CLOSED)
+        breaker.failure()
+        self.assertEqual(breaker.get_state(), CMCircuitBreaker.STATE_OPEN)
+        with self.assertRaises(CMError):
+            breaker.check()
+
+        mock_time.return_value = 111
+        self.assertEqual(breaker.get_state(), CMCircuitBreaker.STATE_HALF_OPEN)
+        breaker.check()
+        # only one trial call is let through
+        with self.assertRaises(CMError):
+            breaker.check()
+        breaker.success()
+        self.assertEqual(breaker.get_state(), CMCircuitBreaker.STATE_CLOSED)
+        breaker.check()
+
+    @mock.patch('cmframework.utils.cmcircuitbreaker.time.time')
+    @mock.patch('cmframework.utils.cmcircuitbreaker.logging')
+    def test_failed_trial(self, mock_logging, mock_time):
+        mock_time.return_value = 100
+        breaker = CMCircuitBreaker('test', failure_threshold=1, reset_timeout=10)
+        breaker.failure()
+
+        mock_time.return_value = 111
+        breaker.check()
+        breaker.failure()
+        self.assertEqual(breaker.get_state(), CMCircuitBreaker.STATE_OPEN)
+
+        mock_time.return_value = 122
+        breaker.check()
+        breaker.cancel_trial()
+        breaker.check()
+
+
+if __name__ == '__main__':
+    unittest.main()
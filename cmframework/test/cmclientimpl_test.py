@@ -0,0 +1,255 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import urlparse
+import json
+import threading
+import BaseHTTPServer
+import SocketServer
+import requests
+
+from cmframework.apis.cmclient import CMClient
+from cmframework.apis.cmerror import CMError
+from cmframework.lib.cmclientimpl import CMClientImpl
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+
+
+class CMClientImplTest(unittest.TestCase):
+    def setUp(self):
+        self.processor = mock.MagicMock()
+        self.processor.get_version.return_value = 'a-1'
+        self.processor.get_properties.return_value = {'a': '1'}
+        self.processor.get_property.return_value = '1'
+        self.api = CMRestAPIV1(self.processor)
+        self.statuses = []
+        self.client = CMClientImpl('localhost', 61100, mock.MagicMock())
+
+    def _get(self, method, url, headers, timeout):
+        self.assertEqual(method, 'GET')
+        self.assertEqual(timeout, (CMClientImpl.CONNECT_TIMEOUT, CMClientImpl.READ_TIMEOUT))
+        url = urlparse.urlparse(url)
+        rpc = HTTPRPC()
+        rpc.req_filter = urlparse.parse_qs(url.query)
+        rpc.req_headers = {name.lower(): value for name, value in headers.iteritems()}
+        if url.path.endswith('/properties'):
+            self.api.get_properties(rpc)
+        else:
+            rpc.req_params['property'] = url.path.rsplit('/', 1)[1]
+            self.api.get_property(rpc)
+        self.statuses.append(rpc.rep_status)
+
+        response = mock.MagicMock()
+        response.status_code = int(rpc.rep_status.split()[0])
+        response.ok = response.status_code < 400
+        response.content = ''.join(rpc.rep_stream) if rpc.rep_stream else rpc.rep_body
+        response.json.side_effect = lambda: json.loads(response.content)
+        response.headers = dict(rpc.rep_headers)
+        return response
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_conditional_get(self, mock_get):
+        mock_get.side_effect = self._get
+
+        self.assertEqual(self.client.get_properties('a.*'), {'a': '1'})
+        self.assertEqual(self.client.get_properties('a.*'), {'a': '1'})
+        self.assertEqual(self.client.get_property('a'), '1')
+        self.assertEqual(self.client.get_property('a'), '1')
+        self.assertEqual(self.statuses, [CMHTTPErrors.get_ok_status(),
+                                         CMHTTPErrors.get_not_modified_status()] * 2)
+        self.assertEqual(self.processor.get_properties.call_count, 1)
+        self.assertEqual(self.processor.get_property.call_count, 1)
+
+        # a different filter has a different etag
+        self.client.get_properties('b.*')
+        self.assertEqual(self.statuses[-1], CMHTTPErrors.get_ok_status())
+
+        self.processor.get_version.return_value = 'a-2'
+        self.processor.get_properties.return_value = {'a': '2'}
+        self.assertEqual(self.client.get_properties('a.*'), {'a': '2'})
+        self.assertEqual(self.statuses[-1], CMHTTPErrors.get_ok_status())
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_snapshot_not_cached(self, mock_get):
+        mock_get.side_effect = self._get
+
+        self.client.get_properties('a.*', 'snap')
+        self.client.get_properties('a.*', 'snap')
+        self.assertEqual(self.statuses, [CMHTTPErrors.get_ok_status()] * 2)
+        self.assertEqual(len(self.client.cache), 0)
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_iter_properties(self, mock_get):
+        mock_get.side_effect = self._get
+        data = {'a.%d' % i: 'x' * i for i in range(5)}
+        self.processor.get_properties.return_value = data
+        def get_page(prop_filter, cursor, limit, snapshot_name):
+            return [item for item in sorted(data.iteritems())
+                    if cursor is None or item[0] > cursor][:limit]
+        self.processor.get_properties_page.side_effect = get_page
+
+        items = self.client.iter_properties('a.*', page_size=2)
+        self.assertEqual(next(items), ('a.0', ''))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(list(items), [('a.%d' % i, 'x' * i) for i in range(1, 5)])
+        self.assertEqual(mock_get.call_count, 3)
+        # only the pages are read, with one more property to see if there are more
+        self.assertEqual(self.processor.get_properties_page.call_args_list,
+                         [mock.call('a.*', None, 3, None), mock.call('a.*', 'a.1', 3, None),
+                          mock.call('a.*', 'a.3', 3, None)])
+        self.processor.get_properties.assert_not_called()
+
+        self.assertEqual(sorted(self.client.iter_properties('a.*', page_size=None,
+                                                            names_only=True)),
+                         [('a.%d' % i, None) for i in range(5)])
+        self.assertEqual(self.processor.get_properties.call_count, 1)
+        self.assertEqual(list(self.client.iter_properties('a.*', max_value_bytes=2)),
+                         [('a.0', ''), ('a.1', 'x'), ('a.2', 'xx'), ('a.3', 'xx'), ('a.4', 'xx')])
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_iter_properties_error(self, mock_get):
+        mock_get.side_effect = requests.ConnectionError('refused')
+        client = CMClient('localhost', 61100, 'cmframework.lib.cmclientimpl.CMClientImpl')
+
+        items = client.iter_properties('a.*')
+        with self.assertRaises(CMError):
+            next(items)
+        with self.assertRaises(CMError):
+            client.iter_properties('(')
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_watch_error(self, mock_get):
+        mock_get.side_effect = requests.ConnectionError('refused')
+        client = CMClient('localhost', 61100, 'cmframework.lib.cmclientimpl.CMClientImpl')
+
+        with self.assertRaises(CMError):
+            next(client.watch('a.*'))
+
+        response = mock.MagicMock()
+        response.ok = True
+        response.iter_lines.return_value = ['{"csn": 1}', '{']
+        mock_get.side_effect = None
+        mock_get.return_value = response
+        events = client.watch('a.*', since_csn=0)
+        self.assertEqual(next(events), {'csn': 1})
+        with self.assertRaises(CMError):
+            next(events)
+        response.close.assert_called_once_with()
+
+    def test_truncate_utf8(self):
+        self.processor.get_properties.return_value = {'a': '\xc3\xa4\xc3\xa4', 'b': u'\xe4\xe4'}
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'max-value-bytes': ['3']}
+        self.api.get_properties(rpc)
+        items = json.loads(''.join(rpc.rep_stream))['properties']
+        self.assertEqual(sorted(items, key=lambda item: item['name']),
+                         [{'name': 'a', 'value': u'\xe4', 'truncated': True},
+                          {'name': 'b', 'value': u'\xe4', 'truncated': True}])
+
+    def test_invalid_listing(self):
+        for query in ({'limit': ['0']}, {'limit': ['x']}, {'max-value-bytes': ['-1']}):
+            rpc = HTTPRPC()
+            rpc.req_filter = query
+            self.api.get_properties(rpc)
+            self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_request_not_ok_status()))
+
+    def test_invalid_set_properties(self):
+        for body in ('{"properties": {"a": "1"}}', '{"properties": null}',
+                     '{"properties": ["a"]}', '{"properties": [{"name": "a"}]}'):
+            rpc = HTTPRPC()
+            rpc.req_body = body
+            self.api.set_properties(rpc)
+            self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_request_not_ok_status()),
+                            body)
+        self.processor.set_properties_with_diff.assert_not_called()
+
+
+class CMTestHTTPHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    requests = 0
+
+    def do_GET(self):
+        CMTestHTTPHandler.requests += 1
+        status = CMTestHTTPHandler.statuses.pop(0) if CMTestHTTPHandler.statuses else 200
+        body = json.dumps({'name': 'a', 'value': '1'})
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CMTestHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    # the retried and the side effect requests use their own connections
+    daemon_threads = True
+
+
+class CMClientImplSessionTest(unittest.TestCase):
+    def setUp(self):
+        CMTestHTTPHandler.statuses = []
+        CMTestHTTPHandler.requests = 0
+        self.server = CMTestHTTPServer(('127.0.0.1', 0), CMTestHTTPHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.log = []
+        with mock.patch.object(CMClientImpl, 'RETRY_BACKOFF', 0):
+            self.client = CMClientImpl('127.0.0.1', self.server.server_port, self.log.append)
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        self.assertEqual(self.client.get_property('a'), '1')
+        self.assertEqual(self.client.get_property('a'), '1')
+
+        timings = [msg for msg in self.log if ' took ' in msg]
+        self.assertEqual(len(timings), 2)
+        self.assertTrue(timings[0].endswith('on a new connection'))
+        self.assertTrue(timings[1].endswith('on a reused connection'))
+
+    def test_retry(self):
+        CMTestHTTPHandler.statuses = [503, 502]
+        self.assertEqual(self.client.get_property('a'), '1')
+        self.assertEqual(CMTestHTTPHandler.requests, 3)
+
+    def test_no_retry_with_side_effects(self):
+        for call, args in ((self.client.activate_node, ('node',)),
+                           (self.client.create_snapshot, ('snap',)),
+                           (self.client.reboot_node, ('node',))):
+            CMTestHTTPHandler.statuses = [503]
+            CMTestHTTPHandler.requests = 0
+            with self.assertRaises(CMError):
+                call(*args)
+            self.assertEqual(CMTestHTTPHandler.requests, 1)
+
+        # listing the snapshots is retried
+        CMTestHTTPHandler.statuses = [503]
+        CMTestHTTPHandler.requests = 0
+        with self.assertRaises(KeyError):
+            self.client.list_snapshots()
+        self.assertEqual(CMTestHTTPHandler.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
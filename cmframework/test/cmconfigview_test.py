@@ -0,0 +1,70 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.apis.cmerror import CMError
+from cmframework.utils.cmconfigview import CMCachingPluginClient
+from cmframework.utils.cmconfigview import CMConfigView
+
+
+class CMConfigViewTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = {'cloud.hosts': '{"a": 1}', 'cloud.time': '"utc"', 'cloud.dns': 'x'}
+        self.plugin_client = mock.MagicMock()
+        self.plugin_client.get_property.side_effect = lambda name: self.backend[name]
+        self.plugin_client.get_properties.side_effect = \
+            lambda prop_filter: {name: value for name, value in self.backend.iteritems()
+                                 if name.startswith(prop_filter.rstrip('.*'))}
+        self.client = CMCachingPluginClient(self.plugin_client)
+
+    def test_caching_client(self):
+        self.assertEqual(self.client.get_property('cloud.hosts'), '{"a": 1}')
+        self.assertEqual(self.client.get_property('cloud.hosts'), '{"a": 1}')
+        self.client.get_properties('cloud.*').clear()
+        self.assertEqual(len(self.client.get_properties('cloud.*')), 3)
+
+        self.assertEqual(self.plugin_client.get_property.call_count, 1)
+        self.assertEqual(self.plugin_client.get_properties.call_count, 1)
+
+    def test_overlay(self):
+        view = CMConfigView(self.client, {'cloud.time': '"cet"', 'cloud.ntp': '[]'},
+                            ['cloud.dns'])
+
+        self.assertEqual(view.get_property('cloud.time'), '"cet"')
+        self.assertEqual(view.get_property('cloud.hosts'), '{"a": 1}')
+        with self.assertRaises(CMError):
+            view.get_property('cloud.dns')
+        self.assertEqual(view.get_properties('cloud.*'),
+                         {'cloud.hosts': '{"a": 1}', 'cloud.time': '"cet"', 'cloud.ntp': '[]'})
+        with self.assertRaises(CMError):
+            view.set_property('cloud.time', '"utc"')
+        self.assertEqual(self.backend['cloud.time'], '"utc"')
+
+    def test_decoded_data(self):
+        view = CMConfigView(self.client, {'cloud.time': '"cet"'})
+
+        hosts = view.get_json('cloud.hosts')
+        self.assertEqual(hosts, {'a': 1})
+        self.assertIs(view.get_json('cloud.hosts'), hosts)
+
+        with mock.patch('cmframework.utils.cmconfigview.configmanager.ConfigManager') as cm:
+            self.assertIs(view.get_config_manager(), view.get_config_manager())
+        cm.assert_called_once_with({'cloud.hosts': hosts, 'cloud.time': 'cet'})
+        self.assertIs(cm.call_args[0][0]['cloud.hosts'], hosts)
+
+
+if __name__ == '__main__':
+    unittest.main()
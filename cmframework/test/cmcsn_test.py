@@ -78,6 +78,24 @@ class CMCSNTest(unittest.TestCase):
 
         self.assertEqual(csn.get(), 102)
 
+    @mock.patch('cmframework.server.cmcsn.logging')
+    def test_increment_with_changes(self, mock_logging):
+        mock_backend = mock.MagicMock()
+        mock_backend.get_property = mock.MagicMock()
+        mock_backend.get_property.return_value = ('{"csn": {"global": 101, "nodes": '
+                                                  '{"node-a": 99}}}')
+
+        csn = CMCSN(mock_backend)
+        csn.increment({'foo': 'bar'}, ['baz'])
+
+        mock_backend.set_property.assert_not_called()
+        mock_backend.commit.assert_called_once()
+        changes, deleted = mock_backend.commit.call_args[0]
+        self.assertEqual(deleted, ['baz'])
+        self.assertEqual(changes['foo'], 'bar')
+        self.assertEqual(json.loads(changes['cloud.cmframework'])['csn']['global'], 102)
+        self.assertEqual(csn.get(), 102)
+
     @mock.patch('cmframework.server.cmcsn.logging')
     def test_sync_node(self, mock_logging):
         mock_backend = mock.MagicMock()
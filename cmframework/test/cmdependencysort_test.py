@@ -112,6 +112,20 @@ class CMDependencySortTest(unittest.TestCase):
 
         with self.assertRaises(CMError) as context:
             sorted_list = sort.sort()
+    def test_layers(self):
+        after = {'c': ['a', 'b'], 'd': ['c']}
+        before = {'a': ['e'], 'f': []}
+        sort = Sort(after, before)
+        layers = sort.sort_layers()
+        assert layers == [['a', 'b', 'f'], ['c', 'e'], ['d']]
+
+        assert Sort().sort_layers() == []
+
+    def test_layers_cycle(self):
+        sort = Sort({'a': ['b'], 'b': ['a']})
+        with self.assertRaises(CMError):
+            sort.sort_layers()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,145 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import eventlet
+
+from cmframework.apis.cmerror import CMError
+from cmframework.server import cmeventletrwlock
+from cmframework.server.cmeventletrwlock import CMEventletRWLock
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+
+
+class CMEventletRWLockTest(unittest.TestCase):
+    def _hold(self, events, lock, kind, name, seconds=0):
+        with getattr(lock, kind)():
+            events.append('start ' + name)
+            eventlet.sleep(seconds)
+            events.append('end ' + name)
+
+    def test_readers_share(self):
+        events = []
+        lock = CMEventletRWLock('test')
+        first = eventlet.spawn(self._hold, events, lock, 'reader', 'r1', 0.01)
+        second = eventlet.spawn(self._hold, events, lock, 'reader', 'r2', 0.01)
+        first.wait()
+        second.wait()
+
+        self.assertEqual(events, ['start r1', 'start r2', 'end r1', 'end r2'])
+
+    def test_fifo(self):
+        events = []
+        lock = CMEventletRWLock('test')
+        threads = [eventlet.spawn(self._hold, events, lock, 'reader', 'r1', 0.01),
+                   eventlet.spawn(self._hold, events, lock, 'writer', 'w1'),
+                   eventlet.spawn(self._hold, events, lock, 'reader', 'r2'),
+                   eventlet.spawn(self._hold, events, lock, 'reader', 'r3'),
+                   eventlet.spawn(self._hold, events, lock, 'writer', 'w2')]
+        for thread in threads:
+            thread.wait()
+
+        # the waiting writer blocks the readers coming after it
+        self.assertEqual(events, ['start r1', 'end r1', 'start w1', 'end w1',
+                                  'start r2', 'start r3', 'end r2', 'end r3',
+                                  'start w2', 'end w2'])
+        self.assertEqual(lock.get_stats()['max-queue-depth'], 4)
+
+    def test_timeout(self):
+        events = []
+        lock = CMEventletRWLock('test')
+        reader = eventlet.spawn(self._hold, events, lock, 'reader', 'r1', 0.05)
+        eventlet.sleep(0)
+
+        with self.assertRaisesRegexp(CMError, 'Timed out .* write lock of test'):
+            with lock.writer(timeout=0.01):
+                pass
+        self.assertEqual(lock.get_stats()['queue-depth'], 0)
+        # the timed out writer does not block the readers anymore
+        with lock.reader(timeout=0.01):
+            pass
+        reader.wait()
+
+        stats = lock.get_stats()
+        self.assertEqual(stats['write']['timeouts'], 1)
+        self.assertEqual(stats['write']['acquired'], 0)
+        self.assertEqual(stats['read']['acquired'], 2)
+
+    def test_timeout_of_queued_writer(self):
+        events = []
+        lock = CMEventletRWLock('test')
+        writer = eventlet.spawn(self._hold, events, lock, 'writer', 'w1', 0.05)
+        eventlet.sleep(0)
+        reader = eventlet.spawn(self._hold, events, lock, 'reader', 'r1')
+        eventlet.sleep(0)
+
+        with self.assertRaises(CMError):
+            with lock.writer(timeout=0.01):
+                pass
+        writer.wait()
+        reader.wait()
+        self.assertEqual(events, ['start w1', 'end w1', 'start r1', 'end r1'])
+        self.assertFalse(lock.writing)
+        self.assertEqual(lock.readers, 0)
+
+    @mock.patch('cmframework.server.cmeventletrwlock.time.time')
+    def test_stats(self, mock_time):
+        mock_time.return_value = 100
+        lock = CMEventletRWLock('test')
+        holding = lock.writer()
+        holding.__enter__()
+        waiter = eventlet.spawn(self._hold, [], lock, 'reader', 'r1')
+        eventlet.sleep(0)
+
+        mock_time.return_value = 103
+        stats = lock.get_stats()
+        self.assertEqual(stats['waiters'], [{'kind': 'read', 'waited': 3}])
+        self.assertEqual(len(stats['holders']), 1)
+        self.assertEqual(stats['holders'][0]['kind'], 'write')
+        self.assertEqual(stats['holders'][0]['held'], 3)
+
+        holding.__exit__(None, None, None)
+        waiter.wait()
+        stats = lock.get_stats()
+        self.assertEqual(stats['queue-depth'], 0)
+        self.assertEqual(stats['holders'], [])
+        self.assertEqual(stats['write'], {'acquired': 1, 'waited': 0, 'timeouts': 0,
+                                          'wait-time': 0.0, 'max-wait-time': 0.0,
+                                          'hold-time': 3.0, 'max-hold-time': 3.0})
+        self.assertEqual(stats['read']['waited'], 1)
+        self.assertEqual(stats['read']['max-wait-time'], 3.0)
+
+    def test_get_lock_stats(self):
+        lock = CMEventletRWLock('zz-test')
+        with lock.reader():
+            pass
+        api = CMRestAPIV1(mock.MagicMock())
+
+        rpc = HTTPRPC()
+        api.get_lock_stats(rpc)
+        self.assertEqual(rpc.rep_status, CMHTTPErrors.get_ok_status())
+        locks = json.loads(rpc.rep_body)['locks']
+        self.assertEqual(locks[-1]['name'], 'zz-test')
+        self.assertEqual(locks[-1]['read']['acquired'], 1)
+        self.assertEqual(locks, sorted(locks, key=lambda stats: stats['name']))
+
+        del lock
+        self.assertNotIn('zz-test', [stats['name'] for stats in cmeventletrwlock.get_all_stats()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from cmframework.filebackend.cmfilebackend import CMFileBackend
+from cmframework.apis.cmerror import CMError
+
+
+class CMFileBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_rewrite_mode(self):
+        backend = CMFileBackend(uri=self.path)
+        backend.set_properties({'a': '1', 'b': '2'})
+        backend.delete_property('a')
+
+        self.assertEqual(self._read(self.path), 'b=2\n')
+        self.assertFalse(os.path.exists(self.path + '.journal'))
+        self.assertEqual(CMFileBackend(uri=self.path).get_properties('.*'), {'b': '2'})
+
+    def test_invalid_options(self):
+        with self.assertRaises(CMError):
+            CMFileBackend(uri=self.path + '?mode=other')
+        with self.assertRaises(CMError):
+            CMFileBackend(uri=self.path + '?unknown=1')
+
+    def test_journal_mode(self):
+        uri = self.path + '?mode=journal'
+        backend = CMFileBackend(uri=uri)
+        backend.set_properties({'a': '1', 'b': '2'})
+        backend.set_property('a', '3')
+        backend.delete_properties('b')
+        backend.commit({'c': 'x=y'}, ['a'])
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(len(self._read(self.path + '.journal').splitlines()), 4)
+        self.assertEqual(backend.get_properties('.*'), {'c': 'x=y'})
+
+        self.assertEqual(CMFileBackend(uri=uri).get_properties('.*'), {'c': 'x=y'})
+
+    def test_get_properties_page(self):
+        backend = CMFileBackend(uri=self.path)
+        backend.set_properties({'a.1': '1', 'a.2': '2', 'a.3': '3', 'b.1': '4'})
+
+        self.assertEqual(backend.get_properties_page('a.*', limit=2), [('a.1', '1'), ('a.2', '2')])
+        self.assertEqual(backend.get_properties_page('a.*', 'a.2', 2), [('a.3', '3')])
+        self.assertEqual(backend.get_properties_by_names(['a.1', 'c']), {'a.1': '1'})
+
+    def test_journal_torn_record(self):
+        with open(self.path, 'w') as f:
+            f.write('a=1\nb=2\n')
+        with open(self.path + '.journal', 'w') as f:
+            f.write('{"set": {"a": "3"}}\n{"delete": ["b"')
+
+        backend = CMFileBackend(uri=self.path + '?mode=journal')
+
+        self.assertEqual(backend.get_properties('.*'), {'a': '3', 'b': '2'})
+
+    @mock.patch('cmframework.filebackend.cmfilebackend.threading.Thread')
+    def test_compaction(self, mock_thread):
+        uri = self.path + '?mode=journal&compact_threshold=100'
+        backend = CMFileBackend(uri=uri)
+        backend.set_properties({'a': '1', 'b': '2'})
+        mock_thread.assert_not_called()
+
+        backend.set_properties({'c': 'x' * 100})
+        mock_thread.assert_called_once_with(target=backend.compact)
+        mock_thread.return_value.start.assert_called_once_with()
+
+        backend.compact()
+        self.assertFalse(backend.compacting)
+        self.assertEqual(sorted(self._read(self.path).splitlines()),
+                         ['a=1', 'b=2', 'c=' + 'x' * 100])
+        self.assertEqual(self._read(self.path + '.journal'), '')
+        self.assertFalse(os.path.exists(self.path + '.journal.compacting'))
+
+        backend.delete_property('a')
+        self.assertEqual(CMFileBackend(uri=uri).get_properties('.*'),
+                         {'b': '2', 'c': 'x' * 100})
+
+    def test_compaction_interrupted(self):
+        with open(self.path, 'w') as f:
+            f.write('a=1\n')
+        with open(self.path + '.journal.compacting', 'w') as f:
+            f.write('{"set": {"a": "2"}}\n')
+        with open(self.path + '.journal', 'w') as f:
+            f.write('{"set": {"a": "3"}}\n')
+
+        backend = CMFileBackend(uri=self.path + '?mode=journal')
+        self.assertEqual(backend.get_property('a'), '3')
+
+        backend.compact()
+        self.assertEqual(self._read(self.path), 'a=3\n')
+        self.assertFalse(os.path.exists(self.path + '.journal.compacting'))
+        self.assertEqual(CMFileBackend(uri=self.path + '?mode=journal').get_property('a'), '3')
+
+    def test_compaction_failure(self):
+        backend = CMFileBackend(uri=self.path + '?mode=journal')
+        backend.set_property('a', '1')
+
+        with mock.patch('cmframework.filebackend.cmfilebackend.os.rename') as mock_rename:
+            mock_rename.side_effect = OSError('rename failed')
+            backend.compact()
+        self.assertFalse(backend.compacting)
+
+        backend.set_property('a', '2')
+        self.assertEqual(CMFileBackend(uri=self.path + '?mode=journal').get_property('a'), '2')
+
+    def test_group_commit(self):
+        uri = self.path + '?mode=journal'
+        backend = CMFileBackend(uri=uri)
+        started = threading.Event()
+        release = threading.Event()
+        batches = []
+        persist = backend._persist
+
+        def blocking_persist(changes, data):
+            batches.append(len(changes))
+            if len(batches) == 1:
+                started.set()
+                release.wait(5)
+            persist(changes, data)
+
+        backend._persist = blocking_persist
+        first = threading.Thread(target=backend.set_property, args=('a', '1'))
+        first.start()
+        started.wait(5)
+        others = [threading.Thread(target=backend.set_property, args=(name, '2'))
+                  for name in ('b', 'c', 'd')]
+        for thread in others:
+            thread.start()
+        for _ in range(500):
+            if len(backend.pending) == 3:
+                break
+            time.sleep(0.01)
+        # the changes are not seen before they are durable
+        self.assertEqual(backend.get_properties('.*'), {})
+        with self.assertRaises(CMError):
+            backend.get_property('a')
+        release.set()
+        for thread in [first] + others:
+            thread.join(5)
+
+        self.assertEqual(batches, [1, 3])
+        self.assertEqual(len(self._read(self.path + '.journal').splitlines()), 4)
+        self.assertEqual(CMFileBackend(uri=uri).get_properties('.*'),
+                         {'a': '1', 'b': '2', 'c': '2', 'd': '2'})
+
+    def test_group_commit_failure(self):
+        backend = CMFileBackend(uri=self.path)
+        backend.set_property('a', '1')
+
+        with mock.patch.object(backend, '_persist', side_effect=CMError('disk full')):
+            with self.assertRaises(CMError):
+                backend.set_properties({'a': '2', 'b': '2'})
+
+        self.assertEqual(backend.get_properties('.*'), {'a': '1'})
+        self.assertEqual(backend.failed_batches, {})
+        self.assertFalse(backend.flushing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import eventlet
+
+from cmframework.apis.cmerror import CMError
+from cmframework.apis.cmclient import CMClient
+from cmframework.lib.cmgreenclientimpl import CMGreenClientImpl
+
+
+class CMGreenClientImplTest(unittest.TestCase):
+    @mock.patch('cmframework.lib.cmgreenclientimpl.eventlet.patcher.is_monkey_patched')
+    def setUp(self, mock_is_monkey_patched):
+        mock_is_monkey_patched.return_value = True
+        self.client = CMClient('127.0.0.1', 61100,
+                               'cmframework.lib.cmgreenclientimpl.CMGreenClientImpl')
+        self.active = 0
+        self.max_active = 0
+
+    def _request(self, method, url, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        eventlet.sleep(0.01)
+        self.active -= 1
+        name = url.split('prop-name-filter=')[1]
+        response = mock.MagicMock()
+        response.ok = name != 'missing'
+        response.status_code = 200 if response.ok else 404
+        response.content = json.dumps({'properties': [{'name': name, 'value': '1'}]})
+        response.json.side_effect = lambda: json.loads(response.content)
+        response.headers = {}
+        return response
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_gather_properties(self, mock_request):
+        mock_request.side_effect = self._request
+
+        self.assertEqual(self.client.gather_properties(['a', 'b', 'c']),
+                         [{'a': '1'}, {'b': '1'}, {'c': '1'}])
+        self.assertEqual(self.max_active, 3)
+
+        with self.assertRaises(CMError):
+            self.client.gather_properties(['a', 'missing', 'c'])
+
+    @mock.patch('cmframework.lib.cmclientimpl.requests.Session.request')
+    def test_spawn(self, mock_request):
+        mock_request.side_effect = self._request
+        client_lib = self.client.client_lib
+
+        threads = [client_lib.spawn('get_properties', name) for name in ('a', 'b')]
+        self.assertEqual([thread.wait() for thread in threads], [{'a': '1'}, {'b': '1'}])
+        self.assertEqual(self.max_active, 2)
+
+    def test_not_monkey_patched(self):
+        with mock.patch('cmframework.lib.cmgreenclientimpl.eventlet.patcher.'
+                        'is_monkey_patched') as mock_is_monkey_patched:
+            mock_is_monkey_patched.return_value = False
+            with self.assertRaises(CMError):
+                CMGreenClientImpl('127.0.0.1', 61100, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
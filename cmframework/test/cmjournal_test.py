@@ -0,0 +1,176 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+
+from cmframework.server.cmjournal import CMJournal
+from cmframework.server.cmprocessor import CMProcessor
+from cmframework.utils.cmactivationstatehandler import CMActivationStateHandler
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+
+
+class CMJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.stored = {}
+        self.state_handler = CMActivationStateHandler(
+            'cmframework.utils.cmstatedummyhandler.CMStateDummyHandler')
+        self.state_handler.plugin = mock.MagicMock()
+        self.state_handler.plugin.set.side_effect = lambda domain, name, value: \
+            self.stored.__setitem__(name, value)
+        self.state_handler.plugin.delete.side_effect = lambda domain, name: \
+            self.stored.pop(name)
+        self.state_handler.plugin.delete_domain.side_effect = lambda domain: \
+            self.stored.clear()
+        self.state_handler.plugin.get_domain.side_effect = lambda domain: \
+            self.stored.items()
+
+    @staticmethod
+    def _commit(journal, csn, props, deleted):
+        journal.prepare(csn, props, deleted)
+        journal.commit()
+
+    def test_changes(self):
+        journal = CMJournal(5, max_entries=4)
+        self._commit(journal, 6, {'a': '1', 'b': '1'}, [])
+        self._commit(journal, 7, {'a': '2'}, ['c'])
+
+        self.assertEqual(journal.get_changes(5, 7), (['b', 'a'], ['c']))
+        self.assertEqual(journal.get_changes(6, 7), (['a'], ['c']))
+        self.assertEqual(journal.get_changes(7, 7), ([], []))
+        # the changes before the horizon and after the current csn are not known
+        self.assertIsNone(journal.get_changes(4, 7))
+        self.assertIsNone(journal.get_changes(8, 7))
+
+        self._commit(journal, 8, {'c': '1'}, ['b', 'd'])
+        self.assertEqual(journal.get_changes(5, 8), (['a', 'c'], ['b', 'd']))
+
+        # dropping the oldest names moves the horizon
+        self._commit(journal, 9, {}, ['e'])
+        self.assertEqual(journal.modified.keys(), ['c'])
+        self.assertEqual(journal.deleted.keys(), ['b', 'd', 'e'])
+        self.assertIsNone(journal.get_changes(6, 9))
+        self.assertEqual(journal.get_changes(7, 9), (['c'], ['b', 'd', 'e']))
+
+        # a change not fitting in the journal
+        self._commit(journal, 10, {'a': '1', 'b': '1', 'c': '1', 'd': '1', 'e': '1'}, [])
+        self.assertEqual(journal.get_changes(10, 10), ([], []))
+        self.assertIsNone(journal.get_changes(9, 10))
+
+    def test_prepare_without_commit(self):
+        journal = CMJournal(5, self.state_handler)
+        journal.prepare(6, {'a': '1'}, [])
+        self.assertEqual(journal.get_changes(5, 5), ([], []))
+
+        # the next change replaces the stored one
+        self._commit(journal, 6, {'b': '1'}, [])
+        self.assertEqual(json.loads(self.stored['6']), {'set': ['b'], 'deleted': []})
+
+    def test_persistence(self):
+        journal = CMJournal(5, self.state_handler, max_entries=3)
+        self.assertEqual(self.stored, {'horizon': '5'})
+        self._commit(journal, 6, {'a': '1'}, ['b'])
+        self._commit(journal, 7, {'c%': '1'}, [])
+        # only the change is stored
+        self.assertEqual(sorted(self.stored), ['6', '7', 'horizon'])
+        self.assertNotIn('%', self.stored['7'])
+
+        journal = CMJournal(7, self.state_handler, max_entries=3)
+        self.assertEqual(journal.get_changes(5, 7), (['a', 'c%'], ['b']))
+
+        self._commit(journal, 8, {'d': '1'}, [])
+        self.assertEqual(sorted(self.stored), ['7', '8', 'horizon'])
+        self.assertEqual(self.stored['horizon'], '6')
+
+        # a change stored before a failed commit
+        journal.prepare(9, {'e': '1'}, [])
+        journal = CMJournal(8, self.state_handler, max_entries=3)
+        self.assertEqual(journal.get_changes(6, 8), (['c%', 'd'], []))
+        self.assertNotIn('9', self.stored)
+
+    def test_missing_change(self):
+        journal = CMJournal(5, self.state_handler)
+        self._commit(journal, 6, {'a': '1'}, [])
+        self._commit(journal, 7, {'b': '1'}, [])
+        self._commit(journal, 8, {'c': '1'}, [])
+        del self.stored['7']
+
+        journal = CMJournal(8, self.state_handler)
+        self.assertIsNone(journal.get_changes(6, 8))
+        self.assertEqual(journal.get_changes(7, 8), (['c'], []))
+        self.assertEqual(sorted(self.stored), ['8', 'horizon'])
+
+        # changes committed while the journal was not stored
+        journal = CMJournal(10, self.state_handler)
+        self.assertEqual(journal.horizon, 10)
+
+        self.stored['horizon'] = 'invalid'
+        journal = CMJournal(10, self.state_handler)
+        self.assertEqual(self.stored, {'horizon': '10'})
+
+    def test_reset(self):
+        journal = CMJournal(5, self.state_handler)
+        self._commit(journal, 6, {'a': '1'}, [])
+
+        journal.reset(10)
+        self.assertIsNone(journal.get_changes(6, 10))
+        self.assertEqual(journal.get_changes(10, 10), ([], []))
+        self.assertEqual(self.stored, {'horizon': '10'})
+
+    def test_changed_properties(self):
+        backend = mock.MagicMock()
+        backend.get_property.return_value = '{"csn": {"global": 5, "nodes": {}}}'
+        backend.get_properties_by_names.side_effect = [{'a.2': '1'}, {'a.1': '2'}]
+        with mock.patch('cmframework.utils.cmflagfile.os'):
+            processor = CMProcessor(backend, mock.MagicMock(), mock.MagicMock(),
+                                    mock.MagicMock(), mock.MagicMock(), mock.MagicMock())
+        processor.set_properties({'a.1': '1', 'b': '1'})
+        processor.set_properties({'a.1': '2'})
+        processor.delete_property('a.2')
+
+        self.assertEqual(processor.get_changed_properties(5, 'a.*'), (8, {'a.1': '2'}, ['a.2']))
+        backend.get_properties_by_names.assert_called_with(['a.1'])
+        self.assertEqual(processor.get_changed_properties(4), (8, None, None))
+
+    def test_get_properties_since_csn(self):
+        processor = mock.MagicMock()
+        processor.get_changed_properties.return_value = (7, {'a': '1'}, ['b'])
+        api = CMRestAPIV1(processor)
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'prop-name-filter': ['a.*'], 'since-csn': ['5']}
+        api.get_properties(rpc)
+        self.assertEqual(rpc.rep_status, CMHTTPErrors.get_ok_status())
+        self.assertEqual(json.loads(rpc.rep_body),
+                         {'csn': 7, 'properties': [{'name': 'a', 'value': '1'}],
+                          'deleted': ['b']})
+        processor.get_changed_properties.assert_called_once_with(5, 'a.*')
+
+        processor.get_changed_properties.return_value = (7, None, None)
+        rpc = HTTPRPC()
+        rpc.req_filter = {'since-csn': ['1']}
+        api.get_properties(rpc)
+        self.assertEqual(json.loads(rpc.rep_body), {'csn': 7, 'resync': True})
+
+        rpc = HTTPRPC()
+        rpc.req_filter = {'since-csn': ['x']}
+        api.get_properties(rpc)
+        self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_request_not_ok_status()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import json
+
+from cmframework.utils import cmjsonstream
+
+
+class CMJSONStreamTest(unittest.TestCase):
+    def test_encode(self):
+        items = [{'name': str(i), 'value': 'x' * 10} for i in range(100)]
+        parts = list(cmjsonstream.iter_encode_list('properties', iter(items), chunk_size=100))
+
+        self.assertGreater(len(parts), 10)
+        self.assertTrue(all(len(part) < 200 for part in parts))
+        self.assertEqual(json.loads(''.join(parts)), {'properties': items})
+        self.assertEqual(json.loads(''.join(cmjsonstream.iter_encode_list('a', []))), {'a': []})
+
+    def test_decode(self):
+        items = []
+        data = json.dumps({'overwrite': True, 'properties': [{'name': 'a', 'value': '"1"'},
+                                                             {'name': 'b', 'value': '[]'}],
+                           'other': [1, 2]}, indent=2)
+
+        members = cmjsonstream.decode_object(data, {'properties': items.append})
+        self.assertEqual(members, {'overwrite': True, 'properties': 2, 'other': [1, 2]})
+        self.assertEqual(items, [{'name': 'a', 'value': '"1"'}, {'name': 'b', 'value': '[]'}])
+
+        self.assertEqual(cmjsonstream.decode_object(' {} ', {}), {})
+        self.assertEqual(cmjsonstream.decode_object('{"properties": [ ]}',
+                                                    {'properties': items.append}),
+                         {'properties': 0})
+        self.assertEqual(cmjsonstream.decode_object('{"properties": null}',
+                                                    {'properties': items.append}),
+                         {'properties': None})
+
+    def test_decode_errors(self):
+        for data in ('', '[]', '{"a" 1}', '{"a": 1,}', '{"a": [1 2]}', '{"a": [1}',
+                     '{"a": 1} x', '{1: 2}', '{"a": 1'):
+            with self.assertRaises(ValueError, msg=data):
+                cmjsonstream.decode_object(data, {'a': lambda item: None})
+
+        for data in ('{"a": null}', '{"a": 1}', '{"a": {}}'):
+            with self.assertRaises(ValueError, msg=data):
+                cmjsonstream.decode_object(data, {'a': lambda item: None}, strict=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
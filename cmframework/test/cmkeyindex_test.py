@@ -0,0 +1,100 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import collections
+import mock
+
+from cmframework.utils import cmkeyindex
+
+
+class CMKeyIndexTest(unittest.TestCase):
+    def test_literal_prefix(self):
+        self.assertEqual(cmkeyindex.get_literal_prefix('.*'), '')
+        self.assertEqual(cmkeyindex.get_literal_prefix('cloud.domain'), 'cloud')
+        self.assertEqual(cmkeyindex.get_literal_prefix(r'^myhost\..*'), 'myhost.')
+        self.assertEqual(cmkeyindex.get_literal_prefix(r'cloud\.hosts$'), 'cloud.hosts')
+        self.assertEqual(cmkeyindex.get_literal_prefix('abc*'), 'ab')
+        self.assertEqual(cmkeyindex.get_literal_prefix('abc+'), 'abc')
+        self.assertEqual(cmkeyindex.get_literal_prefix(r'node\d'), 'node')
+        self.assertEqual(cmkeyindex.get_literal_prefix('foo|bar'), '')
+        self.assertEqual(cmkeyindex.get_literal_prefix('(?i)foo'), '')
+
+    def test_prefix_upper_bound(self):
+        self.assertEqual(cmkeyindex.get_prefix_upper_bound('abc'), 'abd')
+        self.assertEqual(cmkeyindex.get_prefix_upper_bound('ab\xff'), 'ac')
+        self.assertEqual(cmkeyindex.get_prefix_upper_bound('\xff'), None)
+
+    def test_pattern_cache(self):
+        cache = collections.OrderedDict()
+        with mock.patch('cmframework.utils.cmkeyindex.PATTERN_CACHE_SIZE', 2), \
+                mock.patch('cmframework.utils.cmkeyindex._pattern_cache', cache):
+            pattern = cmkeyindex.get_pattern('foo.*')
+            self.assertIs(cmkeyindex.get_pattern('foo.*'), pattern)
+            cmkeyindex.get_pattern('bar.*')
+            cmkeyindex.get_pattern('foo.*')
+            cmkeyindex.get_pattern('baz.*')
+            self.assertEqual(cache.keys(), ['foo.*', 'baz.*'])
+
+    def test_match(self):
+        index = cmkeyindex.CMKeyIndex(['host1.a', 'host10.a', 'host1.b', 'host2.a',
+                                       'cloud.domain'])
+
+        self.assertEqual(index.match(r'host1\..*'), ['host1.a', 'host1.b'])
+        self.assertEqual(index.match(r'^host1.*\.a$'), ['host1.a', 'host10.a'])
+        self.assertEqual(index.match(r'.*\.a'), ['host1.a', 'host10.a', 'host2.a'])
+        self.assertEqual(index.match('cloud.domain'), ['cloud.domain'])
+        self.assertEqual(index.match('zzz'), [])
+
+    def test_match_inspects_only_the_prefix_range(self):
+        index = cmkeyindex.CMKeyIndex(['a.1', 'b.1', 'b.2', 'c.1'])
+        pattern = mock.MagicMock()
+        pattern.flags = 0
+        pattern.match.return_value = True
+        with mock.patch('cmframework.utils.cmkeyindex.get_pattern', return_value=pattern):
+            self.assertEqual(index.match(r'b\..*'), ['b.1', 'b.2'])
+        self.assertEqual(pattern.match.call_count, 2)
+
+    def test_match_page(self):
+        index = cmkeyindex.CMKeyIndex(['a.1', 'b.1', 'b.2', 'b.3', 'b.4', 'c.1'])
+        pattern = mock.MagicMock()
+        pattern.flags = 0
+        pattern.match.side_effect = lambda name: name != 'b.3'
+        with mock.patch('cmframework.utils.cmkeyindex.get_pattern', return_value=pattern):
+            self.assertEqual(index.match_page(r'b\..*', limit=2), ['b.1', 'b.2'])
+            self.assertEqual(pattern.match.call_count, 2)
+            self.assertEqual(index.match_page(r'b\..*', 'b.2', 2), ['b.4'])
+            self.assertEqual(index.match_page(r'b\..*', 'a'), ['b.1', 'b.2', 'b.4'])
+        self.assertEqual(index.match_page('.*', 'b.4'), ['c.1'])
+
+    def test_update(self):
+        index = cmkeyindex.CMKeyIndex()
+        index.update(['c', 'a'])
+        index.add('b')
+        index.add('b')
+        self.assertEqual(len(index), 3)
+        self.assertIn('b', index)
+
+        index.remove('b')
+        index.remove('x')
+        index.discard_all(['a'])
+        self.assertNotIn('b', index)
+        self.assertEqual(index.match('.*'), ['c'])
+
+        index.clear()
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,6 +56,40 @@ class CMProcessorAutomaticActivationTest(unittest.TestCase):
         mock_backend.set_properties.called_once_with({'foo': 'barbar'})
         mock_activator.add_work.assert_not_called()
 
+    @mock.patch('cmframework.utils.cmflagfile.os')
+    @mock.patch('cmframework.server.cmprocessor.logging')
+    def test_set_properties_overwrite_automatic_activation_disabled(self, mock_logging,
+                                                                    mock_flagfile_os):
+        mock_backend = mock.MagicMock()
+        mock_backend.get_property = CMProcessorAutomaticActivationTest.backend_get_property
+        mock_backend.get_properties.return_value = {'foo': '{"foo": "bar"}', 'old': '1',
+                                                    'cloud.cmframework': '{}'}
+
+        mock_validator = mock.MagicMock()
+        mock_activator = mock.MagicMock()
+        mock_changemonitor = mock.MagicMock()
+        mock_activationstate_handler = mock.MagicMock()
+        mock_snapshot_handler = mock.MagicMock()
+
+        mock_flagfile_os.path = mock.MagicMock()
+        mock_flagfile_os.path.exists = mock.MagicMock()
+        mock_flagfile_os.path.exists.return_value = True
+
+        processor = CMProcessor(mock_backend, mock_validator, mock_activator,
+                                mock_changemonitor, mock_activationstate_handler,
+                                mock_snapshot_handler)
+
+        processor.set_properties({'foo': 'barbar'}, overwrite=True)
+
+        mock_backend.delete_properties.assert_not_called()
+        mock_backend.set_properties.assert_not_called()
+        mock_backend.commit.assert_called_once()
+        changes, deleted = mock_backend.commit.call_args[0]
+        self.assertEqual(deleted, ['old'])
+        self.assertEqual(changes['foo'], 'barbar')
+        self.assertEqual(json.loads(changes['cloud.cmframework'])['csn']['global'], 102)
+        mock_activator.add_work.assert_not_called()
+
     @mock.patch('cmframework.utils.cmflagfile.os')
     @mock.patch('cmframework.server.cmprocessor.logging')
     def test_delete_property_automatic_activation_disabled(self, mock_logging, mock_flagfile_os):
@@ -76,10 +110,12 @@ class CMProcessorAutomaticActivationTest(unittest.TestCase):
                                 mock_changemonitor, mock_activationstate_handler,
                                 mock_snapshot_handler)
 
+        mock_backend.get_properties_by_names.return_value = {'foo': 'bar'}
         processor.delete_property('foo')
 
         mock_validator.validate_delete.assert_called_once_with(['foo'])
-        mock_backend.delete_property.assert_called_once_with('foo')
+        mock_backend.commit.assert_called_once()
+        self.assertEqual(mock_backend.commit.call_args[0][1], ['foo'])
         mock_activator.add_work.assert_not_called()
 
     @mock.patch('cmframework.utils.cmflagfile.os')
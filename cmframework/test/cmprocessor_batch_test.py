@@ -0,0 +1,168 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+
+from cmframework.apis.cmerror import CMError
+from cmframework.server.cmprocessor import CMProcessor
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+from cmframework.server import cmchangemonitor
+from cmframework.utils.cmactivationwork import CMActivationWork
+
+
+class CMProcessorBatchTest(unittest.TestCase):
+    @mock.patch('cmframework.utils.cmflagfile.os')
+    def setUp(self, mock_flagfile_os):
+        mock_flagfile_os.path.exists.return_value = False
+        self.data = {'a.1': '1', 'a.2': '2', 'b': '3',
+                     'cloud.cmframework': '{"csn": {"global": 10, "nodes": {}}}'}
+        self.backend = mock.MagicMock()
+        self.backend.get_property.side_effect = self._get_property
+        self.backend.get_properties.side_effect = \
+            lambda prop_filter: {name: value for name, value in self.data.iteritems()
+                                 if name.startswith(prop_filter.rstrip('.*'))}
+        self.backend.get_properties_by_names.side_effect = \
+            lambda names: {name: self.data[name] for name in names if name in self.data}
+        self.validator = mock.MagicMock()
+        self.activator = mock.MagicMock()
+        self.snapshot_handler = mock.MagicMock()
+        self.snapshot_handler.snapshot_exists.return_value = False
+        self.processor = CMProcessor(self.backend, self.validator, self.activator,
+                                     cmchangemonitor.CMChangeMonitor(), mock.MagicMock(),
+                                     self.snapshot_handler)
+        self.processor.automatic_activation_disabled = False
+
+    def _get_property(self, name):
+        if name not in self.data:
+            raise CMError('Not found')
+        return self.data[name]
+
+    def test_batch(self):
+        uuid_value, results = self.processor.batch([
+            {'operation': 'snapshot', 'name': 'snap'},
+            {'operation': 'set', 'properties': {'a.3': '3', 'b': '4'}},
+            {'operation': 'delete', 'properties': ['a.1']},
+            {'operation': 'get', 'name': 'b'},
+            {'operation': 'get', 'filter': 'a.*'},
+            {'operation': 'set', 'properties': {'a.1': '5'}},
+            {'operation': 'delete', 'properties': ['a.2']}])
+
+        self.assertEqual(results, [{}, {}, {}, {'value': '4'},
+                                   {'properties': {'a.2': '2', 'a.3': '3'}}, {}, {}])
+        self.assertEqual(self.backend.commit.call_count, 1)
+        changes, deleted = self.backend.commit.call_args[0]
+        self.assertEqual(sorted(changes), ['a.1', 'a.3', 'b', 'cloud.cmframework'])
+        self.assertEqual(deleted, ['a.2'])
+        self.assertEqual(self.processor.csn.get(), 11)
+        self.validator.validate_set.assert_called_once_with({'a.1': '5', 'a.3': '3', 'b': '4'})
+        self.validator.validate_delete.assert_called_once_with(['a.2'])
+        self.assertEqual(self.snapshot_handler.set_data.call_args[0][1]['snapshot_properties'],
+                         self.data)
+
+        works = [call[0][0] for call in self.activator.add_work.call_args_list]
+        self.assertEqual([work.get_operation() for work in works],
+                         [CMActivationWork.OPER_DELETE, CMActivationWork.OPER_SET])
+        self.assertEqual({work.uuid_value for work in works}, {uuid_value})
+
+    def test_read_only(self):
+        uuid_value, results = self.processor.batch([{'operation': 'get', 'name': 'b'}])
+
+        self.assertIsNone(uuid_value)
+        self.assertEqual(results, [{'value': '3'}])
+        self.backend.commit.assert_not_called()
+        self.activator.add_work.assert_not_called()
+
+    def test_delete_missing(self):
+        uuid_value, results = self.processor.batch([{'operation': 'delete',
+                                                     'properties': ['x']}])
+        self.assertIsNone(uuid_value)
+        self.assertEqual(results, [{}])
+
+        with self.assertRaisesRegexp(CMError, 'Property not found'):
+            self.processor.delete_property('x')
+        self.backend.commit.assert_not_called()
+        self.validator.validate_delete.assert_not_called()
+        self.activator.add_work.assert_not_called()
+
+        self.processor.delete_properties(['x', 'b'])
+        self.assertEqual(self.backend.commit.call_args[0][1], ['b'])
+        self.validator.validate_delete.assert_called_once_with(['b'])
+
+    def test_all_or_nothing(self):
+        for operations in ([{'operation': 'set', 'properties': {'b': '4'}},
+                            {'operation': 'get', 'name': 'c'}],
+                           [{'operation': 'delete', 'properties': ['b']},
+                            {'operation': 'get', 'name': 'b'}]):
+            with self.assertRaises(CMError):
+                self.processor.batch(operations)
+
+        self.validator.validate_set.side_effect = CMError('Invalid')
+        with self.assertRaises(CMError):
+            self.processor.batch([{'operation': 'snapshot', 'name': 'snap'},
+                                  {'operation': 'set', 'properties': {'b': '4'}}])
+
+        for operations in ([{'operation': 'x'}],
+                           [{'operation': 'set', 'properties': ['b']}],
+                           [{'operation': 'delete', 'properties': 'b'}],
+                           [{'operation': 'set', 'properties': {'b': '4'}},
+                            {'operation': 'snapshot', 'name': 'snap'}]):
+            with self.assertRaises(ValueError):
+                self.processor.batch(operations)
+
+        self.backend.commit.assert_not_called()
+        self.snapshot_handler.set_data.assert_not_called()
+        self.activator.add_work.assert_not_called()
+
+    def test_snapshots_of_failed_commit_removed(self):
+        self.backend.commit.side_effect = CMError('Backend failure')
+        self.snapshot_handler.snapshot_exists.side_effect = lambda name: \
+            name in [call[0][0] for call in self.snapshot_handler.set_data.call_args_list]
+
+        with self.assertRaisesRegexp(CMError, 'Backend failure'):
+            self.processor.batch([{'operation': 'snapshot', 'name': 'snap1'},
+                                  {'operation': 'snapshot', 'name': 'snap2'},
+                                  {'operation': 'set', 'properties': {'b': '4'}}])
+
+        self.assertEqual(self.snapshot_handler.delete_snapshot.call_args_list,
+                         [mock.call('snap1'), mock.call('snap2')])
+        self.activator.add_work.assert_not_called()
+
+    def test_rest(self):
+        api = CMRestAPIV1(self.processor)
+
+        rpc = HTTPRPC()
+        rpc.req_body = json.dumps({'operations': [
+            {'operation': 'set', 'properties': {'c': '1'}},
+            {'operation': 'get', 'name': 'c'}]})
+        api.batch(rpc)
+        self.assertEqual(rpc.rep_status, CMHTTPErrors.get_ok_status())
+        reply = json.loads(rpc.rep_body)
+        self.assertEqual(reply['results'], [{}, {'value': '1'}])
+        self.assertIsNotNone(reply['change-uuid'])
+
+        for body in ('{"operations": [{"operation": "x"}]}', '{"operations": {}}', '[]',
+                     '{"operations": [{"operation": "get", "filter": "("}]}'):
+            rpc = HTTPRPC()
+            rpc.req_body = body
+            api.batch(rpc)
+            self.assertTrue(rpc.rep_status.startswith(
+                CMHTTPErrors.get_request_not_ok_status()), body)
+
+
+if __name__ == '__main__':
+    unittest.main()
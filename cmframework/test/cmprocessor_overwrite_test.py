@@ -0,0 +1,98 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.server.cmprocessor import CMProcessor
+from cmframework.server import cmchangemonitor
+from cmframework.apis import cmchangestate
+from cmframework.apis.cmerror import CMError
+from cmframework.utils.cmactivationwork import CMActivationWork
+
+
+class CMProcessorOverwriteTest(unittest.TestCase):
+    @mock.patch('cmframework.utils.cmflagfile.os')
+    def setUp(self, mock_flagfile_os):
+        mock_flagfile_os.path.exists.return_value = False
+        self.backend = mock.MagicMock()
+        self.backend.get_property.return_value = '{"csn": {"global": 10, "nodes": {}}}'
+        self.backend.get_properties.return_value = {'a': '1', 'b': '2', 'c': '3',
+                                                    'cloud.cmframework': '{}'}
+        self.validator = mock.MagicMock()
+        self.activator = mock.MagicMock()
+        self.changemonitor = cmchangemonitor.CMChangeMonitor()
+        self.processor = CMProcessor(self.backend, self.validator, self.activator,
+                                     self.changemonitor, mock.MagicMock(), mock.MagicMock())
+        self.processor.automatic_activation_disabled = False
+
+    def test_only_the_diff_is_written_and_activated(self):
+        uuid_value, diff = self.processor.set_properties_with_diff(
+            {'a': '1', 'b': '5', 'd': '4'}, overwrite=True)
+
+        self.assertEqual(diff, {'added': ['d'], 'changed': ['b'], 'deleted': ['c']})
+        self.validator.validate_set.assert_called_once_with({'b': '5', 'd': '4'})
+        changes, deleted = self.backend.commit.call_args[0]
+        self.assertEqual(sorted(changes.keys()), ['b', 'cloud.cmframework', 'd'])
+        self.assertEqual(deleted, ['c'])
+
+        works = [call[0][0] for call in self.activator.add_work.call_args_list]
+        self.assertEqual([work.get_operation() for work in works],
+                         [CMActivationWork.OPER_DELETE, CMActivationWork.OPER_SET])
+        self.assertEqual(works[0].get_props(), ['c'])
+        self.assertEqual(works[1].get_props(), {'b': '5', 'd': '4'})
+        self.assertEqual({work.uuid_value for work in works}, {uuid_value})
+
+        self.changemonitor.change_ok(uuid_value)
+        self.assertEqual(self.changemonitor.get_change_state(uuid_value).state,
+                         cmchangestate.CM_CHANGE_STATE_ONGOING)
+        self.changemonitor.change_nok(uuid_value, {'plugin': 'error'})
+        state = self.changemonitor.get_change_state(uuid_value)
+        self.assertEqual(state.state, cmchangestate.CM_CHANGE_STATE_NOK)
+        self.assertEqual(state.failed_plugins, {'plugin': 'error'})
+
+    def test_deletes_are_validated(self):
+        self.validator.validate_delete.side_effect = CMError('c is needed')
+
+        with self.assertRaises(CMError):
+            self.processor.set_properties_with_diff({'a': '1', 'b': '2'}, overwrite=True)
+
+        self.validator.validate_delete.assert_called_once_with(['c'])
+        self.backend.commit.assert_not_called()
+        self.activator.add_work.assert_not_called()
+
+    def test_nothing_changed(self):
+        uuid_value, diff = self.processor.set_properties_with_diff(
+            {'a': '1', 'b': '2', 'c': '3'}, overwrite=True)
+
+        self.assertEqual(diff, {'added': [], 'changed': [], 'deleted': []})
+        self.backend.commit.assert_not_called()
+        self.validator.validate_set.assert_not_called()
+        self.validator.validate_delete.assert_not_called()
+        self.activator.add_work.assert_not_called()
+        self.assertEqual(self.changemonitor.get_change_state(uuid_value).state,
+                         cmchangestate.CM_CHANGE_STATE_OK)
+
+    def test_without_overwrite(self):
+        uuid_value = self.processor.set_properties({'a': '1'})
+
+        self.validator.validate_set.assert_called_once_with({'a': '1'})
+        self.backend.get_properties.assert_not_called()
+        work = self.activator.add_work.call_args[0][0]
+        self.assertEqual(work.get_props(), {'a': '1'})
+        self.assertEqual(work.uuid_value, uuid_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -131,6 +131,7 @@ class CMProcessorSnapshotTest(unittest.TestCase):
 
         mock_cmsnapshot.return_value.list.assert_called_once()
 
+    @mock.patch('cmframework.server.cmprocessor.cmjournal.CMJournal')
     @mock.patch('cmframework.server.cmprocessor.cmactivationwork.CMActivationWork')
     @mock.patch('cmframework.server.cmprocessor.cmcsn.CMCSN')
     @mock.patch('cmframework.server.cmprocessor.cmsnapshot.CMSnapshot')
@@ -139,7 +140,8 @@ class CMProcessorSnapshotTest(unittest.TestCase):
                               mock_logging,
                               mock_cmsnapshot,
                               mock_cmcsn,
-                              mock_cmactivationwork):
+                              mock_cmactivationwork,
+                              mock_cmjournal):
         csn1 = mock.MagicMock()
         csn2 = mock.MagicMock()
         mock_cmcsn.side_effect = [csn1, csn2]
@@ -169,6 +171,7 @@ class CMProcessorSnapshotTest(unittest.TestCase):
             csn2.get.return_value,
             mock_cmsnapshot.return_value.get_properties.return_value)
         mock_activator.add_work.assert_called_once_with(mock_cmactivationwork.return_value)
+        mock_cmjournal.return_value.reset.assert_called_once_with(csn2.get.return_value)
 
 if __name__ == '__main__':
     unittest.main()
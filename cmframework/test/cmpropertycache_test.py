@@ -0,0 +1,187 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.apis.cmerror import CMError
+from cmframework.apis.cmbackend import CMBackend
+from cmframework.utils.cmbackendhandler import CMBackendHandler
+from cmframework.utils.cmbackendpluginclient import CMBackendPluginClient
+from cmframework.server.cmprocessor import CMProcessor
+
+
+class FakeBackend(CMBackend):
+    def __init__(self, **kw):
+        self.data = {'csn': '1'}
+        self.reads = 0
+
+    def get_property(self, prop_name):
+        if prop_name != 'csn':
+            self.reads += 1
+        try:
+            return self.data[prop_name]
+        except KeyError:
+            raise CMError('Invalid property name')
+
+    def get_properties(self, prop_filter):
+        self.reads += 1
+        return {name: value for name, value in self.data.iteritems()
+                if name.startswith(prop_filter.rstrip('.*'))}
+
+    def commit(self, properties, deleted):
+        for name in deleted:
+            self.data.pop(name, None)
+        self.data.update(properties)
+
+    def set_property(self, prop_name, prop_value):
+        self.commit({prop_name: prop_value}, [])
+
+    def delete_properties(self, arg):
+        if isinstance(arg, str):
+            raise CMError('not supported')
+        self.commit({}, arg)
+
+
+class CMPropertyCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = CMBackendHandler(__name__ + '.FakeBackend', uri='')
+        self.handler.enable_cache(10, 'csn', 1000)
+        self.backend = self.handler.plugin
+        self.backend.data.update({'a.1': '1', 'a.2': '2', 'b.1': '3'})
+
+    def test_read_through(self):
+        self.assertEqual(self.handler.get_property('a.1'), '1')
+        self.assertEqual(self.handler.get_property('a.1'), '1')
+        self.assertEqual(self.handler.get_properties('a.*'), {'a.1': '1', 'a.2': '2'})
+        self.assertEqual(self.handler.get_properties('a.*'), {'a.1': '1', 'a.2': '2'})
+
+        self.assertEqual(self.backend.reads, 2)
+        stats = self.handler.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    def test_read_by_names(self):
+        self.assertEqual(self.handler.get_property('a.1'), '1')
+        self.assertEqual(self.handler.get_properties_by_names(['a.1', 'a.2', 'x']),
+                         {'a.1': '1', 'a.2': '2'})
+        self.assertEqual(self.handler.get_properties_by_names(['a.2']), {'a.2': '2'})
+
+        self.assertEqual(self.backend.reads, 3)
+
+    def test_plugin_writes(self):
+        plugin_client = CMBackendPluginClient(None, self.handler)
+        self.assertEqual(self.handler.get_property('a.1'), '1')
+
+        plugin_client.set_property('a.1', '5')
+        self.assertEqual(self.handler.get_property('a.1'), '5')
+        self.assertEqual(self.backend.reads, 1)
+
+        stats = self.handler.get_stats()['cache']
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    @mock.patch('cmframework.utils.cmflagfile.os')
+    def test_version_changes_on_plugin_writes(self, mock_flagfile_os):
+        mock_flagfile_os.path.exists.return_value = False
+        processor = CMProcessor(self.handler, mock.MagicMock(), mock.MagicMock(),
+                                mock.MagicMock(), mock.MagicMock(), mock.MagicMock())
+        version = processor.get_version()
+
+        CMBackendPluginClient(None, self.handler).set_property('a.1', '5')
+        self.assertNotEqual(processor.get_version(), version)
+        # the plugin writes get a csn and are in the journal
+        self.assertEqual(processor.csn.get(), 1)
+        self.assertEqual(processor.get_changed_properties(0), (1, {'a.1': '5'}, []))
+
+    def test_recorder(self):
+        recorder = mock.MagicMock()
+        self.handler.set_recorder(recorder, 'csn')
+
+        self.handler.set_property('a.1', '5')
+        self.handler.delete_properties('a.*')
+        self.handler.commit({'a.3': '1', 'csn': '2'}, [])
+
+        self.assertEqual(recorder.call_args_list,
+                         [mock.call({'a.1': '5'}, []), mock.call({}, ['a.1', 'a.2'])])
+        self.assertEqual(self.backend.data['a.3'], '1')
+        self.assertEqual(self.backend.data['a.1'], '1')
+
+    def test_default_page(self):
+        self.assertEqual(self.handler.get_properties_page('a.*', 'a.1', 5), [('a.2', '2')])
+        self.assertEqual(self.handler.get_properties_page('.*', limit=2),
+                         [('a.1', '1'), ('a.2', '2')])
+
+    def test_missing_property_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(CMError):
+                self.handler.get_property('x')
+        self.assertEqual(self.backend.reads, 2)
+
+    def test_own_writes_update_the_cache(self):
+        self.handler.get_properties('a.*')
+        self.handler.get_property('a.2')
+
+        self.handler.commit({'a.3': '5', 'b.2': '6', 'csn': '2'}, ['a.2'])
+
+        self.assertEqual(self.handler.get_properties('a.*'), {'a.1': '1', 'a.3': '5'})
+        with self.assertRaises(CMError):
+            self.handler.get_property('a.2')
+        self.assertEqual(self.backend.reads, 3)
+        self.assertEqual(self.handler.get_cache_stats()['invalidations'], 0)
+
+    def test_external_write_drops_the_cache(self):
+        self.handler.cache.check_interval = 0
+        self.handler.get_property('a.1')
+        self.backend.data.update({'a.1': '7', 'csn': '2'})
+
+        self.assertEqual(self.handler.get_property('a.1'), '7')
+        self.assertEqual(self.handler.get_cache_stats()['invalidations'], 1)
+
+    def test_external_write_before_own_write(self):
+        self.handler.get_property('b.1')
+        self.backend.data.update({'b.1': '7', 'csn': '2'})
+
+        self.handler.commit({'a.1': '8', 'csn': '3'}, [])
+
+        self.assertEqual(self.handler.get_property('b.1'), '7')
+
+    def test_filter_delete_clears_the_cache(self):
+        self.handler.get_property('a.1')
+        with self.assertRaises(CMError):
+            self.handler.delete_properties('a.*')
+        self.assertEqual(self.handler.get_cache_stats()['entries'], 0)
+
+    def test_bounded(self):
+        for index in range(20):
+            self.backend.data['c.{}'.format(index)] = str(index)
+            self.handler.get_property('c.{}'.format(index))
+        self.handler.get_properties('c.*')
+
+        stats = self.handler.get_cache_stats()
+        self.assertEqual(stats['entries'], 10)
+        self.assertEqual(stats['size'], 10)
+
+    @mock.patch('cmframework.utils.cmpropertycache.time.time')
+    def test_check_interval(self, mock_time):
+        mock_time.return_value = 100
+        self.handler.cache.check_interval = 5
+        self.handler.get_property('a.1')
+        self.backend.data.update({'a.1': '7', 'csn': '2'})
+
+        self.assertEqual(self.handler.get_property('a.1'), '1')
+        mock_time.return_value = 106
+        self.assertEqual(self.handler.get_property('a.1'), '7')
+
+
+if __name__ == '__main__':
+    unittest.main()
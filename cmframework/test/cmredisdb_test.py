@@ -0,0 +1,167 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import redis
+
+from cmframework.apis.cmerror import CMError
+from cmframework.redisbackend import cmredisdb
+from cmframework.redisbackend.cmredisdb import CMRedisDB
+from cmframework.utils.cmbackendhandler import CMBackendHandler
+from cmframework.server.cmrestapiv1 import CMRestAPIV1
+from cmframework.server.cmhttprpc import HTTPRPC
+from cmframework.server.cmhttperrors import CMHTTPErrors
+
+
+class CMRedisDBTest(unittest.TestCase):
+    def test_scan_glob(self):
+        self.assertEqual(cmredisdb.get_scan_glob('.*'), '*')
+        self.assertEqual(cmredisdb.get_scan_glob(r'^myhost\..*'), 'myhost.*')
+        self.assertEqual(cmredisdb.get_scan_glob(r'a\*b\[c'), 'a\\*b\\[c*')
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_options_from_uri(self, mock_redis):
+        db = CMRedisDB(uri='redis://:pw@1.2.3.4:6379')
+        self.assertEqual(db.scan_count, CMRedisDB.OPTIONS['scan_count'][1])
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.4:6379?scan_count=10&max_connections=3')
+        self.assertEqual(db.scan_count, 10)
+        pool = mock_redis.call_args[1]['connection_pool']
+        self.assertEqual(pool.max_connections, 3)
+        self.assertEqual(pool.connection_kwargs['host'], '1.2.3.4')
+        self.assertEqual(pool.connection_kwargs['password'], 'pw')
+
+        with self.assertRaises(CMError):
+            CMRedisDB(uri='redis://:pw@1.2.3.4:6379?scan_cnt=10')
+        with self.assertRaises(CMError):
+            CMRedisDB(uri='redis://:pw@1.2.3.4:6379?scan_count=many')
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_shared_connection(self, mock_redis):
+        db1 = CMRedisDB(uri='redis://:pw@1.2.3.5:6379')
+        db2 = CMRedisDB(uri='redis://:pw@1.2.3.5:6379')
+        db3 = CMRedisDB(uri='redis://:pw@1.2.3.5:6379?max_connections=1')
+
+        self.assertIs(db1.breaker, db2.breaker)
+        self.assertIsNot(db1.breaker, db3.breaker)
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.time.sleep')
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_retry(self, mock_redis, mock_sleep):
+        client = mock_redis.return_value
+        client.get.side_effect = [redis.ConnectionError('down'), redis.TimeoutError('slow'), 'a']
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.6:6379')
+
+        self.assertEqual(db.get_property('foo'), 'a')
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(db.get_circuit_state(), 'closed')
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.time.sleep')
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_circuit_breaker_opens(self, mock_redis, mock_sleep):
+        client = mock_redis.return_value
+        client.set.side_effect = redis.ConnectionError('down')
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.7:6379?breaker_threshold=3')
+
+        with self.assertRaises(CMError):
+            db.set_property('foo', 'bar')
+        self.assertEqual(client.set.call_count, 3)
+        self.assertEqual(db.get_circuit_state(), 'open')
+
+        with self.assertRaises(CMError):
+            db.get_property('foo')
+        client.get.assert_not_called()
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.time.sleep')
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_backend_stats(self, mock_redis, mock_sleep):
+        client = mock_redis.return_value
+        client.get.side_effect = redis.ConnectionError('down')
+        handler = CMBackendHandler('cmframework.redisbackend.cmredisdb.CMRedisDB',
+                                   uri='redis://:pw@1.2.3.9:6379?breaker_threshold=2')
+
+        with self.assertRaises(CMError):
+            handler.get_property('foo')
+
+        processor = mock.MagicMock()
+        processor.get_backend_stats.side_effect = handler.get_stats
+        rpc = HTTPRPC()
+        CMRestAPIV1(processor).get_backend_stats(rpc)
+        self.assertEqual(rpc.rep_status, CMHTTPErrors.get_ok_status())
+        self.assertEqual(json.loads(rpc.rep_body),
+                         {'backend': {'circuit': {'name': 'redis 1.2.3.9:6379',
+                                                  'state': 'open',
+                                                  'failures': 2}}})
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_no_retry_on_command_error(self, mock_redis):
+        client = mock_redis.return_value
+        client.get.side_effect = redis.ResponseError('wrong type')
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.8:6379')
+
+        with self.assertRaises(redis.ResponseError):
+            db.get_property('foo')
+        self.assertEqual(client.get.call_count, 1)
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_get_properties(self, mock_redis):
+        data = {'myhost.a': '1', 'myhost.b': '2', 'myhost.c': '3', 'myhostx': '4'}
+        client = mock_redis.return_value
+        client.scan.side_effect = [(7, ['myhost.a', 'myhostx']), (0, ['myhost.b', 'myhost.c'])]
+        pipe = client.pipeline.return_value
+        pipe.execute.side_effect = lambda: [[data[name] for name in names]
+                                            for (names,), _ in pipe.mget.call_args_list]
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.4:6379?scan_count=2')
+        props = db.get_properties(r'myhost\..*')
+
+        self.assertEqual(props, {'myhost.a': '1', 'myhost.b': '2', 'myhost.c': '3'})
+        client.scan.assert_has_calls([mock.call(0, match='myhost.*', count=2),
+                                      mock.call(7, match='myhost.*', count=2)])
+        self.assertEqual(pipe.mget.call_count, 2)
+        client.keys.assert_not_called()
+        client.get.assert_not_called()
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_get_properties_deleted_while_scanning(self, mock_redis):
+        client = mock_redis.return_value
+        client.scan.return_value = (0, ['a', 'b'])
+        client.pipeline.return_value.execute.return_value = [['1', None]]
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.4:6379')
+        props = db.get_properties('.*')
+
+        self.assertEqual(props, {'a': '1'})
+
+    @mock.patch('cmframework.redisbackend.cmredisdb.redis.StrictRedis')
+    def test_commit(self, mock_redis):
+        client = mock_redis.return_value
+        pipe = client.pipeline.return_value
+
+        db = CMRedisDB(uri='redis://:pw@1.2.3.4:6379')
+        db.commit({'a': '1', 'b': '2'}, ['c', 'd'])
+
+        client.pipeline.assert_called_once_with(transaction=True)
+        pipe.delete.assert_called_once_with('c', 'd')
+        pipe.mset.assert_called_once_with({'a': '1', 'b': '2'})
+        pipe.execute.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
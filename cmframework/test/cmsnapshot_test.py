@@ -116,6 +116,22 @@ class CMSnapshotTest(unittest.TestCase):
         assert snapshot._data == expected_data
         assert snapshot._metadata == expected_metadata
 
+    @mock.patch('cmframework.server.cmsnapshot.logging')
+    def test_get_properties(self, mock_logging):
+        mock_handler = mock.MagicMock()
+        mock_handler.snapshot_exists.return_value = True
+        mock_handler.get_data.return_value = {
+            'snapshot_properties': {'host1.a': '1', 'host1.b': '2', 'host2.a': '3'},
+            'snapshot_metadata': {'name': 'snap1'}}
+
+        snapshot = CMSnapshot(mock_handler)
+        snapshot.load('snap1')
+
+        assert snapshot.get_properties(r'host1\..*') == {'host1.a': '1', 'host1.b': '2'}
+        assert snapshot.get_properties(r'.*\.a') == {'host1.a': '1', 'host2.a': '3'}
+        assert snapshot.get_property('host2.a') == '3'
+        assert snapshot.get_property('host3.a') is None
+
     @mock.patch('cmframework.server.cmsnapshot.logging')
     def test_restore(self, mock_logging):
         expected_data = {'foo': 'bar', 'some': {'other': 'value'}}
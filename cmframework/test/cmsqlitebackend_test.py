@@ -0,0 +1,86 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from cmframework.sqlitebackend.cmsqlitebackend import CMSQLiteBackend
+from cmframework.apis.cmerror import CMError
+
+
+class CMSQLiteBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_set_get_delete(self):
+        backend = CMSQLiteBackend(uri=self.path)
+        backend.set_property('a', '1')
+        backend.set_properties({'b': '2', 'c': '3'})
+        backend.set_property('a', '4')
+
+        self.assertEqual(backend.get_property('a'), '4')
+        self.assertEqual(backend.get_properties('.*'), {'a': '4', 'b': '2', 'c': '3'})
+
+        backend.delete_property('a')
+        with self.assertRaises(CMError):
+            backend.get_property('a')
+        with self.assertRaises(CMError):
+            backend.delete_property('a')
+
+        backend.delete_properties(['b', 'x'])
+        self.assertEqual(CMSQLiteBackend(uri=self.path).get_properties('.*'), {'c': '3'})
+
+    def test_wal_mode(self):
+        backend = CMSQLiteBackend(uri=self.path)
+        mode = backend.connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_filters(self):
+        backend = CMSQLiteBackend(uri=self.path)
+        backend.set_properties({'host1.a': '1', 'host1.b': '2', 'host10.a': '3',
+                                'host2.a': '4', 'cloud.domain': '5'})
+
+        self.assertEqual(backend.get_properties(r'host1\..*'), {'host1.a': '1', 'host1.b': '2'})
+        self.assertEqual(backend.get_properties(r'^host1.*\.a$'),
+                         {'host1.a': '1', 'host10.a': '3'})
+        self.assertEqual(backend.get_properties(r'.*\.a'),
+                         {'host1.a': '1', 'host10.a': '3', 'host2.a': '4'})
+        self.assertEqual(backend.get_properties('cloud.domain'), {'cloud.domain': '5'})
+        self.assertEqual(backend.get_properties('nothing'), {})
+        self.assertEqual(backend.get_properties_page(r'host.*\.a', 'host1.a', 1),
+                         [('host10.a', '3')])
+        self.assertEqual(backend.get_properties_page(r'host.*\.a', 'host10.a'), [('host2.a', '4')])
+        self.assertEqual(backend.get_properties_by_names(['host1.a', 'host2.a', 'host3.a']),
+                         {'host1.a': '1', 'host2.a': '4'})
+
+        backend.delete_properties('host1')
+        self.assertEqual(backend.get_properties('.*'), {'host2.a': '4', 'cloud.domain': '5'})
+
+    def test_commit(self):
+        backend = CMSQLiteBackend(uri=self.path)
+        backend.set_properties({'a': '1', 'b': '2'})
+
+        backend.commit({'c': '3', 'a': '5'}, ['b'])
+
+        self.assertEqual(backend.get_properties('.*'), {'a': '5', 'c': '3'})
+
+
+if __name__ == '__main__':
+    unittest.main()
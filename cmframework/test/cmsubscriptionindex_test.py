@@ -0,0 +1,89 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+
+from cmframework.apis.cmerror import CMError
+from cmframework.utils.cmsubscriptionindex import CMSubscriptionIndex
+from cmframework.utils.cmpluginmanager import CMPluginManager
+
+
+class CMSubscriptionIndexTest(unittest.TestCase):
+    SUBSCRIPTIONS = {'hosts': r'cloud\.hosts$',
+                     'network': r'cloud\.network.*',
+                     'all': '.*',
+                     'either': r'cloud\.hosts|cloud\.time',
+                     'none': None}
+
+    def test_dispatch(self):
+        index = CMSubscriptionIndex(self.SUBSCRIPTIONS)
+
+        props = {'cloud.hosts': 'a', 'cloud.networking': 'b', 'cloud.time': 'c', 'x': 'd'}
+        self.assertEqual(index.dispatch(props),
+                         {'all': props,
+                          'either': {'cloud.hosts': 'a', 'cloud.time': 'c'},
+                          'hosts': {'cloud.hosts': 'a'},
+                          'network': {'cloud.networking': 'b'}})
+
+        self.assertEqual(index.dispatch(['cloud.hostsx', 'cloud.network']),
+                         {'all': ['cloud.hostsx', 'cloud.network'],
+                          'either': ['cloud.hostsx'],
+                          'network': ['cloud.network']})
+        self.assertEqual(CMSubscriptionIndex({}).dispatch(props), {})
+
+    def test_empty_subscription(self):
+        # an empty filter matches every name like re.compile('') does
+        index = CMSubscriptionIndex({'p': r'', 'q': r'a.*'})
+
+        self.assertEqual(index.dispatch({'abc': 1, 'x': 2}),
+                         {'p': {'abc': 1, 'x': 2}, 'q': {'abc': 1}})
+        self.assertEqual(index.get_plugins(''), ('p',))
+
+    def test_cache(self):
+        index = CMSubscriptionIndex(self.SUBSCRIPTIONS, cache_size=2)
+
+        self.assertEqual(index.get_plugins('cloud.hosts'), ('all', 'either', 'hosts'))
+        index.get_plugins('a')
+        index.get_plugins('cloud.hosts')
+        index.get_plugins('b')
+
+        self.assertEqual(index.cache.keys(), ['cloud.hosts', 'b'])
+        self.assertEqual(index.get_plugins('cloud.hosts'), ('all', 'either', 'hosts'))
+
+    def test_invalid_subscription(self):
+        with self.assertRaises(CMError):
+            CMSubscriptionIndex({'bad': 'cloud.('})
+
+    def test_plugin_instances(self):
+        module = mock.MagicMock()
+        module.plugin.side_effect = lambda: mock.MagicMock()
+        manager = CMPluginManager('path')
+        manager.plugin_client = 'client'
+        manager.set_plugins({'plugin': module}, {'plugin': 'a.*'})
+
+        instance = manager.create_instance('plugin')
+        self.assertEqual(instance.plugin_client, 'client')
+        # every call gets its own instance
+        self.assertIsNot(manager.create_instance('plugin'), instance)
+        self.assertEqual(manager.create_instance('plugin', 'other').plugin_client, 'other')
+        self.assertEqual(module.plugin.call_count, 3)
+        self.assertEqual(manager.dispatch(['a1', 'b1']), {'plugin': ['a1']})
+
+        manager.set_plugins({'plugin': module}, {'plugin': 'b.*'})
+        self.assertEqual(manager.dispatch(['a1', 'b1']), {'plugin': ['b1']})
+
+
+if __name__ == '__main__':
+    unittest.main()
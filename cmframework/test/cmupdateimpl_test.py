@@ -261,9 +261,9 @@ class CMUpdateImplTest(unittest.TestCase):
                                                 'test_handler_a',
                                                 'test_update_exception')
 
-    @mock.patch('cmframework.lib.cmupdateimpl.logging')
+    @mock.patch('cmframework.utils.cmdependencysort.logging')
     def test_dependency_files(self, mock_logging):
-        with mock.patch('cmframework.lib.cmupdateimpl.open', create=True) as mock_open:
+        with mock.patch('cmframework.utils.cmdependencysort.open', create=True) as mock_open:
             mock_open.return_value = mock.MagicMock(spec=file)
             file_handle = mock_open.return_value.__enter__.return_value
 
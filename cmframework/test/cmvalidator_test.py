@@ -0,0 +1,117 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import eventlet
+
+from cmframework.apis.cmerror import CMError
+from cmframework.server.cmvalidator import CMValidator
+
+
+class CMValidatorTest(unittest.TestCase):
+    def _create_validator(self, events, workers=1, plugin_timeout=0, failing=(), slow=()):
+        plugins = {}
+        filters = {}
+        for name in ('a', 'b', 'c'):
+            def validate_set(_, props, name=name):
+                events.append('start ' + name)
+                eventlet.sleep(1 if name in slow else 0)
+                events.append('end ' + name)
+                if name in failing:
+                    raise CMError('{} rejected'.format(name))
+            module = mock.MagicMock()
+            setattr(module, name, type(name, (object,), {'validate_set': validate_set}))
+            plugins[name] = module
+            filters[name] = '.*'
+
+        with mock.patch('cmframework.server.cmvalidator.CMPluginLoader') as mock_loader:
+            mock_loader.return_value.load.return_value = (plugins, filters)
+            return CMValidator('path', mock.MagicMock(), workers, plugin_timeout)
+
+    def test_serial(self):
+        events = []
+        validator = self._create_validator(events, failing=('a', 'b'))
+
+        with self.assertRaisesRegexp(CMError, '^a rejected$'):
+            validator.validate_set({'x': '1'})
+        self.assertEqual(events, ['start a', 'end a'])
+
+    def test_parallel(self):
+        events = []
+        validator = self._create_validator(events, workers=3)
+
+        validator.validate_set({'x': '1'})
+        self.assertEqual(events, ['start a', 'start b', 'start c', 'end a', 'end b', 'end c'])
+
+    def test_parallel_errors(self):
+        events = []
+        validator = self._create_validator(events, workers=2, failing=('a', 'c'))
+
+        with self.assertRaisesRegexp(CMError, '^Validation failed: a: a rejected; c: c rejected$'):
+            validator.validate_set({'x': '1'})
+        self.assertEqual(len(events), 6)
+
+        validator = self._create_validator(events, workers=2, failing=('b',))
+        with self.assertRaisesRegexp(CMError, '^b rejected$'):
+            validator.validate_set({'x': '1'})
+
+    def test_timeout(self):
+        events = []
+        validator = self._create_validator(events, workers=3, plugin_timeout=0.05,
+                                           slow=('b',))
+
+        with self.assertRaisesRegexp(CMError, 'plugin b timed out'):
+            validator.validate_set({'x': '1'})
+        self.assertNotIn('end b', events)
+
+        validator = self._create_validator(events, plugin_timeout=0.05, slow=('c',))
+        with self.assertRaisesRegexp(CMError, 'plugin c timed out'):
+            validator.validate_set({'x': '1'})
+
+    def test_shared_view(self):
+        events = []
+        validator = self._create_validator(events, workers=3)
+        validator.plugin_client.get_property.return_value = '1'
+        views = []
+
+        def validate_delete(instance, _):
+            views.append((instance, instance.config_view,
+                          instance.plugin_client.get_property('y')))
+            eventlet.sleep(0)
+        for plugin in ('a', 'b'):
+            setattr(getattr(validator.pluginlist[plugin], plugin), 'validate_delete',
+                    validate_delete)
+
+        validator.validate_delete(['x'])
+
+        self.assertIs(views[0][1], views[1][1])
+        with self.assertRaises(CMError):
+            views[0][1].get_property('x')
+        self.assertEqual([value for _, _, value in views], ['1', '1'])
+        validator.plugin_client.get_property.assert_called_once_with('y')
+
+        # concurrent validations have their own instances and views
+        del views[:]
+        pool = eventlet.GreenPool()
+        pool.spawn_n(validator.validate_delete, ['x'])
+        pool.spawn_n(validator.validate_delete, ['z'])
+        pool.waitall()
+        self.assertEqual(len(views), 4)
+        self.assertEqual(len(set(id(instance) for instance, _, _ in views)), 4)
+        self.assertEqual(len(set(id(view) for _, view, _ in views)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
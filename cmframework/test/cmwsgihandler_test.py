@@ -0,0 +1,64 @@
+# Copyright 2019 Nokia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+import json
+import StringIO
+
+from cmframework.server.cmwsgihandler import CMWSGIHandler
+from cmframework.server.cmhttperrors import CMHTTPErrors
+
+
+class CMWSGIHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.rest_api_factory = mock.MagicMock()
+        self.api = self.rest_api_factory.get_api.return_value
+        self.handler = CMWSGIHandler(self.rest_api_factory, max_request_size=1000)
+
+    def _environ(self, body, size=None):
+        stream = mock.MagicMock(wraps=StringIO.StringIO(body))
+        return {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/cm/v1.0/properties',
+                'QUERY_STRING': '', 'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body) if size is None else size),
+                'HTTP_IF_NONE_MATCH': '"x"', 'wsgi.input': stream}
+
+    @mock.patch.object(CMWSGIHandler, 'READ_CHUNK_SIZE', 10)
+    def test_read_body(self):
+        body = json.dumps({'properties': [{'name': 'a', 'value': 'b' * 50}]})
+        environ = self._environ(body + 'extra')
+
+        rpc = self.handler._handle_request(environ)
+
+        self.assertEqual(rpc.req_body, body + 'extra')
+        self.assertEqual(rpc.req_headers, {'if-none-match': '"x"'})
+        self.api.handle_properties.assert_called_once_with(rpc)
+        reads = environ['wsgi.input'].read.call_args_list
+        self.assertTrue(all(call[0][0] <= 10 for call in reads))
+
+        rpc = self.handler._handle_request(self._environ(body, len(body) + 1))
+        self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_internal_error_status()))
+
+    def test_too_large(self):
+        environ = self._environ('x' * 1001)
+
+        rpc = self.handler._handle_request(environ)
+
+        self.assertTrue(rpc.rep_status.startswith(CMHTTPErrors.get_request_too_large_status()))
+        environ['wsgi.input'].read.assert_not_called()
+        self.api.handle_properties.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()